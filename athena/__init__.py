@@ -2,8 +2,8 @@
 Athena init
 """
 __all__ = [
-    'active', 'feature_map', 'kas', 'projection_factory', 'nll', 'subspaces',
-    'utils'
+    'active', 'covariance', 'feature_map', 'kas', 'projection_factory', 'nll',
+    'subspaces', 'utils'
 ]
 
 __project__ = 'ATHENA'
@@ -17,10 +17,14 @@ __maintainer__ = __author__
 __status__ = "Beta"
 
 from .active import ActiveSubspaces
-from .feature_map import (FeatureMap, rff_map, rff_jac)
+from .covariance import CovarianceAccumulator
+from .feature_map import (FeatureMap, rff_map, rff_jac, rff_jac_diag,
+                          rff_map_and_jac_diag)
 from .kas import KernelActiveSubspaces
 from .projection_factory import ProjectionFactory
 from .nll import NonlinearLevelSet, ForwardNet, BackwardNet
 from .subspaces import Subspaces
-from .utils import (Normalizer, initialize_weights, linear_program_ineq,
-                    local_linear_gradients, sort_eigpairs)
+from .utils import (BoundingBoxSolver, Normalizer, initialize_weights,
+                    linear_program_eq, linear_program_ineq,
+                    local_linear_gradients, PolytopeCache, sort_eigpairs,
+                    subspace_distances, truncated_svd)
@@ -10,15 +10,28 @@ Active Subspaces module.
       Journal of Open Source Software, 1(5), 79, 2016.
 
 """
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
 from .subspaces import Subspaces
-from .utils import (Normalizer, initialize_weights, linear_program_ineq,
-                    local_linear_gradients)
+from .covariance import CovarianceAccumulator
+from .utils import (BoundingBoxSolver, Normalizer, initialize_weights,
+                    linear_program_ineq, local_linear_gradients)
 
 
 class ActiveSubspaces(Subspaces):
     """Active Subspaces class
     """
+    def __init__(self):
+        super().__init__()
+        self.accumulator = None
+        self.captured_energy = None
+        self.sampling_stats = {'n_draws': 0, 'n_accepted': 0, 'n_fallbacks': 0}
+        self.polytope_cache = None
+        self._box_solver = None
+        self._orthogonal = False
+
     def compute(self,
                 inputs=None,
                 outputs=None,
@@ -26,7 +39,14 @@ class ActiveSubspaces(Subspaces):
                 weights=None,
                 method='exact',
                 nboot=100,
-                metric=None):
+                metric=None,
+                block_size=1000,
+                n_components=None,
+                solver=None,
+                n_jobs=None,
+                seed=None,
+                max_dim=None,
+                dtype=None):
         """
         Compute the active subspaces given the gradients of the model function
         wrt the input parameters, or given the input/outputs couples. Only two
@@ -35,7 +55,11 @@ class ActiveSubspaces(Subspaces):
         :param numpy.ndarray inputs: input parameters oriented as rows.
         :param numpy.ndarray outputs: corresponding outputs oriented as rows.
         :param numpy.ndarray gradients: n_samples-by-n_params matrix containing the
-            gradient samples oriented as rows.
+            gradient samples oriented as rows. It can also be the filename of
+            a .npy file, a `numpy.memmap`, or an iterable of chunks of
+            gradients or of (gradients, weights) tuples: in these cases the
+            gradients are streamed in blocks of `block_size` samples and never
+            loaded in memory at once. See the notes below.
         :param numpy.ndarray weights: n_samples-by-1 weight vector, corresponds
             to numerical quadrature rule used to estimate matrix whose eigenspaces
             define the active subspace.
@@ -48,11 +72,70 @@ class ActiveSubspaces(Subspaces):
         :param int nboot: number of bootstrap samples. Default is 100.
         :param numpy.ndarray metric: metric matrix for vectorial active
             subspaces.
+        :param int block_size: number of samples processed at once when the
+            covariance matrix is assembled for vectorial outputs, it bounds the
+            peak memory independently of the number of samples. Default is
+            1000.
+        :param int n_components: number of leading eigenpairs to compute. If
+            None the whole spectrum is computed. One more eigenpair is
+            computed to estimate the spectral gap, and the fraction of the
+            trace of the covariance matrix captured by the leading
+            eigenvalues is stored in `self.captured_energy`.
+        :param str solver: method used to decompose the covariance matrix.
+            Possible choices are 'full', 'randomized' and 'lanczos'. Default
+            is None, that is 'full' if `n_components` is None and
+            'randomized' otherwise.
+        :param int n_jobs: number of threads computing the bootstrap
+            replicates. If -1 all the available cores are used. Default is
+            None, that is serial execution.
+        :param int seed: seed of the independent generators of the bootstrap
+            replicates, and of the generator of the truncated solver. If
+            `seed` is given the eigenpairs and the bootstrap ranges are
+            reproducible and do not depend on the number of threads. Default
+            is None.
+        :param int max_dim: largest dimension of the active subspaces whose
+            bootstrap distances are estimated, so that `self.subs_br` has
+            max_dim rows. If None all the dimensions are considered. Default
+            is None.
+        :param numpy.dtype dtype: floating point type the gradients are
+            converted to, for example `numpy.float32` to halve the memory of
+            the gradients and of the bootstrap. The covariance matrices are
+            accumulated and decomposed in double precision in any case. The
+            type is stored in `self.dtype` and used by `self.forward`. If None
+            the gradients are not converted. Default is None.
         :raises: ValueError
+
+        .. note:: For streamed gradients the covariance matrix is normalized
+            by the sum of the weights, and the bootstrap replicates are
+            accumulated in the same pass over the data with the Poisson
+            bootstrap (see `self._compute_streaming`).
         """
+        if solver is None:
+            solver = 'full' if n_components is None else 'randomized'
+        if solver not in ('full', 'randomized', 'lanczos'):
+            raise ValueError("solver argument can only be 'full', "
+                             "'randomized' or 'lanczos'.")
+        if solver != 'full' and n_components is None:
+            raise ValueError('n_components argument is None.')
+        self.dtype = None if dtype is None else np.dtype(dtype)
+
         if method == 'exact':
             if gradients is None:
                 raise ValueError('gradients argument is None.')
+            if self._is_streamed(gradients):
+                blocks = self._gradient_blocks(gradients, weights, block_size,
+                                               dtype)
+                self._compute_streaming(blocks,
+                                        metric=metric,
+                                        nboot=nboot,
+                                        block_size=block_size,
+                                        n_components=n_components,
+                                        solver=solver,
+                                        max_dim=max_dim)
+                if n_components is not None:
+                    self.captured_energy = np.sum(
+                        self.evals[:n_components]) / np.trace(self.cov_matrix)
+                return
 
         # estimate active subspace with local linear models.
         if method == 'local':
@@ -62,6 +145,9 @@ class ActiveSubspaces(Subspaces):
                                                outputs=outputs,
                                                weights=weights)[0]
 
+        if dtype is not None:
+            gradients = np.asarray(gradients, dtype=dtype)
+
         if weights is None or method == 'local':
             # use the new gradients to compute the weights, otherwise dimension
             # mismatch accours.
@@ -71,15 +157,187 @@ class ActiveSubspaces(Subspaces):
             metric = np.diag(np.ones(gradients.shape[1]))
 
         self.evals, self.evects = self._build_decompose_cov_matrix(
-            gradients=gradients, weights=weights, method=method, metric=metric)
+            gradients=gradients,
+            weights=weights,
+            method=method,
+            metric=metric,
+            block_size=block_size,
+            n_components=n_components,
+            solver=solver,
+            rng=None if seed is None else np.random.default_rng(seed))
+
+        if n_components is not None:
+            self.captured_energy = np.sum(
+                self.evals[:n_components]) / self._cov_matrix_trace(
+                    gradients, weights, metric=metric, block_size=block_size)
 
         self._compute_bootstrap_ranges(gradients,
                                        weights,
                                        method=method,
                                        nboot=nboot,
-                                       metric=metric)
+                                       metric=metric,
+                                       block_size=block_size,
+                                       n_components=n_components,
+                                       solver=solver,
+                                       n_jobs=n_jobs,
+                                       seed=seed,
+                                       max_dim=max_dim)
+
+    def partial_fit(self,
+                    gradients,
+                    weights=None,
+                    metric=None,
+                    block_size=1000):
+        """
+        Update the covariance statistics of the gradients with a new batch of
+        samples. The batch is not stored, so the active subspace can be
+        refitted with `self.finalize` after each batch without keeping the
+        previous gradients in memory.
+
+        :param numpy.ndarray gradients: n_samples-by-n_params or
+            n_samples-by-output_dim-by-n_params matrix containing the gradient
+            samples of the batch oriented as rows.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector of the
+            batch. If None, unitary weights are used. The covariance matrix
+            is normalized by the sum of all the weights in `self.finalize`.
+        :param numpy.ndarray metric: metric matrix for vectorial active
+            subspaces. It must be the same for all the batches.
+        :param int block_size: number of samples processed at once when the
+            covariance matrix is assembled. Default is 1000.
+        :raises: ValueError
+        """
+        if len(gradients.shape) == 3 and metric is None:
+            metric = np.diag(np.ones(gradients.shape[1]))
+
+        batch = CovarianceAccumulator(gradients.shape[-1], metric=metric)
+        batch.update(gradients, weights=weights, block_size=block_size)
+        if self.accumulator is None:
+            self.accumulator = batch
+        else:
+            self.accumulator.merge(batch)
+
+    def finalize(self):
+        """
+        Decompose the covariance matrix accumulated by `self.partial_fit`.
+        It can be called after each batch to refit the active subspace with
+        all the samples seen so far.
+
+        :raises: ValueError
+
+        .. note:: The bootstrap ranges `self.evals_br` and `self.subs_br`
+            need the single gradient samples and they are not computed.
+        """
+        if self.accumulator is None:
+            raise ValueError('No gradients have been accumulated. '
+                             'You have to perform the partial_fit method.')
+        self.decompose(self.accumulator)
+
+    def compute_adaptive(self,
+                         gradient_oracle,
+                         sampler,
+                         dim,
+                         tol=0.1,
+                         gap_tol=1.,
+                         batch_size=50,
+                         max_samples=1000,
+                         nboot=100,
+                         metric=None,
+                         block_size=1000):
+        """
+        Compute the active subspace requesting the gradients in batches, and
+        stop as soon as the subspace of dimension `dim` has converged. After
+        each batch the active subspace is refitted with `self.partial_fit`
+        and `self.finalize`, while the bootstrap replicates are updated with
+        the Poisson bootstrap, so that the previous gradients are never
+        reprocessed.
+
+        The sampling stops when the bootstrap mean of the distance of the
+        subspace of dimension `dim` is smaller than `tol`, and the ratio
+        between the bootstrap upper bound of the eigenvalue dim+1 and the
+        bootstrap lower bound of the eigenvalue dim is smaller than
+        `gap_tol`, or when `max_samples` gradients have been evaluated.
+        The Poisson counts of a batch are drawn again for the replicates that
+        would otherwise have no sample, so each replicate is conditioned on
+        being nonempty.
+
+        :param callable gradient_oracle: function that returns the
+            n_samples-by-n_params or n_samples-by-output_dim-by-n_params
+            gradients evaluated at the n_samples-by-n_params inputs passed as
+            argument.
+        :param callable sampler: function that returns n_samples-by-n_params
+            inputs, given the number of samples to draw.
+        :param int dim: dimension of the active subspace to estimate.
+        :param float tol: tolerance on the bootstrap mean of the subspace
+            distance. Default is 0.1.
+        :param float gap_tol: tolerance on the ratio between the bootstrap
+            ranges of the eigenvalues dim+1 and dim. The default value 1
+            requires the bootstrap ranges to be separated.
+        :param int batch_size: number of gradients requested at each
+            iteration. Default is 50.
+        :param int max_samples: maximum number of gradients evaluated.
+            Default is 1000.
+        :param int nboot: number of bootstrap replicates. Default is 100.
+        :param numpy.ndarray metric: metric matrix for vectorial active
+            subspaces.
+        :param int block_size: number of samples processed at once when the
+            covariance matrices are assembled. Default is 1000.
+        :return: array n_samples-by-n_params containing the sampled inputs;
+            the corresponding gradients; True if the tolerances have been
+            met before evaluating `max_samples` gradients.
+        :rtype: numpy.ndarray, numpy.ndarray, bool
+        :raises: ValueError
+        """
+        if not isinstance(dim, (int, np.integer)) or dim <= 0:
+            raise ValueError('dim must be a positive integer.')
+
+        self.accumulator = None
+        boot_accumulators = None
+        inputs_list, gradients_list = [], []
+        n_samples, converged = 0, False
+        while n_samples < max_samples and not converged:
+            inputs = sampler(min(batch_size, max_samples - n_samples))
+            # checked before paying for the gradients of the first batch
+            if dim >= inputs.shape[-1]:
+                raise ValueError('dim must be smaller than the number of '
+                                 'input parameters.')
+            gradients = gradient_oracle(inputs)
+            inputs_list.append(inputs)
+            gradients_list.append(gradients)
+            n_samples += inputs.shape[0]
+
+            if len(gradients.shape) == 3 and metric is None:
+                metric = np.diag(np.ones(gradients.shape[1]))
+            if boot_accumulators is None:
+                boot_accumulators = [
+                    CovarianceAccumulator(gradients.shape[-1], metric=metric)
+                    for _ in range(nboot)
+                ]
+
+            self.partial_fit(gradients, metric=metric, block_size=block_size)
+            counts = np.random.poisson(size=(nboot, gradients.shape[0]))
+            for accumulator, counts0 in zip(boot_accumulators, counts):
+                # a replicate must have drawn at least one sample
+                while accumulator.weights_sum + np.sum(counts0) == 0:
+                    counts0 = np.random.poisson(size=gradients.shape[0])
+                accumulator.update(gradients,
+                                   weights=counts0.reshape(-1, 1),
+                                   block_size=block_size)
+            self.finalize()
+
+            replicates = (self._decompose_cov_matrix(accumulator.cov_matrix)
+                          for accumulator in boot_accumulators)
+            self._set_bootstrap_ranges(replicates, nboot, max_dim=dim)
+            converged = self.subs_br[dim - 1, 1] < tol and self.evals_br[
+                dim, 1] < gap_tol * self.evals_br[dim - 1, 0]
+
+        return np.vstack(inputs_list), np.concatenate(gradients_list), converged
 
-    def forward(self, inputs):
+    def forward(self,
+                inputs,
+                active_only=False,
+                chunk_size=10000,
+                out=None,
+                dtype=None):
         """
         Map full variables to active and inactive variables.
 
@@ -87,17 +345,38 @@ class ActiveSubspaces(Subspaces):
         subspace.
 
         :param numpy.ndarray inputs: array n_samples-by-n_params containing the
-            points in the original parameter space.
+            points in the original parameter space. It can be a
+            `numpy.memmap`.
+        :param bool active_only: if True the inactive variables are not
+            computed and None is returned in their place. Default is False.
+        :param int chunk_size: number of points mapped at once. Default is
+            10000.
+        :param tuple out: arrays n_samples-by-active_dim and
+            n_samples-by-inactive_dim where the mapped variables are stored.
+            If None new arrays are allocated. Default is None.
+        :param numpy.dtype dtype: floating point type of the computation, for
+            example `numpy.float32`. Default is None, that is `self.dtype` if
+            set by `self.compute`, otherwise the type of the inputs.
         :return: array n_samples-by-active_dim containing the mapped active variables;
             array n_samples-by-inactive_dim containing the mapped inactive
             variables.
         :rtype: numpy.ndarray, numpy.ndarray
         """
-        active = np.dot(inputs, self.W1)
-        inactive = np.dot(inputs, self.W2)
-        return active, inactive
+        return self._project(inputs,
+                             active_only=active_only,
+                             chunk_size=chunk_size,
+                             out=out,
+                             dtype=dtype)
 
-    def backward(self, reduced_inputs, n_points=1):
+    def backward(self,
+                 reduced_inputs,
+                 n_points=1,
+                 batch_size=2000,
+                 burn_in=10,
+                 thinning=1,
+                 n_jobs=None,
+                 seed=None,
+                 shard_size=100):
         """
         Map the points in the active variable space to the original parameter
         space.
@@ -106,6 +385,23 @@ class ActiveSubspaces(Subspaces):
             contains points in the space of active variables.
         :param int n_points: the number of points in the original parameter space that
             are returned that map to the given active variables. Defaults to 1.
+        :param int batch_size: number of inactive samples drawn together by
+            `self._sample_inactive_batch`, it bounds the memory used by the
+            rejection sampling. Default is 2000.
+        :param int burn_in: number of steps of the hit and run chains before
+            the first sample is taken. Default is 10.
+        :param int thinning: number of steps between two consecutive samples
+            of the same hit and run chain. Default is 1.
+        :param int n_jobs: number of processes sampling the inactive
+            variables. If -1 all the available cores are used. Default is
+            None, that is serial execution.
+        :param int seed: seed of the independent random streams of the
+            shards of reduced inputs. If `seed` is given the samples are
+            reproducible for a given `shard_size`, and do not depend on the
+            number of processes. Different shard sizes give different
+            samples. Default is None.
+        :param int shard_size: number of reduced inputs sent to a process at
+            once when `n_jobs` or `seed` are given. Default is 100.
         :return: (n_samples * n_points)-by-n_params matrix that contains
             points in the original parameter space, (n_samples *
             n_points)-by-n_params matrix that contains integer indices. These
@@ -114,17 +410,79 @@ class ActiveSubspaces(Subspaces):
         :rtype: numpy.ndarray, numpy.ndarray
 
         .. note:: The inverse map depends critically on the
-            `self._sample_inactive` method.
+            `self._sample_inactive_batch` method. The numbers of candidates
+            drawn and accepted by the rejection sampling, and of reduced
+            inputs that fall back to hit and run, are accumulated in
+            `self.sampling_stats`.
+
+        .. note:: With `n_jobs` or `seed` the sampling runs in a pool of
+            processes (see `self._sample_inactive_parallel`), which do not use
+            `self.polytope_cache`.
         """
-        inactive_swap = np.array([
-            self._sample_inactive(red_inp, n_points)
-            for red_inp in reduced_inputs
-        ])
+        if n_jobs is None and seed is None:
+            inactive_swap = self._sample_inactive_batch(
+                reduced_inputs, n_points, batch_size, burn_in, thinning)
+        else:
+            inactive_swap = self._sample_inactive_parallel(
+                reduced_inputs, n_points, batch_size, burn_in, thinning,
+                n_jobs, seed, shard_size)
         inactive_inputs = np.swapaxes(inactive_swap, 1, 2)
 
         inputs, indices = self._rotate_x(reduced_inputs, inactive_inputs)
         return inputs, indices
 
+    def iter_backward(self,
+                      reduced_inputs,
+                      n_points=1,
+                      chunk_size=1000,
+                      burn_in=10,
+                      thinning=1):
+        """
+        Map the points in the active variable space to the original parameter
+        space, yielding the points in chunks. Unlike `self.backward`, the whole
+        (n_samples * n_points)-by-n_params matrix is never built, so the
+        samples can be consumed as soon as they are drawn with bounded memory.
+
+        :param numpy.ndarray reduced_inputs: n_samples-by-dim matrix that
+            contains points in the space of active variables.
+        :param int n_points: the number of points in the original parameter
+            space that are returned that map to the given active variables.
+            Defaults to 1.
+        :param int chunk_size: maximum number of points in the original
+            parameter space of each chunk. Default is 1000.
+        :param int burn_in: number of steps of the hit and run chains before
+            the first sample is taken. Default is 10.
+        :param int thinning: number of steps between two consecutive samples
+            of the same hit and run chain. Default is 1.
+        :return: generator of the chunks: each chunk is a matrix that
+            contains points in the original parameter space, and the
+            corresponding integer indices of the rows of `reduced_inputs`
+            they map to, oriented as a column.
+        :rtype: generator
+
+        :Example:
+
+            >>> sums = np.zeros(reduced_inputs.shape[0])
+            >>> for inputs, indices in ss.iter_backward(reduced_inputs, 10000):
+            >>>     np.add.at(sums, indices[:, 0], np.sum(inputs, axis=1))
+            >>> means = sums / 10000
+        """
+        n_samples = reduced_inputs.shape[0]
+        step = max(1, chunk_size // n_points)
+        for start in range(0, n_samples, step):
+            reduced_inputs0 = reduced_inputs[start:start + step]
+            # the samples of a reduced input are split if they are too many
+            for offset in range(0, n_points, chunk_size):
+                n_points0 = min(chunk_size, n_points - offset)
+                inactive_swap = self._sample_inactive_batch(
+                    reduced_inputs0, n_points0, chunk_size, burn_in, thinning)
+                inputs = self._rotate_x(reduced_inputs0,
+                                        np.swapaxes(inactive_swap, 1, 2))[0]
+                indices = np.repeat(
+                    np.arange(start, start + reduced_inputs0.shape[0]),
+                    n_points0).reshape(-1, 1)
+                yield inputs, indices
+
     def _sample_inactive(self, reduced_input, n_points):
         """
         Sample inactive variables.
@@ -147,16 +505,278 @@ class ActiveSubspaces(Subspaces):
             tries a simple rejection sampling scheme, which finds a bounding
             hyperbox for the polytope, draws points uniformly from the bounding
             hyperbox, and rejects points outside the polytope. If that method
-            does not return enough samples, the method tries a "hit and run"
-            method for sampling from the polytope. If that does not work, it
-            returns an array with `N` copies of a feasible point computed as the
-            Chebyshev center of the polytope.
+            does not return enough samples, the method runs "hit and run"
+            chains, started from the Chebyshev center of the polytope, for
+            sampling from the polytope. When the inactive subspace has
+            dimension 1 or 2 the polytope is an interval or a polygon, and it
+            is sampled exactly by `self._sample_inactive_exact`.
         """
+        if self.W2.shape[1] in (1, 2):
+            return self._sample_inactive_exact(reduced_input.reshape(1, -1),
+                                               n_points)[0]
         Z = self._rejection_sampling_inactive(reduced_input, n_points)
         if Z is None:
             Z = self._hit_and_run_inactive(reduced_input, n_points)
         return Z
 
+    def _sample_inactive_batch(self,
+                               reduced_inputs,
+                               n_points,
+                               batch_size=2000,
+                               burn_in=10,
+                               thinning=1):
+        """
+        Sample inactive variables for many values of the active variables at
+        once.
+
+        The polytopes of all the reduced inputs share the matrix
+        A = [W2; -W2], and only the vector b changes. The rejection sampling
+        is vectorized over batches of reduced inputs, and only the reduced
+        inputs with not enough accepted samples fall back to the hit and run
+        chains of `self._hit_and_run_inactive_batch`. Inactive subspaces of
+        dimension 1 or 2 are sampled exactly by `self._sample_inactive_exact`.
+
+        :param numpy.ndarray reduced_inputs: n_samples-by-dim matrix that
+            contains points in the space of active variables.
+        :param int n_points: the number of inactive variable samples for each
+            reduced input.
+        :param int batch_size: number of inactive samples drawn together.
+            The reduced inputs are processed in batches of
+            max(1, batch_size // n_points) points. Default is 2000.
+        :param int burn_in: number of steps of the hit and run chains before
+            the first sample is taken. Default is 10.
+        :param int thinning: number of steps between two consecutive samples
+            of the same hit and run chain. Default is 1.
+        :return: n_samples-by-n_points-by-(inactive_dim) array that contains
+            values of the inactive variable that correspond to each reduced
+            input.
+        :rtype: numpy.ndarray
+        """
+        n_samples = reduced_inputs.shape[0]
+        inactive_dim = self.W2.shape[1]
+        Z = np.zeros((n_samples, n_points, inactive_dim))
+        step = max(1, batch_size // n_points)
+        if inactive_dim in (1, 2):
+            for start in range(0, n_samples, step):
+                Z[start:start + step] = self._sample_inactive_exact(
+                    reduced_inputs[start:start + step], n_points)
+            return Z
+        for start in range(0, n_samples, step):
+            Z0, accepted = self._rejection_sampling_inactive_batch(
+                reduced_inputs[start:start + step], n_points)
+            Z[start:start + step] = Z0
+            rejected = np.flatnonzero(~accepted)
+            if rejected.size:
+                Z[start + rejected] = self._hit_and_run_inactive_batch(
+                    reduced_inputs[start + rejected], n_points, burn_in,
+                    thinning)
+        return Z
+
+    def _sample_inactive_exact(self, reduced_inputs, n_points):
+        """
+        Sample exactly and uniformly the inactive variables when the inactive
+        subspace has dimension 1 or 2, without solving linear programs.
+
+        In one dimension the polytope is the interval computed by
+        `self._inactive_interval`. In two dimensions it is the polygon with
+        the vertices computed by `self._inactive_polygons`: the polygon is
+        split in triangles with a common vertex, each sample picks a triangle
+        with probability proportional to its area, and then a uniform point
+        in the triangle. Both cases are vectorized over the reduced inputs.
+
+        :param numpy.ndarray reduced_inputs: n_samples-by-dim matrix that
+            contains points in the space of active variables.
+        :param int n_points: the number of inactive variable samples for each
+            reduced input.
+        :return: n_samples-by-n_points-by-(inactive_dim) array that contains
+            values of the inactive variable that correspond to each reduced
+            input.
+        :rtype: numpy.ndarray
+        :raises: ValueError
+        """
+        n_samples = reduced_inputs.shape[0]
+        if self.W2.shape[1] == 1:
+            lower, upper = self._inactive_interval(reduced_inputs)
+            Z = lower + (upper - lower) * np.random.uniform(
+                size=(n_samples, n_points))
+            return Z.reshape(n_samples, n_points, 1)
+
+        vertices = self._inactive_polygons(reduced_inputs)
+        edges = vertices[:, 1:] - vertices[:, :1]
+        areas = np.abs(edges[:, :-1, 0] * edges[:, 1:, 1] -
+                       edges[:, :-1, 1] * edges[:, 1:, 0])
+        cum_areas = np.cumsum(areas, axis=1)
+        threshold = cum_areas[:, -1:] * np.random.uniform(size=(n_samples,
+                                                                n_points))
+        triangles = np.minimum(
+            np.sum(cum_areas[:, np.newaxis, :] <= threshold[:, :, np.newaxis],
+                   axis=2), areas.shape[1] - 1)
+
+        u, v = np.random.uniform(size=(2, n_samples, n_points, 1))
+        outside = u + v > 1
+        u[outside], v[outside] = 1 - u[outside], 1 - v[outside]
+        edge0 = np.take_along_axis(edges, triangles[:, :, np.newaxis], axis=1)
+        edge1 = np.take_along_axis(edges, triangles[:, :, np.newaxis] + 1,
+                                   axis=1)
+        Z = vertices[:, :1] + u * edge0 + v * edge1
+
+        # polygons degenerate to a segment or a point
+        degenerate = cum_areas[:, -1] <= 0
+        Z[degenerate] = np.mean(vertices[degenerate], axis=1,
+                                keepdims=True)
+        return Z
+
+    def _inactive_interval(self, reduced_inputs):
+        """
+        Compute the intervals of the one-dimensional inactive variable that
+        correspond to the given reduced inputs, that is the values z such that
+        -1 <= W1*y + W2*z <= 1.
+
+        :param numpy.ndarray reduced_inputs: n_samples-by-dim matrix that
+            contains points in the space of active variables.
+        :return: n_samples-by-1 lower bounds and n_samples-by-1 upper bounds
+            of the intervals.
+        :rtype: numpy.ndarray, numpy.ndarray
+        :raises: ValueError
+        """
+        w = self.W2[:, 0]
+        nonzero = np.abs(w) > 1e-12
+        s = np.dot(reduced_inputs, self.W1[nonzero].T)
+        bounds = np.stack(((-1 - s) / w[nonzero], (1 - s) / w[nonzero]))
+        lower = np.amax(np.amin(bounds, axis=0), axis=1).reshape(-1, 1)
+        upper = np.amin(np.amax(bounds, axis=0), axis=1).reshape(-1, 1)
+        if np.any(lower > upper + 1e-10):
+            raise ValueError('The reduced inputs must belong to the image of '
+                             'the hypercube [-1, 1]^n_params.')
+        return lower, np.maximum(lower, upper)
+
+    def _inactive_polygons(self, reduced_inputs):
+        """
+        Compute the vertices of the polygons of the two-dimensional inactive
+        variables that correspond to the given reduced inputs.
+
+        The vertices are the intersections of two of the lines
+        W2[i]*z = 1 - W1[i]*y and W2[i]*z = -1 - W1[i]*y that satisfy all the
+        inequalities -1 <= W1*y + W2*z <= 1. They are sorted
+        counterclockwise around their centroid, and since the number of
+        vertices changes with the reduced input the trailing entries repeat
+        the first vertex.
+
+        :param numpy.ndarray reduced_inputs: n_samples-by-dim matrix that
+            contains points in the space of active variables.
+        :return: n_samples-by-n_candidates-by-2 array with the vertices of
+            the polygons.
+        :rtype: numpy.ndarray
+        :raises: ValueError
+        """
+        A = np.vstack((self.W2, -self.W2))
+        s = np.dot(reduced_inputs, self.W1.T)
+        b = np.hstack((1 - s, 1 + s))
+
+        rows, cols = np.triu_indices(A.shape[0], k=1)
+        dets = A[rows, 0] * A[cols, 1] - A[rows, 1] * A[cols, 0]
+        regular = np.abs(dets) > 1e-12
+        rows, cols, dets = rows[regular], cols[regular], dets[regular]
+        # Cramer's rule for the intersections of all the couples of lines
+        vertices = np.stack(
+            ((b[:, rows] * A[cols, 1] - b[:, cols] * A[rows, 1]) / dets,
+             (b[:, cols] * A[rows, 0] - b[:, rows] * A[cols, 0]) / dets),
+            axis=2)
+        feasible = np.all(np.dot(vertices, A.T) <= b[:, np.newaxis, :] + 1e-10,
+                          axis=2)
+        n_vertices = np.sum(feasible, axis=1)
+        if np.any(n_vertices == 0):
+            raise ValueError('The reduced inputs must belong to the image of '
+                             'the hypercube [-1, 1]^n_params.')
+
+        centroids = np.sum(vertices * feasible[:, :, np.newaxis],
+                           axis=1) / n_vertices.reshape(-1, 1)
+        angles = np.arctan2(vertices[:, :, 1] - centroids[:, 1:],
+                            vertices[:, :, 0] - centroids[:, :1])
+        angles[~feasible] = np.inf
+        order = np.argsort(angles, axis=1)
+        vertices = np.take_along_axis(vertices, order[:, :, np.newaxis],
+                                      axis=1)
+        padding = np.arange(vertices.shape[1]) >= n_vertices.reshape(-1, 1)
+        vertices[padding] = np.repeat(vertices[:, 0], vertices.shape[1],
+                                      axis=0).reshape(vertices.shape)[padding]
+        return vertices
+
+    def _sample_inactive_parallel(self,
+                                  reduced_inputs,
+                                  n_points,
+                                  batch_size=2000,
+                                  burn_in=10,
+                                  thinning=1,
+                                  n_jobs=None,
+                                  seed=None,
+                                  shard_size=100):
+        """
+        Sample inactive variables with `self._sample_inactive_batch` in a
+        pool of processes.
+
+        The reduced inputs are split in shards of `shard_size` points. Each
+        shard is sampled with the global numpy random state of the worker
+        seeded from its own `numpy.random.SeedSequence` spawned from `seed`.
+        The bounding boxes of each shard are computed by a new
+        `BoundingBoxSolver`, since the bases it reuses depend on the reduced
+        inputs solved before, so they depend only on the shard. The samples
+        are then reproducible for a given seed and shard size whatever the
+        number of processes and the previous calls. The active and inactive
+        eigenvectors are sent once to each process by the initializer of the
+        pool.
+
+        :param numpy.ndarray reduced_inputs: n_samples-by-dim matrix that
+            contains points in the space of active variables.
+        :param int n_points: the number of inactive variable samples for each
+            reduced input.
+        :param int batch_size: number of inactive samples drawn together.
+            Default is 2000.
+        :param int burn_in: number of steps of the hit and run chains before
+            the first sample is taken. Default is 10.
+        :param int thinning: number of steps between two consecutive samples
+            of the same hit and run chain. Default is 1.
+        :param int n_jobs: number of processes. If -1 all the available cores
+            are used. If None one process is used. Default is None.
+        :param int seed: entropy of the `numpy.random.SeedSequence` spawning
+            the seeds of the shards. If None it is drawn from the global numpy
+            random state. Default is None.
+        :param int shard_size: number of reduced inputs of each shard.
+            Default is 100.
+        :return: n_samples-by-n_points-by-(inactive_dim) array that contains
+            values of the inactive variable that correspond to each reduced
+            input.
+        :rtype: numpy.ndarray
+        """
+        if seed is None:
+            seed = np.random.randint(np.iinfo(np.int32).max)
+        if n_jobs is None:
+            n_jobs = 1
+        elif n_jobs == -1:
+            n_jobs = os.cpu_count()
+
+        starts = range(0, reduced_inputs.shape[0], shard_size)
+        seeds = [
+            seed_seq.generate_state(4)
+            for seed_seq in np.random.SeedSequence(seed).spawn(len(starts))
+        ]
+        sample_shard = partial(_sample_inactive_shard,
+                               n_points=n_points,
+                               batch_size=batch_size,
+                               burn_in=burn_in,
+                               thinning=thinning)
+        shards = [reduced_inputs[start:start + shard_size] for start in starts]
+        with ProcessPoolExecutor(max_workers=n_jobs,
+                                 initializer=_init_backward_worker,
+                                 initargs=(self.W1, self.W2)) as executor:
+            results = list(executor.map(sample_shard, shards, seeds))
+
+        Z = np.zeros((reduced_inputs.shape[0], n_points, self.W2.shape[1]))
+        for start, (Z0, stats) in zip(starts, results):
+            Z[start:start + shard_size] = Z0
+            self._update_sampling_stats(**stats)
+        return Z
+
     def _compute_A_b(self, reduced_input):
         """
         Compute the matrix A and the vector b to build a box around the inactive
@@ -170,20 +790,188 @@ class ActiveSubspaces(Subspaces):
         b = np.vstack((-1 - s, -1 + s)).reshape((-1, 1))
         return A, b
 
-    def _rejection_sampling_inactive(self, reduced_input, n_points):
+    def _rejection_sampling_inactive(self,
+                                     reduced_input,
+                                     n_points,
+                                     max_draws=None):
         """
         A rejection sampling method for sampling the from a polytope.
 
+        The candidates are drawn in rounds whose size is estimated from the
+        acceptance rate of the previous rounds by `self._oversampling_size`,
+        until `n_points` samples are accepted or `max_draws` candidates are
+        drawn. The first round is the pilot draw. The numbers of drawn and
+        accepted candidates are added to `self.sampling_stats`.
+
         :param numpy.ndarray reduced_input: the value of the active variables.
         :param int n_points: the number of inactive variable samples,
+        :param int max_draws: maximum number of candidates drawn. Default is
+            None, that is 1000 * n_points.
         :return: n_points-by-(inactive_dim) matrix that contains values of the inactive
-            variable that correspond to the given `reduced_input`.
+            variable that correspond to the given `reduced_input`, or None if
+            not enough candidates have been accepted.
         :rtype: numpy.ndarray
         """
         m, n = self.W1.shape
         inactive_dim = m - n
+        if max_draws is None:
+            max_draws = 1000 * n_points
         # Build a box around z for uniform sampling
         A, b = self._compute_A_b(reduced_input)
+        lbox, ubox = self._bounding_box(reduced_input)
+        bn = Normalizer(lbox, ubox)
+
+        Z = np.zeros((0, inactive_dim))
+        n_draws = 0
+        while Z.shape[0] < n_points and n_draws < max_draws:
+            size = self._oversampling_size(n_points, n_draws, Z.shape[0],
+                                           max_draws)
+            Zbox = bn.inverse_transform(
+                np.random.uniform(-1.0, 1.0, size=(size, inactive_dim)))
+            ind = np.all(np.dot(A, Zbox.T) >= b, axis=0)
+            Z = np.vstack((Z, Zbox[ind, :]))
+            n_draws += size
+
+        self._update_sampling_stats(n_draws, Z.shape[0],
+                                    int(Z.shape[0] < n_points))
+        if Z.shape[0] >= n_points:
+            return Z[:n_points, :].reshape(n_points, inactive_dim)
+        return None
+
+    @staticmethod
+    def _oversampling_size(n_points, n_draws, n_accepted, max_draws):
+        """
+        Compute the number of candidates of the next round of the rejection
+        sampling, from the acceptance rate of the previous rounds.
+
+        The acceptance rate is estimated as (n_accepted + 1) / (n_draws + 2),
+        which is 1/2 before the pilot round, and the missing samples are
+        oversampled by 20% with respect to the estimate.
+
+        :param n_points: the number of requested samples.
+        :param n_draws: the number of candidates drawn so far.
+        :param n_accepted: the number of candidates accepted so far.
+        :param int max_draws: maximum number of candidates drawn.
+        :return: the number of candidates to draw, which does not exceed the
+            remaining budget.
+        :rtype: int or numpy.ndarray
+        """
+        rate = (n_accepted + 1) / (n_draws + 2)
+        size = np.ceil(1.2 * (n_points - n_accepted) / rate)
+        return np.maximum(np.minimum(size, max_draws - n_draws), 1).astype(int)
+
+    def _update_sampling_stats(self, n_draws, n_accepted, n_fallbacks):
+        """
+        Add the statistics of a rejection sampling to `self.sampling_stats`.
+
+        :param int n_draws: the number of candidates drawn.
+        :param int n_accepted: the number of candidates accepted.
+        :param int n_fallbacks: the number of reduced inputs that did not get
+            enough accepted samples.
+        """
+        self.sampling_stats['n_draws'] += int(n_draws)
+        self.sampling_stats['n_accepted'] += int(n_accepted)
+        self.sampling_stats['n_fallbacks'] += int(n_fallbacks)
+
+    def partition(self, dim):
+        """
+        Partition the eigenvectors to define the active and inactive subspaces.
+        The data cached in `self.polytope_cache` are cleared, since they
+        depend on the partition, and the orthogonality of the eigenvectors,
+        required by the `BoundingBoxSolver`, is checked.
+
+        :param int dim: dimension of the active subspace.
+        :raises: TypeError, ValueError
+        """
+        super().partition(dim)
+        self._orthogonal = self._is_orthogonal(self.W1, self.W2)
+        if self.polytope_cache is not None:
+            self.polytope_cache.clear()
+
+    @staticmethod
+    def _is_orthogonal(W1, W2):
+        """
+        Check if the active and inactive eigenvectors form an orthogonal
+        matrix.
+
+        :param numpy.ndarray W1: n_params-by-dim active eigenvectors.
+        :param numpy.ndarray W2: n_params-by-(n_params - dim) inactive
+            eigenvectors.
+        :return: True if [W1, W2] is an orthogonal matrix.
+        :rtype: bool
+        """
+        evects = np.hstack((W1, W2))
+        if evects.shape[0] != evects.shape[1]:
+            return False
+        return np.allclose(np.dot(evects.T, evects), np.eye(evects.shape[0]))
+
+    def _cached(self, kind, reduced_input, compute, valid=None):
+        """
+        Return the data of the polytope of `reduced_input` from
+        `self.polytope_cache` if present, otherwise compute and cache them.
+        Without a cache the data are always computed.
+
+        :param str kind: the kind of the data.
+        :param numpy.ndarray reduced_input: the value of the active variables.
+        :param callable compute: function that computes the data given the
+            reduced input.
+        :param callable valid: function that checks if the data of a nearby
+            reduced input, found within the tolerance of the cache, are valid
+            for `reduced_input`. If None only the data of `reduced_input`
+            itself are returned. Default is None.
+        :return: the data of the polytope.
+        """
+        if self.polytope_cache is None:
+            return compute(reduced_input)
+        value = self.polytope_cache.get(
+            reduced_input,
+            kind,
+            exact=valid is None,
+            valid=None if valid is None else partial(valid, reduced_input))
+        if value is None:
+            value = compute(reduced_input)
+            self.polytope_cache.put(reduced_input, kind, value)
+        return value
+
+    def _bounding_box(self, reduced_input):
+        """
+        Compute the smallest box containing the polytope of the inactive
+        variables that correspond to the given `reduced_input`, or return it
+        from `self.polytope_cache`. The box of a nearby reduced input need not
+        contain the polytope, so only the box of `reduced_input` itself is
+        reused.
+
+        :param numpy.ndarray reduced_input: the value of the active variables.
+        :return: 1-by-(inactive_dim) lower bounds and 1-by-(inactive_dim)
+            upper bounds of the box.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        return self._cached('box', reduced_input, self._solve_bounding_box)
+
+    def _solve_bounding_box(self, reduced_input):
+        """
+        Compute the smallest box containing the polytope of the inactive
+        variables that correspond to the given `reduced_input`.
+
+        When the eigenvectors form an orthogonal matrix, as checked by
+        `self.partition`, the boxes are computed by a `BoundingBoxSolver`,
+        which reuses the optimal bases of the linear programs among the
+        reduced inputs and is rebuilt only when `self.W1` changes. Otherwise
+        two linear programs are solved for each inactive variable.
+
+        :param numpy.ndarray reduced_input: the value of the active variables.
+        :return: 1-by-(inactive_dim) lower bounds and 1-by-(inactive_dim)
+            upper bounds of the box.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        m, n = self.W1.shape
+        if self._orthogonal:
+            if self._box_solver is None or self._box_solver.W1 is not self.W1:
+                self._box_solver = BoundingBoxSolver(self.W1, self.W2)
+            return self._box_solver.solve(reduced_input)
+
+        inactive_dim = m - n
+        A, b = self._compute_A_b(reduced_input)
         lbox, ubox = np.zeros((1, inactive_dim)), np.zeros((1, inactive_dim))
         for i in range(inactive_dim):
             clb = np.zeros((inactive_dim, 1))
@@ -192,32 +980,150 @@ class ActiveSubspaces(Subspaces):
             cub = np.zeros((inactive_dim, 1))
             cub[i, 0] = -1.0
             ubox[0, i] = linear_program_ineq(cub, A, b)[i, 0]
-        bn = Normalizer(lbox, ubox)
-        Zbox = bn.inverse_transform(
-            np.random.uniform(-1.0, 1.0, size=(50 * n_points, inactive_dim)))
-        ind = np.all(np.dot(A, Zbox.T) >= b, axis=0)
+        return lbox, ubox
 
-        if np.sum(ind) >= n_points:
-            Z = Zbox[ind, :]
-            return Z[:n_points, :].reshape(n_points, inactive_dim)
-        return None
+    def _rejection_sampling_inactive_batch(self,
+                                           reduced_inputs,
+                                           n_points,
+                                           max_draws=None):
+        """
+        A rejection sampling method for sampling from the polytopes of many
+        reduced inputs at once.
+
+        As in `self._rejection_sampling_inactive` the candidates are drawn in
+        rounds sized by the acceptance rates of the previous rounds. At each
+        round all the reduced inputs that need more samples draw the same
+        number of candidates, at most 50 * n_points, and the accepted ones
+        are stored in order.
 
-    def _hit_and_run_inactive(self, reduced_input, n_points):
+        :param numpy.ndarray reduced_inputs: n_samples-by-dim matrix that
+            contains points in the space of active variables.
+        :param int n_points: the number of inactive variable samples for each
+            reduced input.
+        :param int max_draws: maximum number of candidates drawn for each
+            reduced input. Default is None, that is 1000 * n_points.
+        :return: n_samples-by-n_points-by-(inactive_dim) array that contains
+            values of the inactive variable that correspond to each reduced
+            input; boolean vector that is False for the reduced inputs without
+            enough accepted samples, whose inactive variables are zeros.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        n_samples = reduced_inputs.shape[0]
+        inactive_dim = self.W2.shape[1]
+        if max_draws is None:
+            max_draws = 1000 * n_points
+        A = np.vstack((self.W2, -1 * self.W2))
+        s = np.dot(reduced_inputs, self.W1.T)
+        B = np.hstack((-1 - s, -1 + s))
+
+        lbox, ubox = np.zeros((n_samples, 1, inactive_dim)), np.zeros(
+            (n_samples, 1, inactive_dim))
+        for i in range(n_samples):
+            lbox[i], ubox[i] = self._bounding_box(reduced_inputs[i])
+
+        Z = np.zeros((n_samples, n_points, inactive_dim))
+        n_draws = np.zeros(n_samples, dtype=int)
+        n_accepted = np.zeros(n_samples, dtype=int)
+        active = np.arange(n_samples)
+        while active.size:
+            size = min(
+                np.amax(
+                    self._oversampling_size(n_points, n_draws[active],
+                                            n_accepted[active], max_draws)),
+                50 * n_points)
+
+            # draw uniformly in the boxes and check all the constraints at once
+            Zbox = lbox[active] + (ubox[active] -
+                                   lbox[active]) * np.random.uniform(
+                                       size=(active.size, size, inactive_dim))
+            ind = np.all(np.matmul(Zbox, A.T) >= B[active, np.newaxis, :],
+                         axis=2)
+
+            # store the accepted samples after the ones of the previous rounds
+            position = n_accepted[active, np.newaxis] + np.cumsum(ind,
+                                                                  axis=1) - 1
+            rows, cols = np.nonzero(ind & (position < n_points))
+            Z[active[rows], position[rows, cols]] = Zbox[rows, cols]
+
+            n_draws[active] += size
+            n_accepted[active] += np.sum(ind, axis=1)
+            active = active[(n_accepted[active] < n_points)
+                            & (n_draws[active] < max_draws)]
+
+        accepted = n_accepted >= n_points
+        self._update_sampling_stats(np.sum(n_draws), np.sum(n_accepted),
+                                    np.sum(~accepted))
+        Z[~accepted] = 0.
+        return Z, accepted
+
+    def _hit_and_run_inactive(self,
+                              reduced_input,
+                              n_points,
+                              burn_in=10,
+                              thinning=1,
+                              n_chains=None):
         """
         A hit and run method for sampling the inactive variables from a
         polytope.
 
         :param numpy.ndarray reduced_input: the value of the active variables.
         :param int n_points: the number of inactive variable samples,
+        :param int burn_in: number of steps of each chain before the first
+            sample is taken. Default is 10.
+        :param int thinning: number of steps between two consecutive samples
+            of the same chain. Default is 1.
+        :param int n_chains: number of independent chains. Default is None,
+            that is one chain for each sample.
         :return: n_points-by-(inactive_dim) matrix that contains values of the
             inactive variable that correspond to the given `reduced_input`.
         :rtype: numpy.ndarray
         """
-        m, n = self.W1.shape
-        inactive_dim = m - n
+        return self._hit_and_run_inactive_batch(
+            np.asarray(reduced_input).reshape(1, -1), n_points, burn_in,
+            thinning, n_chains)[0]
+
+    def _chebyshev_center(self, reduced_input):
+        """
+        Compute the Chebyshev center of the polytope of the inactive
+        variables, or return it from `self.polytope_cache`. The center of a
+        nearby reduced input is reused only if it lies in the interior of the
+        polytope, so that it is still a valid starting point of the hit and
+        run chains.
+
+        :param numpy.ndarray reduced_input: the value of the active variables.
+        :return: the (inactive_dim)-by-1 Chebyshev center.
+        :rtype: numpy.ndarray
+        """
+        return self._cached('center',
+                            reduced_input,
+                            self._solve_chebyshev_center,
+                            valid=self._is_interior)
+
+    def _is_interior(self, reduced_input, inactive):
+        """
+        Check if a point lies in the interior of the polytope of the inactive
+        variables that correspond to the given `reduced_input`.
 
-        # Get an initial feasible point using the Chebyshev center. Huge props
-        # to David Gleich for the Chebyshev center.
+        :param numpy.ndarray reduced_input: the value of the active variables.
+        :param numpy.ndarray inactive: the value of the inactive variables.
+        :return: True if all the constraints hold strictly.
+        :rtype: bool
+        """
+        A, b = self._compute_A_b(reduced_input)
+        return bool(np.all(np.dot(A, inactive.reshape(-1, 1)) > b))
+
+    def _solve_chebyshev_center(self, reduced_input):
+        """
+        Compute the Chebyshev center of the polytope of the inactive variables,
+        that is the center of the largest ball inside the polytope. Huge props
+        to David Gleich for the Chebyshev center.
+
+        :param numpy.ndarray reduced_input: the value of the active variables.
+        :return: the (inactive_dim)-by-1 Chebyshev center.
+        :rtype: numpy.ndarray
+        """
+        m, n = self.W1.shape
+        inactive_dim = self.W2.shape[1]
         s = np.dot(self.W1, reduced_input).reshape((m, 1))
         normW2 = np.sqrt(np.sum(np.power(self.W2, 2), axis=1)).reshape((m, 1))
         A = np.hstack((np.vstack(
@@ -227,51 +1133,82 @@ class ActiveSubspaces(Subspaces):
         c[-1] = -1.0
 
         zc = linear_program_ineq(c, -1 * A, -b)
-        z0 = zc[:-1].reshape((inactive_dim, 1))
+        return zc[:-1].reshape((inactive_dim, 1))
 
-        # define the polytope A >= b
-        A, b = self._compute_A_b(reduced_input)
+    def _hit_and_run_inactive_batch(self,
+                                    reduced_inputs,
+                                    n_points,
+                                    burn_in=10,
+                                    thinning=1,
+                                    n_chains=None):
+        """
+        A hit and run method that advances in lockstep independent chains for
+        all the reduced inputs.
 
-        # tolerance
-        eps0 = 1e-6 / 4.0
-
-        Z = np.zeros((n_points, inactive_dim))
-        for i in range(n_points):
-            # random direction
-            bad_dir = True
-            count, maxcount = 0, 50
-            while bad_dir:
-                d = np.random.normal(size=(inactive_dim, 1))
-                bad_dir = np.any(np.dot(A, z0 + eps0 * d) <= b)
-                count += 1
-                if count >= maxcount:
-                    Z[i:, :] = np.tile(z0, (1, n_points - i)).T
-                    return Z
-
-            # find constraints that impose lower and upper bounds on eps
-            f, g = b - np.dot(A, z0), np.dot(A, d)
-
-            # find an upper bound on the step
-            min_ind = np.logical_and(g <= 0,
-                                     f < -np.sqrt(np.finfo(np.float).eps))
-            eps_max = np.amin(f[min_ind] / g[min_ind])
-
-            # find a lower bound on the step
-            max_ind = np.logical_and(g > 0,
-                                     f < -np.sqrt(np.finfo(np.float).eps))
-            eps_min = np.amax(f[max_ind] / g[max_ind])
-
-            # randomly sample eps
-            eps1 = np.random.uniform(eps_min, eps_max)
-
-            # take a step along d
-            z1 = z0 + eps1 * d
-            Z[i, :] = z1.reshape(-1, )
-
-            # update temp var
-            z0 = z1.copy()
+        All the chains of a reduced input start from the Chebyshev center of
+        its polytope. At each step every chain moves along a random direction
+        to a point drawn uniformly in the chord of the polytope, whose ends
+        are computed at once for all the chains. After `burn_in` steps, a
+        sample is taken from each chain every `thinning` steps until
+        `n_points` samples are collected.
 
-        return Z
+        :param numpy.ndarray reduced_inputs: n_samples-by-dim matrix that
+            contains points in the space of active variables.
+        :param int n_points: the number of inactive variable samples for each
+            reduced input.
+        :param int burn_in: number of steps of each chain before the first
+            sample is taken. Default is 10.
+        :param int thinning: number of steps between two consecutive samples
+            of the same chain. Default is 1.
+        :param int n_chains: number of chains for each reduced input. Default
+            is None, that is one chain for each sample.
+        :return: n_samples-by-n_points-by-(inactive_dim) array that contains
+            values of the inactive variable that correspond to each reduced
+            input.
+        :rtype: numpy.ndarray
+        """
+        n_samples = reduced_inputs.shape[0]
+        inactive_dim = self.W2.shape[1]
+        if n_chains is None:
+            n_chains = n_points
+        n_chains = min(n_chains, n_points)
+
+        # define the polytopes A * z >= b
+        A = np.vstack((self.W2, -1 * self.W2))
+        s = np.dot(reduced_inputs, self.W1.T)
+        b = np.hstack((-1 - s, -1 + s))[:, np.newaxis, :]
+
+        z0 = np.array([
+            self._chebyshev_center(reduced_input).reshape(-1)
+            for reduced_input in reduced_inputs
+        ])
+        Z = np.tile(z0[:, np.newaxis, :], (1, n_chains, 1))
+
+        samples = []
+        n_rounds = -(-n_points // n_chains)
+        for step in range(burn_in + (n_rounds - 1) * thinning + 1):
+            d = np.random.normal(size=Z.shape)
+            d /= np.linalg.norm(d, axis=2, keepdims=True)
+
+            # constraints are g * eps >= f along the direction d
+            f = np.minimum(b - np.matmul(Z, A.T), 0.)
+            g = np.matmul(d, A.T)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = f / g
+            eps_min = np.amax(np.where(g > 0, ratio, -np.inf), axis=2)
+            eps_max = np.amin(np.where(g < 0, ratio, np.inf), axis=2)
+            eps_min, eps_max = np.minimum(eps_min, 0.), np.maximum(eps_max, 0.)
+
+            # take a uniform step along the chord
+            eps = eps_min + (eps_max - eps_min) * np.random.uniform(
+                size=eps_min.shape)
+            Z = Z + eps[:, :, np.newaxis] * d
+
+            if step >= burn_in and (step - burn_in) % thinning == 0:
+                samples.append(Z)
+
+        return np.concatenate(samples, axis=1)[:, :n_points, :].reshape(
+            n_samples, n_points, inactive_dim)
 
     def _rotate_x(self, reduced_inputs, inactive_inputs):
         """
@@ -296,3 +1233,45 @@ class ActiveSubspaces(Subspaces):
         inputs = np.dot(YZ, self.evects.T).reshape((N * NY, m))
         indices = np.kron(np.arange(NY), np.ones(N)).reshape((N * NY, 1))
         return inputs, indices
+
+
+_backward_worker = None
+
+
+def _init_backward_worker(W1, W2):
+    """
+    Initialize a process of the pool of `ActiveSubspaces.backward` with the
+    active and inactive eigenvectors, which are then shared by all the tasks
+    of the process.
+
+    :param numpy.ndarray W1: n_params-by-dim active eigenvectors.
+    :param numpy.ndarray W2: n_params-by-(n_params - dim) inactive
+        eigenvectors.
+    """
+    global _backward_worker
+    _backward_worker = ActiveSubspaces()
+    _backward_worker.dim = W1.shape[1]
+    _backward_worker.W1, _backward_worker.W2 = W1, W2
+    _backward_worker._orthogonal = ActiveSubspaces._is_orthogonal(W1, W2)
+
+
+def _sample_inactive_shard(reduced_inputs, seed, **kwargs):
+    """
+    Sample the inactive variables of a shard of reduced inputs in a process
+    initialized by `_init_backward_worker`.
+
+    :param numpy.ndarray reduced_inputs: the reduced inputs of the shard.
+    :param numpy.ndarray seed: seed of the global numpy random state.
+    :param kwargs: the other arguments of
+        `ActiveSubspaces._sample_inactive_batch`.
+    :return: the inactive variables of the shard, and the statistics of its
+        rejection sampling.
+    :rtype: numpy.ndarray, dict
+    """
+    np.random.seed(seed)
+    worker = _backward_worker
+    # a new solver, so that the boxes do not depend on the previous shards
+    worker._box_solver = None
+    worker.sampling_stats = dict.fromkeys(worker.sampling_stats, 0)
+    Z = worker._sample_inactive_batch(reduced_inputs, **kwargs)
+    return Z, worker.sampling_stats
@@ -0,0 +1,144 @@
+"""
+Module for the sufficient statistics of the covariance matrix of the
+gradients.
+"""
+import copy
+import numpy as np
+from .subspaces import Subspaces
+
+
+class CovarianceAccumulator(object):
+    """
+    Accumulator of the sufficient statistics needed to build the covariance
+    matrix of the gradients: the weighted sum of the outer products of the
+    gradients, the sum of the weights, and the number of samples. Two
+    accumulators built from different samples can be merged exactly, so the
+    gradients can be processed on different workers and only the
+    n_params-by-n_params statistics have to be reduced.
+
+    :param int n_params: number of input parameters.
+    :param numpy.ndarray metric: output_dim-by-output_dim matrix representing
+        the metric in the output space for vectorial active subspaces.
+        Default is None.
+
+    :Example:
+
+        >>> from athena import ActiveSubspaces, CovarianceAccumulator
+        >>> import numpy as np
+        >>> acc1 = CovarianceAccumulator(n_params=4)
+        >>> acc1.update(np.random.uniform(-1, 1, (100, 4)))
+        >>> acc2 = CovarianceAccumulator(n_params=4)
+        >>> acc2.update(np.random.uniform(-1, 1, (50, 4)))
+        >>> ss = ActiveSubspaces()
+        >>> ss.decompose(acc1 + acc2)
+    """
+    def __init__(self, n_params, metric=None):
+        self.n_params = n_params
+        self.metric = metric
+        self.cov_sum = np.zeros((n_params, n_params))
+        self.weights_sum = 0.
+        self.n_samples = 0
+
+    @property
+    def cov_matrix(self):
+        """
+        Get the covariance matrix normalized by the sum of the weights.
+
+        :return: the n_params-by-n_params covariance matrix.
+        :rtype: numpy.ndarray
+        :raises: ValueError
+        """
+        if self.n_samples == 0:
+            raise ValueError('No gradients have been accumulated.')
+        return self.cov_sum / self.weights_sum
+
+    def update(self, gradients, weights=None, block_size=1000):
+        """
+        Add the contribution of a batch of gradients to the statistics.
+
+        :param numpy.ndarray gradients: n_samples-by-n_params or
+            n_samples-by-output_dim-by-n_params matrix containing the gradient
+            samples oriented as rows.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector. If None,
+            unitary weights are used.
+        :param int block_size: number of samples processed at once when the
+            covariance matrix is assembled. Default is 1000.
+        :raises: ValueError
+        """
+        if gradients.shape[-1] != self.n_params:
+            raise ValueError(
+                'The number of parameters of the gradients ({}) does not '
+                'match the accumulator ones ({}).'.format(
+                    gradients.shape[-1], self.n_params))
+        if weights is None:
+            weights = np.ones((gradients.shape[0], 1))
+
+        metric = self.metric
+        if len(gradients.shape) == 3 and metric is None:
+            metric = np.diag(np.ones(gradients.shape[1]))
+
+        self.cov_sum += Subspaces._assemble_cov_matrix(gradients,
+                                                       weights,
+                                                       metric=metric,
+                                                       block_size=block_size)
+        self.weights_sum += np.sum(weights)
+        self.n_samples += gradients.shape[0]
+
+    def merge(self, other):
+        """
+        Merge in place the statistics of another accumulator.
+
+        :param CovarianceAccumulator other: the accumulator to merge.
+        :return: the updated accumulator.
+        :rtype: CovarianceAccumulator
+        :raises: ValueError
+        """
+        if other.n_params != self.n_params:
+            raise ValueError(
+                'Cannot merge accumulators with different number of '
+                'parameters: {} and {}.'.format(self.n_params, other.n_params))
+        if (other.metric is None) != (self.metric is None) or (
+                self.metric is not None
+                and not np.array_equal(other.metric, self.metric)):
+            raise ValueError('Cannot merge accumulators with different metrics.')
+
+        self.cov_sum += other.cov_sum
+        self.weights_sum += other.weights_sum
+        self.n_samples += other.n_samples
+        return self
+
+    def __add__(self, other):
+        return copy.deepcopy(self).merge(other)
+
+    def save(self, outfile):
+        """
+        Save the statistics for future merging or decomposition.
+
+        :param str outfile: filename of the accumulator to save. The .npz
+            extension is appended if not present.
+        """
+        arrays = {
+            'cov_sum': self.cov_sum,
+            'weights_sum': self.weights_sum,
+            'n_samples': self.n_samples
+        }
+        if self.metric is not None:
+            arrays['metric'] = self.metric
+        np.savez(outfile, **arrays)
+
+    @classmethod
+    def load(cls, infile):
+        """
+        Load the statistics saved with the `save` method.
+
+        :param str infile: filename of the saved accumulator.
+        :return: the loaded accumulator.
+        :rtype: CovarianceAccumulator
+        """
+        with np.load(infile) as data:
+            metric = data['metric'] if 'metric' in data else None
+            accumulator = cls(data['cov_sum'].shape[0], metric=metric)
+            accumulator.cov_sum = data['cov_sum']
+            accumulator.weights_sum = float(data['weights_sum'])
+            accumulator.n_samples = int(data['n_samples'])
+        return accumulator
@@ -1,6 +1,9 @@
 """
 Module for the feature map class.
 """
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
 from scipy.optimize import brute, dual_annealing
 from .projection_factory import ProjectionFactory
@@ -57,7 +60,66 @@ class FeatureMap(object):
         return self.fmap_jac(inputs, self._pr_matrix, self.bias,
                              self.n_features, self.sigma_f)
 
-    def tune_pr_matrix(self, func, bounds, args=(), method=None, maxiter=50):
+    def compute_fmap_and_jac(self, inputs, jac_diag=False):
+        """
+        Compute the feature map and its jacobian together. For the random
+        Fourier features the projection of the inputs is computed once, and
+        both the cosines and the sines are derived from it; for other feature
+        maps `self.compute_fmap` and `self.compute_fmap_jac` are called.
+
+        :param numpy.ndarray inputs: n_samples-by-input_dim inputs.
+        :param bool jac_diag: if True the diagonal scalings of
+            `self.compute_fmap_jac_diag` are returned instead of the jacobian.
+            Default is False.
+        :return: n_samples-by-n_features features; the
+            n_samples-by-n_features-by-input_dim jacobian, or its
+            n_samples-by-n_features diagonal scalings.
+        :rtype: numpy.ndarray, numpy.ndarray
+        :raises: ValueError
+        """
+        if self._pr_matrix is None:
+            self._pr_matrix = self._compute_pr_matrix()
+        if self.fmap is not rff_map or self.fmap_jac is not rff_jac:
+            jac = (self.compute_fmap_jac_diag(inputs)
+                   if jac_diag else self.compute_fmap_jac(inputs))
+            return self.compute_fmap(inputs), jac
+
+        fmap, diag = rff_map_and_jac_diag(inputs, self._pr_matrix, self.bias,
+                                          self.n_features, self.sigma_f)
+        if jac_diag:
+            return fmap, diag
+        return fmap, diag[:, :, np.newaxis] * np.asarray(self._pr_matrix,
+                                                         dtype=diag.dtype)
+
+    def compute_fmap_jac_diag(self, inputs):
+        """
+        Compute the diagonal scalings of the projection matrix that give the
+        jacobian of the random Fourier features, without forming the
+        jacobian: `compute_fmap_jac(inputs)[i]` is
+        `compute_fmap_jac_diag(inputs)[i].reshape(-1, 1) * pr_matrix`.
+
+        :param numpy.ndarray inputs: n_samples-by-input_dim inputs.
+        :return: n_samples-by-n_features scalings.
+        :rtype: numpy.ndarray
+        :raises: ValueError
+        """
+        if self.fmap_jac is not rff_jac:
+            raise ValueError('The jacobian is not the one of the random '
+                             'Fourier features.')
+        if self._pr_matrix is None:
+            self._pr_matrix = self._compute_pr_matrix()
+        return rff_jac_diag(inputs, self._pr_matrix, self.bias,
+                            self.n_features, self.sigma_f)
+
+    def tune_pr_matrix(self,
+                       func,
+                       bounds,
+                       args=(),
+                       method=None,
+                       maxiter=50,
+                       n_jobs=None,
+                       decimals=None,
+                       cache=None):
         """
         TO DOC
         ADD EXAMPLE for bounds
@@ -81,29 +143,84 @@ class FeatureMap(object):
             strategy applied.
         :param int maxiter: the maximum number of global search iterations.
             Default value is 50.
+        :param int n_jobs: number of processes evaluating the objective
+            function. With 'brute' the points of the grid are evaluated
+            concurrently; with 'dual_annealing', whose candidates depend on
+            the previous ones, `n_jobs` independent chains are run
+            concurrently, seeded from the global numpy random state, and the
+            best minimum is kept. The `maxiter` iterations are split among the
+            chains, so that the whole search performs about as many
+            evaluations as a single chain, each chain being shorter. If -1 all
+            the available cores are used. If None
+            the search runs in the current process. `func` and `args` must be
+            picklable when more than one process is used. Default is None.
+        :param int decimals: if not None the values of the objective function
+            are memoized, keyed on the parameters rounded to `decimals`
+            decimals, so that each rounded point is evaluated once. Default
+            is None.
+        :param dict cache: memo of the values of the objective function,
+            updated in place. It can be passed to following calls with the
+            same objective function to reuse its values. If None a new memo
+            is used. Ignored if `decimals` is None. Default is None.
         :raises: ValueError
+
+        .. note:: The objective function usually draws a new projection
+            matrix, so its values are random: memoized values are the ones of
+            the first evaluation of each rounded point.
         """
         if method is None:
             if len(self.params) < 4:
                 method = 'brute'
             else:
                 method = 'dual_annealing'
-
-        if method == 'brute':
-            self.params = brute(func=func,
-                                ranges=bounds,
-                                args=args,
-                                finish=None)
-        elif method == 'dual_annealing':
-            bounds_list = [[bound.start, bound.stop] for bound in bounds]
-            self.params = dual_annealing(func=func,
-                                         bounds=bounds_list,
-                                         args=args,
-                                         maxiter=maxiter,
-                                         no_local_search=True).x
-        else:
+        if method not in ('brute', 'dual_annealing'):
             raise ValueError(
                 "Method argument can only be 'brute' or 'dual_annealing'.")
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+        if decimals is None:
+            cache = None
+        elif cache is None:
+            cache = {}
+
+        executor = None
+        if n_jobs is not None and n_jobs > 1:
+            executor = ProcessPoolExecutor(max_workers=n_jobs)
+        try:
+            if method == 'brute':
+                self.params = brute(func=func,
+                                    ranges=bounds,
+                                    args=args,
+                                    finish=None,
+                                    workers=partial(_map_objective,
+                                                    executor=executor,
+                                                    n_jobs=n_jobs,
+                                                    decimals=decimals,
+                                                    cache=cache))
+            else:
+                bounds_list = [[bound.start, bound.stop] for bound in bounds]
+                anneal = partial(_anneal,
+                                 func,
+                                 bounds_list,
+                                 args=args,
+                                 decimals=decimals,
+                                 cache=cache)
+                if executor is None:
+                    self.params = anneal(maxiter=maxiter)[0]
+                else:
+                    anneal = partial(anneal, maxiter=-(-maxiter // n_jobs))
+                    seeds = np.random.SeedSequence(
+                        np.random.randint(np.iinfo(np.int32).max)).spawn(
+                            n_jobs)
+                    chains = list(executor.map(anneal, seeds))
+                    for _, _, chain_cache in chains:
+                        if cache is not None:
+                            for key, value in chain_cache.items():
+                                cache.setdefault(key, value)
+                    self.params = min(chains, key=lambda chain: chain[1])[0]
+        finally:
+            if executor is not None:
+                executor.shutdown()
         self._pr_matrix = self._compute_pr_matrix()
 
 
@@ -111,16 +228,156 @@ def rff_map(inputs, pr_matrix, bias, n_features, sigma_f):
     """
     Random Fourier Features
     TO DOC
+
+    The features are computed in the precision of the inputs, so single
+    precision inputs give single precision features.
     """
-    return np.sqrt(
-        4 / n_features) * sigma_f * np.cos(np.dot(inputs, pr_matrix.T) + bias)
+    dtype = np.result_type(inputs, np.float32)
+    pr_matrix = np.asarray(pr_matrix, dtype=dtype)
+    coeff = dtype.type(np.sqrt(4 / n_features) * sigma_f)
+    return coeff * np.cos(
+        np.dot(inputs, pr_matrix.T) + np.asarray(bias, dtype=dtype))
 
 
 def rff_jac(inputs, pr_matrix, bias, n_features, sigma_f):
     """
     Random Fourier Features jacobian
     TO DOC
+
+    The jacobian is computed in the precision of the inputs, so single
+    precision inputs give a single precision jacobian.
+    """
+    dtype = np.result_type(inputs, np.float32)
+    pr_matrix = np.asarray(pr_matrix, dtype=dtype)
+    coeff = dtype.type(-np.sqrt(2 / n_features) * sigma_f)
+    return (coeff *
+            np.sin(np.dot(inputs, pr_matrix.T) +
+                   np.asarray(bias, dtype=dtype))).reshape(
+                       inputs.shape[0], n_features, 1) * pr_matrix
+
+
+def rff_jac_diag(inputs, pr_matrix, bias, n_features, sigma_f):
+    """
+    Diagonal scalings of the projection matrix that give the Random Fourier
+    Features jacobian, that is `rff_jac` is
+    `rff_jac_diag(...)[:, :, numpy.newaxis] * pr_matrix`.
+    """
+    dtype = np.result_type(inputs, np.float32)
+    pr_matrix = np.asarray(pr_matrix, dtype=dtype)
+    coeff = dtype.type(-np.sqrt(2 / n_features) * sigma_f)
+    return coeff * np.sin(
+        np.dot(inputs, pr_matrix.T) + np.asarray(bias, dtype=dtype))
+
+
+def rff_map_and_jac_diag(inputs, pr_matrix, bias, n_features, sigma_f):
+    """
+    Random Fourier Features and the diagonal scalings of their jacobian
+    (see `rff_jac_diag`), computed from a single projection of the inputs.
+    """
+    dtype = np.result_type(inputs, np.float32)
+    pr_matrix = np.asarray(pr_matrix, dtype=dtype)
+    phase = np.dot(inputs, pr_matrix.T)
+    phase += np.asarray(bias, dtype=dtype)
+    fmap = dtype.type(np.sqrt(4 / n_features) * sigma_f) * np.cos(phase)
+    np.sin(phase, out=phase)
+    phase *= dtype.type(-np.sqrt(2 / n_features) * sigma_f)
+    return fmap, phase
+
+
+def _objective_key(x, decimals):
+    """
+    Key of the memo of the objective function of
+    `FeatureMap.tune_pr_matrix`: the parameters rounded to `decimals`
+    decimals.
+    """
+    return tuple(np.round(np.atleast_1d(x), decimals).tolist())
+
+
+def _map_objective(func,
+                   points,
+                   executor=None,
+                   n_jobs=1,
+                   decimals=None,
+                   cache=None):
+    """
+    Map-like callable evaluating the objective function over the grid of
+    `scipy.optimize.brute`. Only the points whose rounded parameters are not
+    in the memo are evaluated, each once, in the pool of processes if given.
+
+    :param callable func: the objective function of a single point.
+    :param iterable points: the points of the grid.
+    :param concurrent.futures.Executor executor: the pool evaluating the
+        objective function. If None it is evaluated in the current process.
+        Default is None.
+    :param int n_jobs: number of processes of the pool, used to split the
+        points in chunks. Default is 1.
+    :param int decimals: decimals of the keys of the memo. Default is None.
+    :param dict cache: memo of the values of the objective function, updated
+        in place. If None the values are not memoized. Default is None.
+    :return: the values of the objective function at the points.
+    :rtype: list
+    """
+    points = list(points)
+    if cache is None:
+        keys = range(len(points))
+        missing = dict(enumerate(points))
+        cache = {}
+    else:
+        keys = [_objective_key(point, decimals) for point in points]
+        missing = {}
+        for key, point in zip(keys, points):
+            if key not in cache:
+                missing.setdefault(key, point)
+
+    if executor is None:
+        values = map(func, missing.values())
+    else:
+        chunksize = max(1, len(missing) // (4 * n_jobs))
+        values = executor.map(func, missing.values(), chunksize=chunksize)
+    cache.update(zip(missing.keys(), values))
+    return [cache[key] for key in keys]
+
+
+def _anneal(func,
+            bounds,
+            seed=None,
+            args=(),
+            maxiter=50,
+            decimals=None,
+            cache=None):
+    """
+    Minimize the objective function of `FeatureMap.tune_pr_matrix` with a
+    chain of `scipy.optimize.dual_annealing` without local search.
+
+    :param callable func: the objective function.
+    :param list bounds: the lower and upper bounds of each parameter.
+    :param numpy.random.SeedSequence seed: seed of the chain. If None the
+        global numpy random state is used. Default is None.
+    :param tuple args: additional fixed parameters of the objective function.
+    :param int maxiter: the maximum number of global search iterations.
+        Default value is 50.
+    :param int decimals: decimals of the keys of the memo. Default is None.
+    :param dict cache: memo of the values of the objective function, updated
+        in place. If None the values are not memoized. Default is None.
+    :return: the minimum, the value of the objective function at the
+        minimum, and the memo.
+    :rtype: numpy.ndarray, float, dict
     """
-    return (np.sqrt(2 / n_features) * sigma_f *
-            (-1) * np.sin(np.dot(inputs, pr_matrix.T) + bias)).reshape(
-                inputs.shape[0], n_features, 1) * pr_matrix
+    objective = func
+    if cache is not None:
+
+        def objective(x, *args):
+            key = _objective_key(x, decimals)
+            if key not in cache:
+                cache[key] = func(x, *args)
+            return cache[key]
+
+    if seed is not None:
+        seed = np.random.default_rng(seed)
+    result = dual_annealing(func=objective,
+                            bounds=bounds,
+                            args=args,
+                            maxiter=maxiter,
+                            no_local_search=True,
+                            seed=seed)
+    return result.x, result.fun, cache
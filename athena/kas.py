@@ -9,10 +9,12 @@ Module for Kernel-based Active Subspaces.
       arxiv: https://arxiv.org/abs/2008.12083
 
 """
+from functools import partial
 import numpy as np
 from .subspaces import Subspaces
-from .utils import (initialize_weights, local_linear_gradients)
-from .feature_map import FeatureMap
+from .utils import (initialize_weights, local_linear_gradients, truncated_svd)
+from .feature_map import FeatureMap, rff_jac
+from .projection_factory import ProjectionFactory
 
 
 class KernelActiveSubspaces(Subspaces):
@@ -25,53 +27,426 @@ class KernelActiveSubspaces(Subspaces):
         self.features = None
         self.pseudo_gradients = None
 
-    def _reparametrize(self, inputs, gradients):
+    def _reparametrize(self,
+                       inputs,
+                       gradients,
+                       block_size=1000,
+                       jacobian_free=False):
         """
         Computes the pseudo-gradients solving an overdetermined linear system.
 
+        The systems of the samples are solved together with
+        `self._solve_pseudo_gradients`, in blocks of `block_size` samples so
+        that only the jacobians of one block are stored. With
+        `jacobian_free` the jacobians are never formed, and the systems are
+        solved with `self._solve_pseudo_gradients_diag`. The features of each
+        block are computed together with the jacobians by
+        `FeatureMap.compute_fmap_and_jac`.
+
         :param numpy.ndarray inputs: array n_samples-by-n_params containing
             the points in the original parameter space.
         :param numpy.ndarray gradients: array n_samples-by-n_params containing
             the gradient samples oriented as rows.
+        :param int block_size: number of samples whose jacobians are computed
+            at once. Default is 1000.
+        :param bool jacobian_free: if True, and the feature map is made of
+            random Fourier features with at least as many features as input
+            parameters, the jacobians are not formed. Default is False.
         :return: array n_samples-by-output_dim-by-n_params matrix containing
             the pseudo gradients corresponding to each sample.; array
             n_samples-by-n_features containing the image of the inputs in the feature space.
         :rtype: numpy.ndarray, numpy.ndarray
         """
         n_samples = inputs.shape[0]
+        gradients = gradients.reshape(n_samples, -1, inputs.shape[1])
+        jacobian_free = (jacobian_free and self.feature_map.fmap_jac is rff_jac
+                         and self.feature_map.n_features >= inputs.shape[1])
 
-        # Initialize Jacobian for each input
-        jacobian = self.feature_map.compute_fmap_jac(inputs)
+        pseudo_gradients, features = None, None
+        for start in range(0, n_samples, block_size):
+            inputs0 = inputs[start:start + block_size]
+            gradients0 = gradients[start:start + block_size]
+            features0, jacobian = self.feature_map.compute_fmap_and_jac(
+                inputs0, jac_diag=jacobian_free)
+            block = None
+            if jacobian_free:
+                pr_matrix = np.asarray(self.feature_map.pr_matrix,
+                                       dtype=jacobian.dtype)
+                try:
+                    block = self._solve_pseudo_gradients_diag(
+                        jacobian, pr_matrix, gradients0)
+                except np.linalg.LinAlgError:
+                    jacobian = jacobian[:, :, np.newaxis] * pr_matrix
+            if block is None:
+                block = self._solve_pseudo_gradients(jacobian, gradients0)
+            if pseudo_gradients is None:
+                pseudo_gradients = np.empty((n_samples, ) + block.shape[1:],
+                                            dtype=block.dtype)
+                features = np.empty((n_samples, ) + features0.shape[1:],
+                                    dtype=features0.dtype)
+            pseudo_gradients[start:start + block_size] = block
+            features[start:start + block_size] = features0
 
-        # Compute pseudo gradients
-        pseudo_gradients = np.array([
-            np.linalg.lstsq(jacobian[i, :, :].T,
-                            gradients[i, :, :].T,
-                            rcond=None)[0].T for i in range(n_samples)
-        ])
+        return pseudo_gradients, features
 
-        # Compute features
-        features = self.feature_map.compute_fmap(inputs)
+    @staticmethod
+    def _solve_pseudo_gradients(jacobian, gradients):
+        """
+        Solve in the least squares sense the linear systems
+        `jacobian[i].T * pseudo_gradients[i].T = gradients[i].T` of all the
+        samples at once, with the minimum norm solutions when the systems
+        are underdetermined, as `numpy.linalg.lstsq`.
 
-        return pseudo_gradients, features
+        The solutions are computed from the stacked QR factorizations of the
+        jacobians, or of their transposes if the features are less than the
+        input parameters. If some factor is singular the stacked
+        pseudo-inverses are used instead.
+
+        :param numpy.ndarray jacobian: n_samples-by-n_features-by-n_params
+            jacobians of the feature map.
+        :param numpy.ndarray gradients: n_samples-by-output_dim-by-n_params
+            gradients.
+        :return: n_samples-by-output_dim-by-n_features pseudo-gradients.
+        :rtype: numpy.ndarray
+        """
+        n_features, n_params = jacobian.shape[1:]
+        gradients_t = np.swapaxes(gradients, 1, 2)
+        try:
+            if n_features >= n_params:
+                Q, R = np.linalg.qr(jacobian)
+                Y = np.linalg.solve(np.swapaxes(R, 1, 2), gradients_t)
+                return np.matmul(np.swapaxes(Y, 1, 2), np.swapaxes(Q, 1, 2))
+            Q, R = np.linalg.qr(np.swapaxes(jacobian, 1, 2))
+            Y = np.linalg.solve(R, np.matmul(np.swapaxes(Q, 1, 2),
+                                             gradients_t))
+            return np.swapaxes(Y, 1, 2)
+        except np.linalg.LinAlgError:
+            return np.matmul(gradients, np.linalg.pinv(jacobian))
+
+    @staticmethod
+    def _solve_pseudo_gradients_diag(jac_diag,
+                                     pr_matrix,
+                                     gradients,
+                                     feature_chunk=None):
+        """
+        Compute the pseudo-gradients of `self._solve_pseudo_gradients` when
+        each jacobian is a diagonal scaling of the projection matrix,
+        `jacobian[i] = diag(jac_diag[i]) * pr_matrix`, as for the random
+        Fourier features, and there are at least as many features as input
+        parameters.
+
+        The jacobians are not formed: the minimum norm solutions are
+        `gradients[i] * inv(G[i]) * pr_matrix.T * diag(jac_diag[i])`, where
+        the n_params-by-n_params matrices
+        `G[i] = pr_matrix.T * diag(jac_diag[i]**2) * pr_matrix` of all the
+        samples are accumulated over chunks of features, each with a single
+        matrix product with the products of the couples of columns of the
+        chunk of the projection matrix. Since the normal equations are
+        solved, the conditioning of the systems is squared.
+
+        :param numpy.ndarray jac_diag: n_samples-by-n_features scalings.
+        :param numpy.ndarray pr_matrix: n_features-by-n_params projection
+            matrix.
+        :param numpy.ndarray gradients: n_samples-by-output_dim-by-n_params
+            gradients.
+        :param int feature_chunk: number of features whose products of
+            columns are formed at once. If None it is chosen so that the
+            products take as much memory as the projection matrix. Default is
+            None.
+        :return: n_samples-by-output_dim-by-n_features pseudo-gradients.
+        :rtype: numpy.ndarray
+        :raises: numpy.linalg.LinAlgError
+        """
+        n_samples, (n_features, n_params) = jac_diag.shape[0], pr_matrix.shape
+        rows, cols = np.triu_indices(n_params)
+        if feature_chunk is None:
+            feature_chunk = max(1, n_features * n_params // rows.size)
+        jac_diag2 = jac_diag**2
+        packed = np.zeros((n_samples, rows.size),
+                          dtype=np.result_type(jac_diag2, pr_matrix))
+        for start in range(0, n_features, feature_chunk):
+            pr_chunk = pr_matrix[start:start + feature_chunk]
+            packed += np.dot(jac_diag2[:, start:start + feature_chunk],
+                             pr_chunk[:, rows] * pr_chunk[:, cols])
+        gram = np.empty((n_samples, n_params, n_params), dtype=packed.dtype)
+        gram[:, rows, cols] = packed
+        gram[:, cols, rows] = packed
+        solutions = np.linalg.solve(gram, np.swapaxes(gradients, 1, 2))
+        return np.matmul(np.swapaxes(solutions, 1, 2),
+                         pr_matrix.T) * jac_diag[:, np.newaxis, :]
+
+    def _compute_bootstrap_ranges(self,
+                                  gradients,
+                                  weights,
+                                  method,
+                                  metric=None,
+                                  nboot=100,
+                                  block_size=1000,
+                                  n_components=None,
+                                  solver='full',
+                                  n_jobs=None,
+                                  seed=None,
+                                  max_dim=None):
+        """
+        Compute bootstrap ranges for eigenvalues and subspaces from the
+        pseudo-gradients.
+
+        With a truncated solver and a positive definite metric, the
+        pseudo-gradients are premultiplied by the factor of the metric once,
+        and each replicate is decomposed by
+        `self._decompose_bootstrap_replicate_svd` without assembling its
+        n_features-by-n_features covariance matrix. Otherwise the replicates
+        are decomposed as in `Subspaces._compute_bootstrap_ranges`. The
+        parameters are the ones of `Subspaces._compute_bootstrap_ranges`.
+
+        :param numpy.ndarray gradients: n_samples-by-output_dim-by-n_features
+            pseudo-gradients.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector.
+        :param str method: the method used to compute the gradients.
+        :param numpy.ndarray metric: metric matrix in the output space.
+        :param int nboot: number of bootstrap samples. Default is 100.
+        :param int block_size: number of samples processed at once when the
+            covariance matrices are assembled. Default is 1000.
+        :param int n_components: number of leading eigenpairs computed by the
+            truncated solvers.
+        :param str solver: solver used to decompose each replicate. Default
+            is 'full'.
+        :param int n_jobs: number of threads computing the replicates.
+            Default is None.
+        :param int seed: seed of the generators of the replicates. Default is
+            None.
+        :param int max_dim: largest dimension of the active subspaces whose
+            distances are estimated. Default is None.
+        """
+        if solver != 'full':
+            gradients = gradients.reshape(gradients.shape[0], -1,
+                                          gradients.shape[-1])
+            factor, signs = None, np.ones(gradients.shape[1])
+            if metric is not None:
+                factor, signs = self._metric_factor(metric)
+            if np.all(signs > 0):
+                if factor is not None:
+                    gradients = np.matmul(
+                        factor.astype(gradients.dtype, copy=False), gradients)
+                decompose_replicate = partial(
+                    self._decompose_bootstrap_replicate_svd,
+                    gradients,
+                    weights,
+                    n_components=n_components,
+                    solver=solver)
+                self._run_bootstrap(decompose_replicate, nboot, n_jobs, seed,
+                                    max_dim)
+                return
+        super()._compute_bootstrap_ranges(gradients,
+                                          weights,
+                                          method,
+                                          metric=metric,
+                                          nboot=nboot,
+                                          block_size=block_size,
+                                          n_components=n_components,
+                                          solver=solver,
+                                          n_jobs=n_jobs,
+                                          seed=seed,
+                                          max_dim=max_dim)
 
-    def forward(self, inputs):
+    @staticmethod
+    def _decompose_bootstrap_replicate_svd(gradients,
+                                           weights,
+                                           rng=None,
+                                           n_components=None,
+                                           solver='randomized'):
+        """
+        Draw a bootstrap replicate and compute its leading eigenpairs from the
+        truncated singular value decomposition of the reweighted
+        pseudo-gradients, that is of the rows of each sample scaled by the
+        square root of its weight times its multiplicity. The scalings are
+        applied inside the products of `truncated_svd`, so the resampled
+        pseudo-gradients are not copied.
+
+        :param numpy.ndarray gradients: n_samples-by-output_dim-by-n_features
+            pseudo-gradients, premultiplied by the factor of the metric.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector.
+        :param numpy.random.Generator rng: generator of the counts of the
+            replicate and of the random draws of the truncated solver. If None
+            the global numpy random state is used.
+        :param int n_components: number of leading eigenpairs to compute. One
+            more eigenpair is computed to estimate the spectral gap.
+        :param str solver: 'randomized' or 'lanczos'. Default is
+            'randomized'.
+        :return: the n_components + 1 sorted eigenvalues, and the
+            eigenvectors completed to an orthonormal basis.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        counts = Subspaces._bootstrap_counts(weights.shape[0], rng)
+        row_weights = np.repeat(np.sqrt(np.ravel(weights * counts)),
+                                gradients.shape[1])
+        n_evals = min(n_components + 1, gradients.shape[-1])
+        matrix = gradients.reshape(-1, gradients.shape[-1])
+        singular, evects = truncated_svd(matrix,
+                                         n_evals,
+                                         solver,
+                                         rng=rng,
+                                         row_weights=row_weights)
+        return singular**2, Subspaces._complete_basis(evects)
+
+    def _init_feature_map(self, inputs, n_features=None, feature_map=None):
+        """
+        Set the dimension of the feature space and the feature map.
+
+        :param numpy.ndarray inputs: array n_samples-by-n_params containing
+            the points in the original parameter space.
+        :param int n_features: dimension of the feature space. If None the
+            number of input parameters is used.
+        :param feature_map: feature map object. If None a random Fourier
+            features map with Gaussian spectral measure is used.
+        """
+        if n_features is None:
+            self.n_features = inputs.shape[1]
+        else:
+            self.n_features = n_features
+
+        if feature_map is None:
+            # default spectral measure is Gaussian
+            self.feature_map = FeatureMap(distr='multivariate_normal',
+                                          bias=np.ones((1, n_features)),
+                                          input_dim=inputs.shape[1],
+                                          n_features=n_features,
+                                          params=np.ones(inputs.shape[1]),
+                                          sigma_f=1)
+        else:
+            self.feature_map = feature_map
+
+    def _pseudo_gradient_blocks(self,
+                                inputs,
+                                gradients,
+                                weights=None,
+                                block_size=1000,
+                                dtype=None,
+                                jacobian_free=False):
+        """
+        Iterate over blocks of pseudo-gradients computed from memory-mapped
+        inputs and gradients.
+
+        :param numpy.ndarray inputs: array n_samples-by-n_params containing
+            the points in the original parameter space.
+        :param gradients: n_samples-by-n_params or
+            n_samples-by-output_dim-by-n_params array, memmap, or filename of a
+            .npy file containing the gradient samples oriented as rows.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector.
+        :param int block_size: number of samples of each block. Default is
+            1000.
+        :param numpy.dtype dtype: floating point type the blocks of inputs
+            and gradients are converted to. If None they are not converted.
+            Default is None.
+        :param bool jacobian_free: if True the jacobians of the random
+            Fourier features are not formed. Default is False.
+        :return: generator of the blocks of pseudo-gradients and of the
+            corresponding weights.
+        :rtype: generator
+        """
+        blocks = self._gradient_blocks(gradients, weights, block_size, dtype)
+        for start, (gradients0, weights0) in zip(
+                range(0, inputs.shape[0], block_size), blocks):
+            inputs0 = np.asarray(inputs[start:start + block_size], dtype=dtype)
+            gradients0 = gradients0.reshape(inputs0.shape[0], -1,
+                                            inputs0.shape[1])
+            yield self._reparametrize(inputs0, gradients0, block_size,
+                                      jacobian_free)[0], weights0
+
+    def _get_state(self):
+        """
+        Collect the arrays and the metadata that describe the fitted
+        subspace, together with the projection matrix, the bias and the
+        parameters of the feature map.
+
+        :return: the dictionary of the arrays to save, and the dictionary of
+            the JSON serializable metadata.
+        :rtype: dict, dict
+        """
+        arrays, metadata = super()._get_state()
+        metadata['n_features'] = self.n_features
+        if self.feature_map is not None:
+            fmap = self.feature_map
+            for name, array in (('pr_matrix', fmap.pr_matrix),
+                                ('bias', fmap.bias), ('params', fmap.params)):
+                if array is not None:
+                    arrays['feature_map_' + name] = np.asarray(array)
+            metadata['feature_map'] = {
+                'distr': getattr(fmap.distr, '__name__', None),
+                'input_dim': int(fmap.input_dim),
+                'n_features': int(fmap.n_features),
+                'sigma_f': float(fmap.sigma_f)
+            }
+        return arrays, metadata
+
+    def _set_state(self, arrays, metadata):
+        """
+        Restore the fitted subspace and the feature map from the arrays and
+        the metadata returned by `self._get_state`.
+
+        :param dict arrays: the saved arrays.
+        :param dict metadata: the saved metadata.
+
+        .. note:: Only the spectral distributions of `ProjectionFactory` are
+            restored. For custom distributions `self.feature_map.distr` is
+            None, and it has to be set again before tuning the projection
+            matrix. The saved projection matrix is used in any case.
+        """
+        super()._set_state(arrays, metadata)
+        self.n_features = metadata['n_features']
+        self.feature_map = None
+        if 'feature_map' in metadata:
+            fmap_metadata = metadata['feature_map']
+            distr = fmap_metadata['distr']
+            known_distr = distr in ProjectionFactory.projections
+            self.feature_map = FeatureMap(
+                distr=distr if known_distr else 'multivariate_normal',
+                bias=arrays.get('feature_map_bias'),
+                input_dim=fmap_metadata['input_dim'],
+                n_features=fmap_metadata['n_features'],
+                params=arrays.get('feature_map_params'),
+                sigma_f=fmap_metadata['sigma_f'])
+            if not known_distr:
+                self.feature_map.distr = None
+            self.feature_map._pr_matrix = arrays.get('feature_map_pr_matrix')
+
+    def forward(self,
+                inputs,
+                active_only=False,
+                chunk_size=10000,
+                out=None,
+                dtype=None):
         """
         Map full variables to active and inactive variables.
         Points in the original input space are mapped to the active and
-        inactive non-linear subspace.
+        inactive non-linear subspace. The features are computed in chunks of
+        `chunk_size` points, so the whole n_samples-by-n_features matrix is
+        never stored.
 
         :param numpy.ndarray inputs: array n_samples-by-n_params containing
-            the points in the original parameter space.
+            the points in the original parameter space. It can be a
+            `numpy.memmap`.
+        :param bool active_only: if True the inactive variables are not
+            computed and None is returned in their place. Default is False.
+        :param int chunk_size: number of points mapped at once. Default is
+            10000.
+        :param tuple out: arrays n_samples-by-active_dim and
+            n_samples-by-inactive_dim where the mapped variables are stored.
+            If None new arrays are allocated. Default is None.
+        :param numpy.dtype dtype: floating point type of the projection, for
+            example `numpy.float32`. Default is None, that is `self.dtype` if
+            set by `self.compute`, otherwise the type of the features.
         :return: array n_samples-by-active_dim containing the mapped active
             variables; array n_samples-by-inactive_dim containing the mapped
             inactive variables.
         :rtype: numpy.ndarray, numpy.ndarray
         """
-        features = self.feature_map.compute_fmap(inputs)
-        active = np.dot(features, self.W1)
-        inactive = np.dot(features, self.W2)
-        return active, inactive
+        return self._project(inputs,
+                             transform=self.feature_map.compute_fmap,
+                             active_only=active_only,
+                             chunk_size=chunk_size,
+                             out=out,
+                             dtype=dtype)
 
     def backward(self, reduced_inputs, n_points):
         pass
@@ -85,7 +460,15 @@ class KernelActiveSubspaces(Subspaces):
                 nboot=None,
                 n_features=None,
                 feature_map=None,
-                metric=None):
+                metric=None,
+                block_size=1000,
+                n_components=None,
+                solver=None,
+                n_jobs=None,
+                seed=None,
+                max_dim=None,
+                dtype=None,
+                jacobian_free=False):
         """
         Compute the kernel based active subspaces given the inputs and the
         gradients of the model function wrt the input parameters, or given the input/outputs
@@ -106,11 +489,83 @@ class KernelActiveSubspaces(Subspaces):
         :param feature_map: feature map object.
         :param numpy.ndarray metric: output_dim-byoutput-dim the matrix representing the metric
             in the output space
+        :param int block_size: number of samples processed at once when the
+            covariance matrix is assembled. Default is 1000.
+        :param int n_components: number of leading eigenpairs to compute. If
+            None the whole spectrum is computed. One more eigenpair is
+            computed to estimate the spectral gap. With a truncated solver
+            the bootstrap replicates are decomposed without assembling their
+            covariance matrices (see `self._compute_bootstrap_ranges`).
+        :param str solver: method used to decompose the covariance matrix
+            and the bootstrap replicates. Possible choices are 'full',
+            'randomized' and 'lanczos'. Default is None, that is 'full' if
+            `n_components` is None and 'randomized' otherwise.
+        :param int n_jobs: number of threads computing the bootstrap
+            replicates. If -1 all the available cores are used. Default is
+            None, that is serial execution.
+        :param int seed: seed of the independent generators of the bootstrap
+            replicates, and of the generator of the truncated solver. If
+            `seed` is given the eigenpairs and the bootstrap ranges are
+            reproducible and do not depend on the number of threads. Default
+            is None.
+        :param int max_dim: largest dimension of the active subspaces whose
+            bootstrap distances are estimated, so that `self.subs_br` has
+            max_dim rows. If None all the dimensions are considered. Default
+            is None.
+        :param numpy.dtype dtype: floating point type the inputs and the
+            gradients are converted to, for example `numpy.float32`. The
+            features, their jacobians and the pseudo-gradients are then
+            computed in this precision, while the covariance matrices are
+            accumulated and decomposed in double precision. The type is
+            stored in `self.dtype` and used by `self.forward`. If None the
+            inputs and the gradients are not converted. Default is None.
+        :param bool jacobian_free: if True the pseudo-gradients of the random
+            Fourier features are computed from the projection matrix and the
+            diagonal scalings of the jacobians, which are never formed (see
+            `self._solve_pseudo_gradients_diag`). It requires at least as
+            many features as input parameters, otherwise the jacobians are
+            formed block by block. Default is False.
         :raises: ValueError
+
+        .. note::
+            With the 'exact' method, `inputs` and `gradients` can also be the
+            filenames of .npy files or `numpy.memmap` arrays too large to fit
+            in memory. In this case the pseudo-gradients are computed and
+            accumulated in blocks of `block_size` samples with a single pass,
+            unitary weights are used if `weights` is None, and the
+            `pseudo_gradients` and `features` attributes are not stored.
         """
+        if solver is None:
+            solver = 'full' if n_components is None else 'randomized'
+        if solver not in ('full', 'randomized', 'lanczos'):
+            raise ValueError("solver argument can only be 'full', "
+                             "'randomized' or 'lanczos'.")
+        if solver != 'full' and n_components is None:
+            raise ValueError('n_components argument is None.')
+        self.dtype = None if dtype is None else np.dtype(dtype)
         if method == 'exact':
             if gradients is None or inputs is None:
                 raise ValueError('gradients or inputs argument is None.')
+            if self._is_streamed(gradients):
+                if isinstance(inputs, str):
+                    inputs = np.load(inputs, mmap_mode='r')
+                if not isinstance(gradients, (str, np.ndarray)):
+                    raise ValueError(
+                        'gradients must be an array, a memmap, or the '
+                        'filename of a .npy file.')
+                self._init_feature_map(inputs, n_features, feature_map)
+                blocks = self._pseudo_gradient_blocks(inputs, gradients,
+                                                      weights, block_size,
+                                                      dtype, jacobian_free)
+                self._compute_streaming(blocks,
+                                        metric=metric,
+                                        nboot=nboot,
+                                        block_size=block_size,
+                                        n_components=n_components,
+                                        solver=solver,
+                                        max_dim=max_dim)
+                self.pseudo_gradients, self.features = None, None
+                return
 
         if len(gradients.shape) == 2:
             gradients = gradients.reshape(gradients.shape[0], 1,
@@ -124,43 +579,42 @@ class KernelActiveSubspaces(Subspaces):
                                                outputs=outputs,
                                                weights=weights)
 
+        if dtype is not None:
+            inputs = np.asarray(inputs, dtype=dtype)
+            gradients = np.asarray(gradients, dtype=dtype)
+
         if weights is None or method == 'local':
             # use the new gradients to compute the weights, otherwise dimension
             # mismatch accours.
             weights = initialize_weights(gradients)
 
-        if n_features is None:
-            self.n_features = inputs.shape[1]
-        else:
-            self.n_features = n_features
-
-        if feature_map is None:
-            # default spectral measure is Gaussian
-            self.feature_map = FeatureMap(distr='multivariate_normal',
-                                          bias=np.ones((1, n_features)),
-                                          input_dim=inputs.shape[1],
-                                          n_features=n_features,
-                                          params=np.ones(inputs.shape[1]),
-                                          sigma_f=1)
-        else:
-            self.feature_map = feature_map
+        self._init_feature_map(inputs, n_features, feature_map)
 
         if metric is None:
             metric = np.diag(np.ones(gradients.shape[1]))
 
         self.pseudo_gradients, self.features = self._reparametrize(
-            inputs, gradients)
+            inputs, gradients, block_size, jacobian_free)
 
         self.evals, self.evects = self._build_decompose_cov_matrix(
-            self.pseudo_gradients, weights, method, metric)
+            self.pseudo_gradients,
+            weights,
+            method,
+            metric,
+            block_size=block_size,
+            n_components=n_components,
+            solver=solver,
+            rng=None if seed is None else np.random.default_rng(seed))
 
         if nboot:
-            if nboot <= 50:
-                self._compute_bootstrap_ranges(gradients=self.pseudo_gradients,
-                                               weights=weights,
-                                               method=method,
-                                               nboot=nboot,
-                                               metric=metric)
-            else:
-                raise ValueError(
-                    'nboot is too high for the bootstrap method applied to kas')
+            self._compute_bootstrap_ranges(gradients=self.pseudo_gradients,
+                                           weights=weights,
+                                           method=method,
+                                           nboot=nboot,
+                                           metric=metric,
+                                           block_size=block_size,
+                                           n_components=n_components,
+                                           solver=solver,
+                                           n_jobs=n_jobs,
+                                           seed=seed,
+                                           max_dim=max_dim)
@@ -12,9 +12,13 @@ Base module for Active Subspaces and Kernel-based Active Subspaces.
       arxiv: https://arxiv.org/abs/2008.12083
 
 """
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import numpy as np
 import matplotlib.pyplot as plt
-from .utils import sort_eigpairs
+from .utils import sort_eigpairs, subspace_distances, truncated_svd
 plt.rcParams.update({'font.size': 16})
 
 
@@ -23,6 +27,8 @@ class Subspaces(object):
 
     [description]
     """
+    _format_version = 1
+
     def __init__(self):
         self.W1 = None
         self.W2 = None
@@ -32,17 +38,165 @@ class Subspaces(object):
         self.subs_br = None
         self.dim = None
         self.cov_matrix = None
+        self.dtype = None
+
+    @staticmethod
+    def _metric_factor(metric):
+        """
+        Factorize the metric matrix as `factor.T * diag(signs) * factor`.
+
+        The Cholesky factorization is used when the metric is positive
+        definite, otherwise the factor is recovered from its eigenpairs.
+
+        :param numpy.ndarray metric: output_dim-by-output_dim symmetric matrix
+            representing the metric in the output space.
+        :return: the output_dim-by-output_dim factor, and the output_dim
+            signs of the corresponding eigenvalues.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        try:
+            return np.linalg.cholesky(metric).T, np.ones(metric.shape[0])
+        except np.linalg.LinAlgError:
+            evals, evects = np.linalg.eigh(metric)
+            factor = np.sqrt(np.abs(evals)).reshape(-1, 1) * evects.T
+            return factor, np.sign(evals)
+
+    @staticmethod
+    def _assemble_cov_matrix(gradients, weights, metric=None, block_size=1000):
+        """
+        Assemble the covariance matrix of the gradients processing the samples
+        in blocks, so that the peak memory does not depend on the number of
+        samples.
+
+        For vectorial outputs each block of gradients is premultiplied by the
+        factor of the metric, and its contribution is added to the covariance
+        matrix with a single matrix product.
+
+        The products of each block are computed in the precision of the
+        gradients, so single precision gradients are never upcast, while the
+        contributions of the blocks are summed in double precision.
+
+        :param numpy.ndarray gradients: n_samples-by-n_params or
+            n_samples-by-output_dim-by-n_params matrix containing the gradient
+            samples oriented as rows.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector, corresponds
+            to numerical quadrature rule used to estimate matrix whose
+            eigenspaces define the active subspace.
+        :param numpy.ndarray metric: metric matrix for vectorial active
+            subspaces. If None the identity is used.
+        :param int block_size: number of samples processed at once. Default
+            is 1000.
+        :return: the n_params-by-n_params covariance matrix.
+        :rtype: numpy.ndarray
+        """
+        n_samples, n_pars = gradients.shape[0], gradients.shape[-1]
+        output_dim = gradients.shape[1] if len(gradients.shape) == 3 else 1
+        dtype = np.result_type(gradients.dtype, np.float32)
+
+        if metric is None:
+            factor, signs = None, np.ones(output_dim)
+        else:
+            factor, signs = Subspaces._metric_factor(metric)
+            factor = factor.astype(dtype, copy=False)
+
+        cov_matrix = np.zeros((n_pars, n_pars))
+        for start in range(0, n_samples, block_size):
+            block = np.asarray(gradients[start:start + block_size],
+                               dtype=dtype).reshape(-1, output_dim, n_pars)
+            if factor is not None:
+                block = np.matmul(factor, block)
+            scale = (weights[start:start + block_size].reshape(-1, 1) *
+                     signs).astype(dtype, copy=False)
+            block = block.reshape(-1, n_pars)
+            cov_matrix += np.dot(block.T, scale.reshape(-1, 1) * block)
+        return cov_matrix
+
+    @staticmethod
+    def _cov_matrix_trace(gradients, weights, metric=None, block_size=1000):
+        """
+        Compute the trace of the covariance matrix of the gradients without
+        assembling it, processing the samples in blocks.
+
+        :param numpy.ndarray gradients: n_samples-by-n_params or
+            n_samples-by-output_dim-by-n_params matrix containing the gradient
+            samples oriented as rows.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector.
+        :param numpy.ndarray metric: metric matrix for vectorial active
+            subspaces. If None the identity is used.
+        :param int block_size: number of samples processed at once. Default
+            is 1000.
+        :return: the trace of the covariance matrix.
+        :rtype: float
+        """
+        n_samples, n_pars = gradients.shape[0], gradients.shape[-1]
+        output_dim = gradients.shape[1] if len(gradients.shape) == 3 else 1
+
+        trace = 0.
+        for start in range(0, n_samples, block_size):
+            block = gradients[start:start + block_size].reshape(
+                -1, output_dim, n_pars)
+            product = block if metric is None else np.matmul(metric, block)
+            trace += np.sum(
+                weights[start:start + block_size].reshape(-1, 1, 1) * block *
+                product)
+        return trace
+
+    @staticmethod
+    def _complete_basis(evects):
+        """
+        Complete a set of orthonormal vectors to an orthonormal basis.
+
+        :param numpy.ndarray evects: n_params-by-k matrix with orthonormal
+            columns.
+        :return: n_params-by-n_params orthogonal matrix whose first k columns
+            are `evects`.
+        :rtype: numpy.ndarray
+        """
+        basis = np.linalg.qr(evects, mode='complete')[0]
+        basis[:, :evects.shape[1]] = evects
+        return basis
+
+    @staticmethod
+    def _decompose_cov_matrix(cov_matrix,
+                              n_components=None,
+                              solver='full',
+                              rng=None):
+        """
+        Decompose an assembled covariance matrix.
+
+        :param numpy.ndarray cov_matrix: n_params-by-n_params covariance
+            matrix.
+        :param int n_components: number of leading eigenpairs to compute when
+            a truncated solver is used. One more eigenpair is computed to
+            estimate the spectral gap.
+        :param str solver: 'full' to compute the whole spectrum, 'randomized'
+            or 'lanczos' to compute only the leading eigenpairs with
+            `truncated_svd`. Default is 'full'.
+        :param numpy.random.Generator rng: generator of the random draws of
+            the truncated solvers. If None the global numpy random state is
+            used. Default is None.
+        :return: the sorted eigenvalues, and the corresponding eigenvectors.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        if solver != 'full':
+            n_evals = min(n_components + 1, cov_matrix.shape[0])
+            evals, evects = truncated_svd(cov_matrix, n_evals, solver, rng=rng)
+            return evals, Subspaces._complete_basis(evects)
+        evals, evects = sort_eigpairs(cov_matrix)
+        return np.squeeze(evals), evects
 
     @staticmethod
     def _build_decompose_cov_matrix(gradients=None,
                                     weights=None,
                                     method=None,
-                                    metric=None):
+                                    metric=None,
+                                    block_size=1000,
+                                    n_components=None,
+                                    solver='full',
+                                    rng=None):
         """
         Build and decompose the covariance matrix of the gradients.
 
-        :param numpy.ndarray inputs: input parameters oriented as rows.
-        :param numpy.ndarray outputs: corresponding outputs oriented as rows.
         :param numpy.ndarray gradients: n_samples-by-n_params matrix containing the
             gradient samples oriented as rows.
         :param numpy.ndarray weights: n_samples-by-1 weight vector, corresponds
@@ -54,23 +208,46 @@ class Subspaces(object):
             method known sometimes as the outer product of gradient method. See the
             2001 paper 'Structure adaptive approach for dimension reduction' from
             Hristache, et al.
-        :return: the covariance matrix, the sorted eigenvalues, and the
-            corresponding eigenvectors.
-        :rtype: numpy.ndarray, numpy.ndarray, numpy.ndarray
+        :param numpy.ndarray metric: metric matrix for vectorial active
+            subspaces.
+        :param int block_size: number of samples processed at once when the
+            covariance matrix is assembled for vectorial outputs. Default is
+            1000.
+        :param int n_components: number of leading eigenpairs to compute when
+            a truncated solver is used. One more eigenpair is computed to
+            estimate the spectral gap.
+        :param str solver: 'full' to compute the whole spectrum, 'randomized'
+            or 'lanczos' to compute only the leading eigenpairs with
+            `truncated_svd`. Default is 'full'.
+        :param numpy.random.Generator rng: generator of the random draws of
+            the truncated solvers. If None the global numpy random state is
+            used. Default is None.
+        :return: the sorted eigenvalues, and the corresponding eigenvectors.
+        :rtype: numpy.ndarray, numpy.ndarray
+
+        .. note:: With a truncated solver only n_components + 1 eigenvalues
+            are returned, while the eigenvectors are completed to an
+            orthonormal basis of the parameter space whose trailing columns
+            span the orthogonal complement of the computed eigenvectors.
+
+        .. note:: Single precision gradients are not decomposed with the
+            singular value decomposition, which would be computed in single
+            precision: their covariance matrix is assembled in blocks and
+            decomposed in double precision.
         """
         if method == 'exact' or method == 'local':
-            if metric is not None:
-                cov_matrix = np.array(
-                    np.sum([
-                        weights[i, 0] *
-                        np.dot(gradients[i, :, :].T,
-                               np.dot(metric, gradients[i, :, :]))
-                        for i in range(gradients.shape[0])
-                    ],
-                           axis=0))
-                evals, evects = sort_eigpairs(cov_matrix)
-                return np.squeeze(evals), evects
+            if metric is not None or gradients.dtype == np.float32:
+                cov_matrix = Subspaces._assemble_cov_matrix(
+                    gradients, weights, metric, block_size)
+                return Subspaces._decompose_cov_matrix(cov_matrix,
+                                                       n_components,
+                                                       solver,
+                                                       rng=rng)
             X = np.squeeze(gradients * np.sqrt(weights).reshape(-1, 1))
+            if solver != 'full':
+                n_evals = min(n_components + 1, gradients.shape[-1])
+                singular, evects = truncated_svd(X, n_evals, solver, rng=rng)
+                return singular**2, Subspaces._complete_basis(evects)
             singular, evects = np.linalg.svd(X, full_matrices=False)[1:]
             evals = singular**2
             return evals, evects.T
@@ -80,19 +257,53 @@ class Subspaces(object):
                                   weights,
                                   method,
                                   metric=None,
-                                  nboot=100):
+                                  nboot=100,
+                                  block_size=1000,
+                                  n_components=None,
+                                  solver='full',
+                                  n_jobs=None,
+                                  seed=None,
+                                  max_dim=None):
         """Compute bootstrap ranges for eigenvalues and subspaces.
 
         An implementation of the nonparametric bootstrap that we use in
         conjunction with the subspace estimation methods to estimate the errors
         in the eigenvalues and subspaces.
 
+        Each replicate reweights the samples by the multiplicities returned by
+        `_bootstrap_counts` instead of copying the resampled gradients, and
+        its covariance matrix is assembled in blocks from the original array.
+
+        If `n_jobs` or `seed` are given, each replicate draws its counts from
+        an independent generator spawned from a `numpy.random.SeedSequence`,
+        and the replicates are distributed over a pool of threads. The
+        bootstrap ranges are then reproducible for a given seed whatever the
+        number of workers.
+
         :param numpy.ndarray gradients: n_samples-by-n_params matrix containing
             the gradient samples oriented as rows.
         :param numpy.ndarray weights: n_samples-by-1 weight vector, corresponds
             to numerical quadrature rule used to estimate matrix whose
             eigenspaces define the active subspace.
         :param int nboot: number of bootstrap samples. Default is 100.
+        :param int block_size: number of samples processed at once when the
+            covariance matrix is assembled for vectorial outputs. Default is
+            1000.
+        :param int n_components: number of leading eigenpairs computed by the
+            truncated solvers.
+        :param str solver: solver used to decompose the covariance matrix of
+            each replicate. Default is 'full'.
+        :param int n_jobs: number of threads computing the replicates. If -1
+            all the available cores are used. If None, and `seed` is None, the
+            replicates are computed serially with the global numpy random
+            state. Default is None.
+        :param int seed: entropy of the `numpy.random.SeedSequence` spawning
+            the generators of the replicates. If None, and `n_jobs` is not
+            None, it is drawn from the global numpy random state. Default is
+            None.
+        :param int max_dim: largest dimension of the active subspaces whose
+            distances are estimated. If None all the dimensions are
+            considered. Default is None.
         :return: array e_br is a m-by-2 matrix, first column contains
             bootstrap lower bound on eigenvalues, second column contains
             bootstrap upper bound on eigenvalues; array sub_br is a (m-1)-by-3
@@ -102,30 +313,280 @@ class Subspaces(object):
             estimated upper bound on subspace error.
         :rtype: numpy.ndarray, numpy.ndarray
         """
-        n_pars = gradients.shape[-1]
+        decompose_replicate = partial(self._decompose_bootstrap_replicate,
+                                      gradients,
+                                      weights,
+                                      metric=metric,
+                                      block_size=block_size,
+                                      n_components=n_components,
+                                      solver=solver)
+        self._run_bootstrap(decompose_replicate, nboot, n_jobs, seed, max_dim)
+
+    def _run_bootstrap(self,
+                       decompose_replicate,
+                       nboot,
+                       n_jobs=None,
+                       seed=None,
+                       max_dim=None):
+        """
+        Decompose the bootstrap replicates, serially or in a pool of threads,
+        and set the bootstrap ranges.
+
+        :param callable decompose_replicate: function that draws and
+            decomposes a replicate. It takes as argument the
+            `numpy.random.Generator` of the replicate, or no argument to use
+            the global numpy random state.
+        :param int nboot: number of bootstrap replicates.
+        :param int n_jobs: number of threads computing the replicates. If -1
+            all the available cores are used. If None, and `seed` is None, the
+            replicates are computed serially with the global numpy random
+            state. Default is None.
+        :param int seed: entropy of the `numpy.random.SeedSequence` spawning
+            the generators of the replicates. If None, and `n_jobs` is not
+            None, it is drawn from the global numpy random state. Default is
+            None.
+        :param int max_dim: largest dimension of the active subspaces whose
+            distances are estimated. If None all the dimensions are
+            considered. Default is None.
+        """
+        if n_jobs is None and seed is None:
+            replicates = (decompose_replicate() for _ in range(nboot))
+            self._set_bootstrap_ranges(replicates, nboot, max_dim)
+            return
+
+        if seed is None:
+            seed = np.random.randint(np.iinfo(np.int32).max)
+        if n_jobs is None:
+            n_jobs = 1
+        elif n_jobs == -1:
+            n_jobs = os.cpu_count()
+        rngs = [
+            np.random.default_rng(seed_seq)
+            for seed_seq in np.random.SeedSequence(seed).spawn(nboot)
+        ]
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            self._set_bootstrap_ranges(executor.map(decompose_replicate, rngs),
+                                       nboot, max_dim)
+
+    @staticmethod
+    def _decompose_bootstrap_replicate(gradients,
+                                       weights,
+                                       rng=None,
+                                       metric=None,
+                                       block_size=1000,
+                                       n_components=None,
+                                       solver='full'):
+        """
+        Draw a bootstrap replicate and decompose its covariance matrix.
+
+        :param numpy.ndarray gradients: n_samples-by-n_params or
+            n_samples-by-output_dim-by-n_params matrix containing the gradient
+            samples oriented as rows.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector.
+        :param numpy.random.Generator rng: generator of the counts of the
+            replicate and of the random draws of the truncated solvers. If
+            None the global numpy random state is used.
+        :param numpy.ndarray metric: metric matrix for vectorial active
+            subspaces.
+        :param int block_size: number of samples processed at once when the
+            covariance matrix is assembled. Default is 1000.
+        :param int n_components: number of leading eigenpairs computed by the
+            truncated solvers.
+        :param str solver: solver used to decompose the covariance matrix.
+            Default is 'full'.
+        :return: the sorted eigenvalues, and the corresponding eigenvectors.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        counts = Subspaces._bootstrap_counts(weights.shape[0], rng)
+        cov_matrix = Subspaces._assemble_cov_matrix(gradients,
+                                                    weights * counts,
+                                                    metric=metric,
+                                                    block_size=block_size)
+        return Subspaces._decompose_cov_matrix(cov_matrix,
+                                               n_components,
+                                               solver,
+                                               rng=rng)
+
+    def _set_bootstrap_ranges(self, replicates, nboot, max_dim=None):
+        """
+        Set the bootstrap ranges for eigenvalues and subspaces from the
+        decompositions of the bootstrap replicates.
+
+        :param iterable replicates: the sorted eigenvalues and the
+            corresponding eigenvectors of each bootstrap replicate.
+        :param int nboot: number of bootstrap replicates.
+        :param int max_dim: largest dimension of the active subspaces whose
+            distances are estimated. If None all the dimensions are
+            considered.
+        """
+        n_pars = self.evals.shape[0]
+        n_dist = n_pars - 1 if max_dim is None else min(max_dim, n_pars - 1)
         e_boot = np.zeros((n_pars, nboot))
-        sub_dist = np.zeros((n_pars - 1, nboot))
-
-        for i in range(nboot):
-            gradients0, weights0 = self._bootstrap_replicate(gradients, weights)
-            e0, W0 = self._build_decompose_cov_matrix(gradients=gradients0,
-                                                      weights=weights0,
-                                                      method=method,
-                                                      metric=metric)
-            e_boot[:, i] = e0.reshape((n_pars, ))
-            for j in range(n_pars - 1):
-                sub_dist[j, i] = np.linalg.norm(np.dot(self.evects[:, :j + 1].T,
-                                                       W0[:, j + 1:]),
-                                                ord=2)
+        sub_dist = np.zeros((n_dist, nboot))
+
+        for i, (e0, W0) in enumerate(replicates):
+            e_boot[:, i] = np.ravel(e0)[:n_pars]
+            sub_dist[:, i] = subspace_distances(self.evects, W0, n_dist)
 
         # bootstrap ranges for the eigenvalues
         self.evals_br = np.hstack((np.amin(e_boot, axis=1).reshape(
             (n_pars, 1)), np.amax(e_boot, axis=1).reshape((n_pars, 1))))
         # bootstrap ranges and mean for subspace distance
         self.subs_br = np.hstack((np.amin(sub_dist, axis=1).reshape(
-            (n_pars - 1, 1)), np.mean(sub_dist, axis=1).reshape(
-                (n_pars - 1, 1)), np.amax(sub_dist, axis=1).reshape(
-                    (n_pars - 1, 1))))
+            (n_dist, 1)), np.mean(sub_dist, axis=1).reshape(
+                (n_dist, 1)), np.amax(sub_dist, axis=1).reshape((n_dist, 1))))
+
+    @staticmethod
+    def _is_streamed(gradients):
+        """
+        Check if the gradients have to be streamed in blocks instead of being
+        processed as an in-memory array.
+
+        :param gradients: the source of the gradients.
+        :return: True if `gradients` is a filename, a `numpy.memmap`, or an
+            iterable of chunks.
+        :rtype: bool
+        """
+        return isinstance(gradients, (str, np.memmap)) or not isinstance(
+            gradients, np.ndarray)
+
+    @staticmethod
+    def _gradient_blocks(gradients, weights=None, block_size=1000,
+                         dtype=None):
+        """
+        Iterate over blocks of samples of a streamed source of gradients.
+
+        :param gradients: the source of the gradients. It can be the filename
+            of a .npy file, which is memory-mapped, a `numpy.memmap` or any
+            other array that is sliced in blocks of `block_size` samples, or
+            an iterable of chunks of gradients or of (gradients, weights)
+            tuples.
+        :param numpy.ndarray weights: n_samples-by-1 weight vector sliced
+            along with an array source. Ignored for iterable sources.
+        :param int block_size: number of samples of each block. Default is
+            1000.
+        :param numpy.dtype dtype: floating point type the blocks of gradients
+            are converted to. If None they are not converted. Default is None.
+        :return: generator of the blocks of gradients and of the
+            corresponding weights, which are None if not provided.
+        :rtype: generator
+        """
+        if isinstance(gradients, str):
+            gradients = np.load(gradients, mmap_mode='r')
+
+        if isinstance(gradients, np.ndarray):
+            for start in range(0, gradients.shape[0], block_size):
+                weights0 = None if weights is None else np.asarray(
+                    weights[start:start + block_size])
+                yield np.asarray(gradients[start:start + block_size],
+                                 dtype=dtype), weights0
+        else:
+            for chunk in gradients:
+                if isinstance(chunk, tuple):
+                    yield np.asarray(chunk[0],
+                                     dtype=dtype), np.asarray(chunk[1])
+                else:
+                    yield np.asarray(chunk, dtype=dtype), None
+
+    def _compute_streaming(self,
+                           blocks,
+                           metric=None,
+                           nboot=100,
+                           block_size=1000,
+                           n_components=None,
+                           solver='full',
+                           max_dim=None):
+        """
+        Compute the active subspace and the bootstrap ranges with a single
+        pass over blocks of gradients, so that only one block at a time is
+        kept in memory.
+
+        As in the in-memory computation, the given weights are used as they
+        are, while without weights the covariance matrix is normalized by the
+        number of samples, as with the weights of `initialize_weights`. The
+        bootstrap replicates are accumulated along the pass with the Poisson
+        bootstrap: each sample enters each replicate with a multiplicity drawn
+        from a Poisson distribution of unitary mean, which does not require to
+        know the number of samples in advance. Each replicate is rescaled by
+        the ratio between the sum of the weights and the sum of its weights,
+        so that it is comparable with the covariance matrix.
+
+        :param iterable blocks: blocks of gradients and of the corresponding
+            weights, as returned by `self._gradient_blocks`.
+        :param numpy.ndarray metric: metric matrix for vectorial active
+            subspaces.
+        :param int nboot: number of bootstrap replicates. If None or 0 the
+            bootstrap ranges are not computed. Default is 100.
+        :param int block_size: number of samples processed at once when the
+            covariance matrix is assembled. Default is 1000.
+        :param int n_components: number of leading eigenpairs computed by the
+            truncated solvers.
+        :param str solver: solver used to decompose the covariance matrices.
+            Default is 'full'.
+        :param int max_dim: largest dimension of the active subspaces whose
+            distances are estimated. If None all the dimensions are
+            considered. Default is None.
+        :raises: ValueError
+        """
+        cov_matrix, weights_sum, weighted = 0., 0., False
+        boot_cov_matrices = [0.] * nboot if nboot else []
+        boot_weights_sum = np.zeros(len(boot_cov_matrices))
+        for gradients, weights in blocks:
+            if weights is None:
+                weights = np.ones((gradients.shape[0], 1))
+            else:
+                weighted = True
+            if len(gradients.shape) == 3 and metric is None:
+                metric = np.diag(np.ones(gradients.shape[1]))
+            cov_matrix += self._assemble_cov_matrix(gradients, weights, metric,
+                                                    block_size)
+            weights_sum += np.sum(weights)
+
+            counts = np.random.poisson(size=(len(boot_cov_matrices),
+                                             gradients.shape[0]))
+            for i, counts0 in enumerate(counts):
+                weights0 = weights * counts0.reshape(-1, 1)
+                boot_cov_matrices[i] += self._assemble_cov_matrix(
+                    gradients, weights0, metric, block_size)
+                boot_weights_sum[i] += np.sum(weights0)
+
+        if weights_sum == 0.:
+            raise ValueError('The source of the gradients is empty.')
+
+        scale = 1. if weighted else 1. / weights_sum
+        self.cov_matrix = cov_matrix * scale
+        self.evals, self.evects = self._decompose_cov_matrix(
+            self.cov_matrix, n_components, solver)
+
+        if nboot:
+            replicates = (self._decompose_cov_matrix(
+                cov_matrix0 * (scale * weights_sum / weights_sum0),
+                n_components, solver) for cov_matrix0, weights_sum0 in zip(
+                    boot_cov_matrices, boot_weights_sum))
+            self._set_bootstrap_ranges(replicates, nboot, max_dim)
+
+    @staticmethod
+    def _bootstrap_counts(n_samples, rng=None):
+        """
+        Return the multiplicities of the samples in a bootstrap replicate.
+
+        Sampling with replacement n_samples rows from a data set is equivalent
+        to weighting each row by the number of times it is drawn, so the
+        covariance matrix of a replicate can be computed from the original
+        samples. The random draws are the same of `_bootstrap_replicate`.
+
+        :param int n_samples: number of samples.
+        :param numpy.random.Generator rng: generator of the random draws. If
+            None the global numpy random state is used.
+        :return: n_samples-by-1 array with the multinomial counts of the
+            samples, which sum to n_samples.
+        :rtype: numpy.ndarray
+        """
+        if rng is None:
+            ind = np.random.randint(n_samples, size=(n_samples, ))
+        else:
+            ind = rng.integers(n_samples, size=(n_samples, ))
+        return np.bincount(ind, minlength=n_samples).reshape(-1, 1)
 
     @staticmethod
     def _bootstrap_replicate(matrix, weights):
@@ -151,6 +612,28 @@ class Subspaces(object):
             return matrix[ind, :, :].copy(), weights[ind, :].copy()
         return None, None
 
+    def decompose(self, accumulator, n_components=None, solver='full'):
+        """
+        Compute the active subspace from the sufficient statistics of the
+        covariance matrix of the gradients, for example the ones reduced from
+        different workers.
+
+        :param CovarianceAccumulator accumulator: the accumulated statistics.
+        :param int n_components: number of leading eigenpairs computed by the
+            truncated solvers.
+        :param str solver: 'full' to compute the whole spectrum, 'randomized'
+            or 'lanczos' to compute only the leading eigenpairs. Default is
+            'full'.
+
+        .. note:: The bootstrap ranges `self.evals_br` and `self.subs_br`
+            need the single gradient samples and they are not computed.
+        """
+        self.cov_matrix = accumulator.cov_matrix
+        self.evals, self.evects = self._decompose_cov_matrix(
+            self.cov_matrix, n_components, solver)
+        self.evals_br = None
+        self.subs_br = None
+
     def compute(self, *args, **kwargs):
         """
         Abstract method to compute the active subspaces. Not implemented, it has
@@ -177,6 +660,72 @@ class Subspaces(object):
         raise NotImplementedError('Subclass must implement abstract method '
                                   '{}.compute'.format(self.__class__.__name__))
 
+    def _project(self,
+                 inputs,
+                 transform=None,
+                 active_only=False,
+                 chunk_size=10000,
+                 out=None,
+                 dtype=None):
+        """
+        Project the inputs, or their images through `transform`, onto the
+        active and inactive subspaces. A single product with the matrix of
+        the eigenvectors is computed for each chunk of `chunk_size` rows, so
+        that the temporary memory does not depend on the number of inputs.
+
+        :param numpy.ndarray inputs: n_samples-by-n_params array, possibly a
+            `numpy.memmap`, of the points to project.
+        :param callable transform: function mapping a chunk of inputs to the
+            space of the eigenvectors. If None the inputs are projected
+            directly. Default is None.
+        :param bool active_only: if True only the active variables are
+            computed. Default is False.
+        :param int chunk_size: number of rows projected at once. Default is
+            10000.
+        :param tuple out: arrays n_samples-by-active_dim and
+            n_samples-by-inactive_dim where the results are stored. The
+            second array is ignored if `active_only` is True. If None new
+            arrays are allocated. Default is None.
+        :param numpy.dtype dtype: floating point type of the computation, for
+            example `numpy.float32`. If None `self.dtype` is used, or the type
+            of the inputs and of the eigenvectors if it is None too. Default is
+            None.
+        :return: the active variables; the inactive variables, or None if
+            `active_only` is True.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        if self.W1 is None:
+            raise TypeError('the active subspace has not been partitioned.')
+        W = self.W1 if active_only else self.evects
+        if dtype is None:
+            dtype = self.dtype
+        if dtype is None:
+            dtype = np.result_type(np.asarray(inputs[:1]), W)
+        W = np.ascontiguousarray(W, dtype=dtype)
+        n_samples = inputs.shape[0]
+
+        active, inactive = (None, None) if out is None else out
+        if active is None:
+            active = np.empty((n_samples, self.dim), dtype=dtype)
+        if inactive is None and not active_only:
+            inactive = np.empty((n_samples, W.shape[1] - self.dim),
+                                dtype=dtype)
+
+        buffer = np.empty((min(chunk_size, n_samples), W.shape[1]),
+                          dtype=dtype)
+        for start in range(0, n_samples, chunk_size):
+            stop = min(start + chunk_size, n_samples)
+            chunk = np.asarray(inputs[start:stop])
+            if transform is not None:
+                chunk = transform(chunk)
+            chunk = np.asarray(chunk, dtype=dtype)
+            product = np.dot(chunk, W, out=buffer[:stop - start])
+            active[start:stop] = product[:, :self.dim]
+            if not active_only:
+                inactive[start:stop] = product[:, self.dim:]
+
+        return active, (None if active_only else inactive)
+
     def backward(self, reduced_inputs, n_points):
         """
         Abstract method to find points in full space that map to reduced
@@ -206,10 +755,100 @@ class Subspaces(object):
             raise ValueError(
                 'dim must be positive and less than the dimension of the '
                 ' eigenvectors: dim = {}.'.format(dim))
+        if self.evals is not None and dim > self.evals.shape[0]:
+            raise ValueError(
+                'dim must be less than the number of computed eigenvalues: '
+                'dim = {}.'.format(dim))
         self.dim = dim
         self.W1 = self.evects[:, :dim]
         self.W2 = self.evects[:, dim:]
 
+    def _get_state(self):
+        """
+        Collect the arrays and the metadata that describe the fitted
+        subspace.
+
+        :return: the dictionary of the arrays to save, and the dictionary of
+            the JSON serializable metadata.
+        :rtype: dict, dict
+        """
+        arrays = {
+            name: getattr(self, name)
+            for name in ('evals', 'evects', 'evals_br', 'subs_br',
+                         'cov_matrix') if getattr(self, name) is not None
+        }
+        metadata = {
+            'format_version': self._format_version,
+            'class': type(self).__name__,
+            'dim': self.dim,
+            'dtype': None if self.dtype is None else np.dtype(self.dtype).name
+        }
+        return arrays, metadata
+
+    def _set_state(self, arrays, metadata):
+        """
+        Restore the fitted subspace from the arrays and the metadata returned
+        by `self._get_state`.
+
+        :param dict arrays: the saved arrays.
+        :param dict metadata: the saved metadata.
+        """
+        for name in ('evals', 'evects', 'evals_br', 'subs_br', 'cov_matrix'):
+            setattr(self, name, arrays.get(name))
+        self.dim, self.W1, self.W2 = None, None, None
+        dtype = metadata.get('dtype')
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        if metadata['dim'] is not None:
+            self.partition(metadata['dim'])
+
+    def save(self, outdir):
+        """
+        Save the fitted subspace in a directory, with one .npy file for each
+        array and a metadata.json file with the version of the format. The
+        active and inactive eigenvectors are not duplicated, since they are
+        restored as views of the eigenvectors.
+
+        :param str outdir: directory where the subspace is saved. It is
+            created if it does not exist.
+        """
+        arrays, metadata = self._get_state()
+        os.makedirs(outdir, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(outdir, name + '.npy'), array)
+        with open(os.path.join(outdir, 'metadata.json'), 'w') as outfile:
+            json.dump(metadata, outfile)
+
+    def load(self, indir, mmap_mode='r'):
+        """
+        Load a subspace saved with the `save` method.
+
+        By default the arrays are memory-mapped read-only, so that loading is
+        independent of their size and the processes that load the same
+        subspace share the same pages.
+
+        :param str indir: directory where the subspace has been saved.
+        :param str mmap_mode: memory-map mode passed to `numpy.load`. If None
+            the arrays are read in memory. Default is 'r'.
+        :raises: ValueError
+        """
+        with open(os.path.join(indir, 'metadata.json')) as infile:
+            metadata = json.load(infile)
+        if metadata['format_version'] > self._format_version:
+            raise ValueError(
+                'Unsupported format version {} of the saved subspace.'.format(
+                    metadata['format_version']))
+        if metadata['class'] != type(self).__name__:
+            raise ValueError('The saved subspace is a {}, not a {}.'.format(
+                metadata['class'],
+                type(self).__name__))
+
+        arrays = {
+            filename[:-4]: np.load(os.path.join(indir, filename),
+                                   mmap_mode=mmap_mode)
+            for filename in os.listdir(indir) if filename.endswith('.npy')
+        }
+        self._set_state(arrays, metadata)
+
     def plot_eigenvalues(self,
                          n_evals=None,
                          filename=None,
@@ -1,7 +1,9 @@
 """Utility functions module.
 """
+from collections import OrderedDict
 import numpy as np
 from scipy.optimize import linprog
+from scipy.sparse.linalg import LinearOperator, svds
 
 
 class Normalizer(object):
@@ -81,6 +83,37 @@ def linear_program_ineq(c, A, b):
         raise RuntimeError('Scipy did not solve the LP. {}'.format(res.message))
 
 
+def linear_program_eq(c, A, b, lb, ub):
+    """Solves an equality constrained linear program with variable bounds.
+    This method returns the minimizer of the following linear program.
+
+    minimize  c^T x
+    subject to  A x = b
+    lb <= x <= ub
+
+    :param numpy.ndarray c: coefficients vector of the linear objective
+        function to be minimized.
+    :param numpy.ndarray A: 2-D array which, when matrix-multiplied by x,
+        gives the values of the equality constraints at x.
+    :param numpy.ndarray b: 1-D array of values of the equality constraints.
+    :param numpy.ndarray lb: lower bounds of the variables.
+    :param numpy.ndarray ub: upper bounds of the variables.
+    :return: the independent variable vector which minimizes the linear
+        programming problem.
+    :rtype: numpy.ndarray
+    :raises: RuntimeError
+    """
+    c = c.reshape(-1, )
+    b = b.reshape(-1, )
+    bounds = list(zip(np.ravel(lb), np.ravel(ub)))
+
+    res = linprog(c=c, A_eq=A, b_eq=b, bounds=bounds)
+    if res.success:
+        return res.x.reshape(-1, 1)
+    else:
+        raise RuntimeError('Scipy did not solve the LP. {}'.format(res.message))
+
+
 def local_linear_gradients(inputs, outputs, weights=None, n_neighbors=None):
     """Estimate a collection of gradients from input/output pairs.
 
@@ -177,3 +210,358 @@ def sort_eigpairs(matrix):
     s[s == 0] = 1
     evects *= s
     return evals.reshape(-1, 1), evects
+
+
+def truncated_svd(matrix,
+                  n_components,
+                  solver='randomized',
+                  n_oversamples=10,
+                  n_iter=4,
+                  rng=None,
+                  row_weights=None):
+    """Compute only the leading singular values and right singular vectors.
+
+    :param numpy.ndarray matrix: matrix whose leading singular pairs you want.
+    :param int n_components: number of singular pairs to compute.
+    :param str solver: 'randomized' to use the randomized range finder of
+        Halko, Martinsson and Tropp, or 'lanczos' to use the implicitly
+        restarted Lanczos method of `scipy.sparse.linalg.svds`. Default is
+        'randomized'.
+    :param int n_oversamples: additional random directions used by the
+        randomized solver. Default is 10.
+    :param int n_iter: number of power iterations used by the randomized
+        solver. Default is 4.
+    :param numpy.random.Generator rng: generator of the random directions of
+        the randomized solver and of the starting vector of the Lanczos
+        solver. If None the global numpy random state is used. Default is
+        None.
+    :param numpy.ndarray row_weights: vector of scalings of the rows. If not
+        None the singular pairs of `row_weights[:, None] * matrix` are
+        computed without forming the scaled matrix. Default is None.
+    :return: vector of sorted singular values; matrix with the
+        corresponding right singular vectors as columns.
+    :rtype: numpy.ndarray, numpy.ndarray
+    :raises: ValueError
+
+    .. note::
+
+        As in `sort_eigpairs`, the singular vectors are normalized so that
+        their first component is positive. If `n_components` is not smaller
+        than the dimensions of the matrix the full SVD is computed.
+    """
+    if solver not in ('randomized', 'lanczos'):
+        raise ValueError(
+            "solver argument can only be 'randomized' or 'lanczos'.")
+
+    if row_weights is None:
+        row_weights = 1.
+    else:
+        row_weights = np.asarray(row_weights,
+                                 dtype=matrix.dtype).reshape(-1, 1)
+
+    if n_components >= min(matrix.shape):
+        if np.ndim(row_weights):
+            # the scaled matrix is not formed: the singular pairs are the
+            # square roots of the eigenpairs of its Gram matrix
+            evals, evects = np.linalg.eigh(
+                np.dot(matrix.T, row_weights**2 * matrix))
+            singular, evects = np.sqrt(np.maximum(evals, 0)), evects.T
+        else:
+            singular, evects = np.linalg.svd(matrix, full_matrices=False)[1:]
+    elif solver == 'lanczos':
+        operator = LinearOperator(
+            matrix.shape,
+            matvec=lambda v: row_weights * np.dot(matrix, v.reshape(-1, 1)),
+            rmatvec=lambda u: np.dot(matrix.T, row_weights * u.reshape(-1, 1)),
+            dtype=matrix.dtype)
+        singular, evects = svds(operator, k=n_components,
+                                random_state=rng)[1:]
+    else:
+        n_random = min(n_components + n_oversamples, min(matrix.shape))
+        normal = np.random.normal if rng is None else rng.normal
+        Q = np.linalg.qr(row_weights * np.dot(
+            matrix, normal(size=(matrix.shape[1], n_random))))[0]
+        for _ in range(n_iter):
+            Q = np.linalg.qr(np.dot(matrix.T, row_weights * Q))[0]
+            Q = np.linalg.qr(row_weights * np.dot(matrix, Q))[0]
+        singular, evects = np.linalg.svd(np.dot((row_weights * Q).T, matrix),
+                                         full_matrices=False)[1:]
+
+    ind = np.argsort(singular)[::-1][:n_components]
+    singular = singular[ind]
+    evects = evects[ind].T
+    s = np.sign(evects[0, :])
+    s[s == 0] = 1
+    evects *= s
+    return singular, evects
+
+
+def subspace_distances(evects, other_evects, max_dim=None):
+    """Compute the distances between the leading subspaces of two bases.
+
+    The distance between the subspaces spanned by the first j columns of
+    `evects` and of `other_evects` is the spectral norm of
+    `evects[:, :j].T @ other_evects[:, j:]`, that is the sine of their
+    largest principal angle. The product of the leading max_dim columns of
+    `evects` with `other_evects` is computed once and shared among all the
+    dimensions j.
+
+    :param numpy.ndarray evects: n_params-by-k matrix with orthonormal
+        columns.
+    :param numpy.ndarray other_evects: n_params-by-k matrix with orthonormal
+        columns.
+    :param int max_dim: largest dimension of the subspaces to compare. If
+        None all the dimensions from 1 to k-1 are compared.
+    :return: vector with the distances for the dimensions from 1 to max_dim.
+    :rtype: numpy.ndarray
+
+    .. note::
+
+        The norm of each block is the square root of the largest eigenvalue
+        of the Gram matrix of its smaller side, of size min(j, k - j), whose
+        eigenvalues are computed without eigenvectors. Since the block itself
+        is used, and not the cosines of the principal angles, small distances
+        are computed to full relative precision.
+    """
+    n_cols = min(evects.shape[1], other_evects.shape[1])
+    if max_dim is None:
+        max_dim = n_cols - 1
+    max_dim = min(max_dim, n_cols - 1)
+    product = np.dot(evects[:, :max_dim].T, other_evects[:, :n_cols])
+
+    distances = np.zeros(max_dim)
+    for j in range(1, max_dim + 1):
+        block = product[:j, j:]
+        if j > n_cols - j:
+            block = block.T
+        eigval = np.linalg.eigvalsh(np.dot(block, block.T))[-1]
+        distances[j - 1] = np.sqrt(max(eigval, 0.))
+    return distances
+
+
+class BoundingBoxSolver(object):
+    """Bounding boxes of the inactive variables for many values of the active
+    variables.
+
+    For a value y of the active variables, the inactive variables z such that
+    -1 <= W1 y + W2 z <= 1 form a polytope. Since x = W1 y + W2 z, each bound
+    of its bounding box is the value of a linear program
+
+    minimize  c^T x
+    subject to  W1^T x = y
+    -1 <= x <= 1
+
+    where c is a column of W2 or its opposite. Only the right-hand side y
+    changes between the reduced inputs, so the optimal bases found by
+    `linear_program_eq` are cached for each objective, up to `max_bases`
+    bases dropping the least recently used ones. For a new y a cached basis
+    is reused if the corresponding vertex is feasible, which certifies its
+    optimality, and a linear program is solved only otherwise.
+
+    :param numpy.ndarray W1: n_params-by-active_dim matrix of the active
+        eigenvectors.
+    :param numpy.ndarray W2: n_params-by-inactive_dim matrix of the inactive
+        eigenvectors. [W1, W2] must be an orthogonal matrix.
+    :param float tol: tolerance on the feasibility of the cached vertices.
+        Default is 1e-10.
+    :param int max_bases: maximum number of bases cached for each objective.
+        Default is 32.
+
+    :Example:
+
+        >>> from athena import ActiveSubspaces, BoundingBoxSolver
+        >>> import numpy as np
+        >>> ss = ActiveSubspaces()
+        >>> ss.compute(gradients=np.random.uniform(-1, 1, (100, 5)))
+        >>> ss.partition(2)
+        >>> solver = BoundingBoxSolver(ss.W1, ss.W2)
+        >>> for y in np.random.uniform(-0.5, 0.5, (10, 2)):
+        >>>     lbox, ubox = solver.solve(y)
+    """
+    def __init__(self, W1, W2, tol=1e-10, max_bases=32):
+        self.W1 = W1
+        self.W2 = W2
+        self.tol = tol
+        self.max_bases = max_bases
+        self.objectives = np.hstack((W2, -W2)).T
+        self.bases = [[] for _ in range(self.objectives.shape[0])]
+        self.n_solves = 0
+        self.n_reuses = 0
+
+    def _basis(self, c, x):
+        """Compute the basis of a vertex of the feasible set, and the values of
+        the non-basic variables, which are at their bounds.
+
+        :param numpy.ndarray c: the objective of the linear program.
+        :param numpy.ndarray x: the optimal vertex.
+        :return: the indices of the basic variables; the values of all the
+            variables outside the basis; the inverse of the transposed basis
+            matrix. None if the basis matrix is singular.
+        :rtype: tuple
+        """
+        n = self.W1.shape[1]
+        # the basic variables are the ones farthest from the bounds
+        free = np.sort(np.argsort(np.abs(x.reshape(-1)))[:n])
+        try:
+            inv_basis = np.linalg.inv(self.W1[free, :].T)
+        except np.linalg.LinAlgError:
+            return None
+        # reduced costs of the objective: they are zero on the basis and
+        # their signs fix the non-basic variables at their bounds
+        multipliers = np.dot(inv_basis.T, c[free])
+        reduced_costs = c - np.dot(self.W1, multipliers)
+        fixed = -np.sign(reduced_costs)
+        fixed[free] = 0.
+        return free, fixed, inv_basis
+
+    def _vertex(self, basis, reduced_input):
+        """Compute the vertex of a cached basis for the given active variables.
+
+        :param tuple basis: a cached basis as returned by `self._basis`.
+        :param numpy.ndarray reduced_input: the value of the active variables.
+        :return: the vertex, or None if it is not feasible.
+        :rtype: numpy.ndarray
+        """
+        free, fixed, inv_basis = basis
+        x = fixed.copy()
+        x[free] = np.dot(inv_basis, reduced_input - np.dot(self.W1.T, fixed))
+        if np.all(np.abs(x[free]) <= 1 + self.tol):
+            return x
+        return None
+
+    def solve(self, reduced_input):
+        """Compute the bounding box of the inactive variables.
+
+        :param numpy.ndarray reduced_input: the value of the active variables.
+        :return: 1-by-(inactive_dim) lower bounds and 1-by-(inactive_dim)
+            upper bounds of the box.
+        :rtype: numpy.ndarray, numpy.ndarray
+        """
+        reduced_input = np.asarray(reduced_input).reshape(-1)
+        n_params, inactive_dim = self.W2.shape
+        bounds = np.zeros(2 * inactive_dim)
+        for j, c in enumerate(self.objectives):
+            x = None
+            for k, basis in enumerate(self.bases[j]):
+                x = self._vertex(basis, reduced_input)
+                if x is not None:
+                    # most recently used bases are tried first
+                    self.bases[j].insert(0, self.bases[j].pop(k))
+                    self.n_reuses += 1
+                    break
+            if x is None:
+                x = linear_program_eq(c, self.W1.T, reduced_input,
+                                      -np.ones(n_params),
+                                      np.ones(n_params)).reshape(-1)
+                self.n_solves += 1
+                basis = self._basis(c, x)
+                if basis is not None and self._vertex(basis,
+                                                      reduced_input) is not None:
+                    self.bases[j].insert(0, basis)
+                    del self.bases[j][self.max_bases:]
+            bounds[j] = np.dot(c, x)
+        return (bounds[:inactive_dim].reshape(1, -1),
+                -bounds[inactive_dim:].reshape(1, -1))
+
+
+class PolytopeCache(object):
+    """Bounded least recently used cache of the data of the polytopes of the
+    inactive variables, such as bounding boxes and Chebyshev centers, keyed
+    on the value of the active variables.
+
+    :param int maxsize: maximum number of reduced inputs whose data are
+        stored. Default is 128.
+    :param float tol: if positive, the data of a cached reduced input can be
+        returned also for any reduced input whose components differ by at
+        most `tol`, when they are requested with `exact=False`. The returned
+        data are then those of a different polytope, so the caller must check
+        that they are still valid for its own polytope. Default is 0, that is
+        exact lookup.
+
+    :Example:
+
+        >>> from athena import ActiveSubspaces, PolytopeCache
+        >>> import numpy as np
+        >>> ss = ActiveSubspaces()
+        >>> ss.compute(gradients=np.random.uniform(-1, 1, (100, 5)))
+        >>> ss.partition(2)
+        >>> ss.polytope_cache = PolytopeCache(maxsize=1000)
+        >>> reduced_inputs = np.random.uniform(-0.5, 0.5, (2, 2))
+        >>> for _ in range(10):
+        >>>     ss.backward(reduced_inputs, n_points=10)
+        >>> print(ss.polytope_cache.hits, ss.polytope_cache.misses)
+    """
+    def __init__(self, maxsize=128, tol=0.):
+        self.maxsize = maxsize
+        self.tol = tol
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _find(self, point, exact=True):
+        """Find the key of the entry of the given point.
+
+        :param numpy.ndarray point: the reduced input.
+        :param bool exact: if False the entries within `self.tol` are found
+            too. Default is True.
+        :return: the key of the entry, or None if the point is not cached.
+        """
+        key = point.tobytes()
+        if key in self._entries:
+            return key
+        if not exact and self.tol > 0:
+            for key, (point0, _) in self._entries.items():
+                if np.amax(np.abs(point0 - point)) <= self.tol:
+                    return key
+        return None
+
+    def get(self, point, kind, exact=False, valid=None):
+        """Return the cached data of a point and update the counters.
+
+        :param numpy.ndarray point: the reduced input.
+        :param str kind: the kind of the data, for example 'box'.
+        :param bool exact: if True only the data of the same point are
+            returned, otherwise also the data of a point within `self.tol`.
+            Default is False.
+        :param callable valid: function that checks if the data of a
+            different point within `self.tol` are valid for `point`. The
+            rejected data are counted as a miss. If None they are always
+            returned. Default is None.
+        :return: the cached data, or None if they are not cached.
+        """
+        point = np.asarray(point, dtype=float).reshape(-1)
+        key = self._find(point, exact)
+        if key is None or kind not in self._entries[key][1]:
+            self.misses += 1
+            return None
+        if (valid is not None and key != point.tobytes()
+                and not valid(self._entries[key][1][kind])):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key][1][kind]
+
+    def put(self, point, kind, value):
+        """Store the data of a point, evicting the least recently used point
+        if the cache is full.
+
+        :param numpy.ndarray point: the reduced input.
+        :param str kind: the kind of the data, for example 'box'.
+        :param value: the data to store.
+        """
+        point = np.asarray(point, dtype=float).reshape(-1)
+        key = point.tobytes()
+        if key not in self._entries:
+            self._entries[key] = (point, {})
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        self._entries[key][1][kind] = value
+        self._entries.move_to_end(key)
+
+    def clear(self):
+        """Remove all the cached data. The counters are not reset."""
+        self._entries.clear()
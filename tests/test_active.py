@@ -1,7 +1,11 @@
 from unittest import TestCase
 import numpy as np
 from athena.active import ActiveSubspaces
+from athena.utils import linear_program_ineq, PolytopeCache
 from contextlib import contextmanager
+import json
+import os
+import tempfile
 import matplotlib.pyplot as plt
 
 
@@ -49,6 +53,30 @@ class TestUtils(TestCase):
         ss = ActiveSubspaces()
         self.assertIsNone(ss.cov_matrix)
 
+    def test_init_accumulator(self):
+        ss = ActiveSubspaces()
+        self.assertIsNone(ss.accumulator)
+
+    def test_init_sampling_stats(self):
+        ss = ActiveSubspaces()
+        self.assertEqual({
+            'n_draws': 0,
+            'n_accepted': 0,
+            'n_fallbacks': 0
+        }, ss.sampling_stats)
+
+    def test_init_box_solver(self):
+        ss = ActiveSubspaces()
+        self.assertIsNone(ss._box_solver)
+
+    def test_init_polytope_cache(self):
+        ss = ActiveSubspaces()
+        self.assertIsNone(ss.polytope_cache)
+
+    def test_init_captured_energy(self):
+        ss = ActiveSubspaces()
+        self.assertIsNone(ss.captured_energy)
+
     def test_compute_01(self):
         ss = ActiveSubspaces()
         with self.assertRaises(ValueError):
@@ -192,6 +220,416 @@ class TestUtils(TestCase):
              [0.34429445, 0.11938954, -0.8045017, 0.46902504]])
         np.testing.assert_array_almost_equal(true_evects, ss.evects)
 
+    def test_compute_12(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        weights = np.ones((15, 1)) / 15
+        ss = ActiveSubspaces()
+        ss.compute(gradients=gradients,
+                   weights=weights,
+                   method='exact',
+                   nboot=150,
+                   block_size=4)
+        true_evects = np.array(
+            [[0.67237041, 0.49917148, 0.50889687, 0.1994238],
+             [0.20398894, -0.66183856, 0.09970486, 0.71443486],
+             [-0.52895262, -0.11348076, 0.83802337, -0.07104981],
+             [0.47593663, -0.54764923, 0.16970489, -0.66690696]])
+        np.testing.assert_array_almost_equal(true_evects, ss.evects)
+
+    def test_compute_13(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.ones((15, 1)) / 15
+        ss = ActiveSubspaces()
+        ss.compute(gradients=gradients,
+                   weights=weights,
+                   nboot=50,
+                   n_components=2,
+                   solver='lanczos')
+        true_evals = np.array([0.571596, 0.465819, 0.272198])
+        np.testing.assert_array_almost_equal(true_evals, ss.evals)
+
+    def test_compute_14(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.ones((15, 1)) / 15
+        ss = ActiveSubspaces()
+        ss.compute(gradients=gradients,
+                   weights=weights,
+                   nboot=50,
+                   n_components=2)
+        true_energy = (0.571596 + 0.465819) / (0.571596 + 0.465819 +
+                                               0.272198 + 0.175012)
+        self.assertAlmostEqual(true_energy, ss.captured_energy, places=5)
+        self.assertEqual((3, 2), ss.evals_br.shape)
+        self.assertEqual((2, 3), ss.subs_br.shape)
+
+    def test_compute_15(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        weights = np.ones((15, 1)) / 15
+        ss = ActiveSubspaces()
+        ss.compute(gradients=gradients,
+                   weights=weights,
+                   nboot=50,
+                   n_components=1,
+                   solver='randomized')
+        true_evects = np.array(
+            [[0.67237041, 0.49917148, 0.50889687, 0.1994238],
+             [0.20398894, -0.66183856, 0.09970486, 0.71443486],
+             [-0.52895262, -0.11348076, 0.83802337, -0.07104981],
+             [0.47593663, -0.54764923, 0.16970489, -0.66690696]])
+        np.testing.assert_array_almost_equal(true_evects[:, :2],
+                                             ss.evects[:, :2])
+        np.testing.assert_array_almost_equal(np.diag(np.ones(4)),
+                                             np.dot(ss.evects.T, ss.evects))
+
+    def test_compute_16(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        with self.assertRaises(ValueError):
+            ss.compute(gradients=gradients, solver='lanczos')
+
+    def test_compute_17(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        with self.assertRaises(ValueError):
+            ss.compute(gradients=gradients, n_components=2, solver='arnoldi')
+
+    def test_compute_18(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'gradients.npy')
+            np.save(filename, gradients)
+            ss = ActiveSubspaces()
+            ss.compute(gradients=np.load(filename, mmap_mode='r'),
+                       nboot=None,
+                       block_size=4)
+        true_evals = np.array([0.571596, 0.465819, 0.272198, 0.175012])
+        np.testing.assert_array_almost_equal(true_evals, ss.evals)
+
+    def test_compute_19(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'gradients.npy')
+            np.save(filename, gradients)
+            ss = ActiveSubspaces()
+            ss.compute(gradients=filename, nboot=None, block_size=4)
+        true_evects = np.array(
+            [[0.67237041, 0.49917148, 0.50889687, 0.1994238],
+             [0.20398894, -0.66183856, 0.09970486, 0.71443486],
+             [-0.52895262, -0.11348076, 0.83802337, -0.07104981],
+             [0.47593663, -0.54764923, 0.16970489, -0.66690696]])
+        np.testing.assert_array_almost_equal(true_evects, ss.evects)
+
+    def test_compute_20(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        chunks = ((gradients[i:i + 4], weights[i:i + 4])
+                  for i in range(0, 15, 4))
+        ss = ActiveSubspaces()
+        ss.compute(gradients=chunks, nboot=None)
+        true_cov_matrix = np.dot(gradients.T, weights * gradients)
+        np.testing.assert_array_almost_equal(true_cov_matrix, ss.cov_matrix)
+
+    def test_compute_21(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=iter(np.split(gradients, 3)), nboot=20)
+        self.assertEqual((4, 2), ss.evals_br.shape)
+        self.assertEqual((3, 3), ss.subs_br.shape)
+        self.assertTrue(np.all(ss.evals_br[:, 0] <= ss.evals_br[:, 1]))
+
+    def test_compute_22(self):
+        ss = ActiveSubspaces()
+        with self.assertRaises(ValueError):
+            ss.compute(gradients=iter([]), nboot=None)
+
+    def test_compute_23(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        ss1 = ActiveSubspaces()
+        ss1.compute(gradients=gradients, nboot=30, n_jobs=1, seed=7)
+        ss2 = ActiveSubspaces()
+        ss2.compute(gradients=gradients, nboot=30, n_jobs=3, seed=7)
+        np.testing.assert_array_equal(ss1.evals_br, ss2.evals_br)
+        np.testing.assert_array_equal(ss1.subs_br, ss2.subs_br)
+
+    def test_compute_24(self):
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss1 = ActiveSubspaces()
+        np.random.seed(42)
+        ss1.compute(gradients=gradients, nboot=30, n_jobs=2)
+        ss2 = ActiveSubspaces()
+        np.random.seed(42)
+        ss2.compute(gradients=gradients, nboot=30, n_jobs=-1)
+        np.testing.assert_array_equal(ss1.subs_br, ss2.subs_br)
+
+    def test_compute_25(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss1 = ActiveSubspaces()
+        ss1.compute(gradients=gradients, nboot=30, seed=7)
+        ss2 = ActiveSubspaces()
+        ss2.compute(gradients=gradients, nboot=30, seed=7, max_dim=2)
+        self.assertEqual((2, 3), ss2.subs_br.shape)
+        np.testing.assert_array_almost_equal(ss1.subs_br[:2], ss2.subs_br)
+
+    def test_compute_26(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss1 = ActiveSubspaces()
+        ss1.compute(gradients=gradients, nboot=20, seed=7)
+        ss2 = ActiveSubspaces()
+        ss2.compute(gradients=gradients, nboot=20, seed=7, dtype=np.float32)
+        self.assertEqual(np.float32, ss2.dtype)
+        self.assertEqual(np.float64, ss2.evects.dtype)
+        np.testing.assert_allclose(ss1.evals, ss2.evals, rtol=1e-5)
+        np.testing.assert_allclose(ss1.evals_br, ss2.evals_br, rtol=1e-5)
+
+    def test_compute_27(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        ss1 = ActiveSubspaces()
+        ss1.compute(gradients=gradients, nboot=10)
+        ss2 = ActiveSubspaces()
+        ss2.compute(gradients=iter(np.split(gradients, 3)),
+                    nboot=None,
+                    dtype=np.float32)
+        np.testing.assert_allclose(ss1.evals * 15,
+                                   ss2.evals * 15,
+                                   rtol=1e-5)
+
+    def test_compute_28(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 300).reshape(30, 10)
+        ss1 = ActiveSubspaces()
+        ss1.compute(gradients=gradients, nboot=20, n_components=3, seed=7)
+        ss2 = ActiveSubspaces()
+        ss2.compute(gradients=gradients,
+                    nboot=20,
+                    n_components=3,
+                    n_jobs=2,
+                    seed=7)
+        np.testing.assert_array_equal(ss1.evals, ss2.evals)
+        np.testing.assert_array_equal(ss1.evals_br, ss2.evals_br)
+        np.testing.assert_array_equal(ss1.subs_br, ss2.subs_br)
+
+    def test_compute_29(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        metric = np.diag([1., 2., 3.])
+        ss1 = ActiveSubspaces()
+        ss1.compute(gradients=gradients,
+                    weights=weights,
+                    metric=metric,
+                    nboot=10)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'gradients.npy')
+            np.save(filename, gradients)
+            ss2 = ActiveSubspaces()
+            ss2.compute(gradients=np.load(filename, mmap_mode='r'),
+                        weights=weights,
+                        metric=metric,
+                        nboot=20,
+                        block_size=4)
+        np.testing.assert_array_almost_equal(ss1.evals, ss2.evals)
+        np.testing.assert_array_almost_equal(np.abs(ss1.evects),
+                                             np.abs(ss2.evects))
+        self.assertTrue(np.all(ss2.evals_br[:, 1] < 10 * ss2.evals))
+
+    def test_partial_fit_01(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        ss.partial_fit(gradients=gradients[:7])
+        ss.partial_fit(gradients=gradients[7:])
+        ss.finalize()
+        true_evals = np.array([0.571596, 0.465819, 0.272198, 0.175012])
+        np.testing.assert_array_almost_equal(true_evals, ss.evals)
+
+    def test_partial_fit_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        ss = ActiveSubspaces()
+        for batch in np.split(gradients, 3):
+            ss.partial_fit(gradients=batch, block_size=2)
+            ss.finalize()
+        self.assertEqual(15, ss.accumulator.n_samples)
+        true_evects = np.array(
+            [[0.67237041, 0.49917148, 0.50889687, 0.1994238],
+             [0.20398894, -0.66183856, 0.09970486, 0.71443486],
+             [-0.52895262, -0.11348076, 0.83802337, -0.07104981],
+             [0.47593663, -0.54764923, 0.16970489, -0.66690696]])
+        np.testing.assert_array_almost_equal(true_evects, ss.evects)
+
+    def test_partial_fit_03(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        ss = ActiveSubspaces()
+        ss.partial_fit(gradients=gradients[:5], weights=weights[:5])
+        ss.partial_fit(gradients=gradients[5:], weights=weights[5:])
+        ss.finalize()
+        true_cov_matrix = np.dot(gradients.T,
+                                 weights * gradients) / np.sum(weights)
+        np.testing.assert_array_almost_equal(true_cov_matrix, ss.cov_matrix)
+
+    def test_partial_fit_04(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        ss = ActiveSubspaces()
+        ss.partial_fit(gradients=gradients[:7])
+        with self.assertRaises(ValueError):
+            ss.partial_fit(gradients=gradients[7:],
+                           metric=np.diag(2 * np.ones(3)))
+
+    def test_partial_fit_05(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        ss.partial_fit(gradients=gradients)
+        with self.assertRaises(ValueError):
+            ss.partial_fit(gradients=gradients[:, :3])
+
+    def test_finalize_01(self):
+        ss = ActiveSubspaces()
+        with self.assertRaises(ValueError):
+            ss.finalize()
+
+    def test_compute_adaptive_01(self):
+        np.random.seed(42)
+        direction = np.array([1., 0.5, 0., 0.])
+        oracle = lambda x: np.outer(np.cos(np.dot(x, direction)), direction)
+        sampler = lambda n: np.random.uniform(-1, 1, (n, 4))
+        ss = ActiveSubspaces()
+        inputs, gradients, converged = ss.compute_adaptive(oracle,
+                                                           sampler,
+                                                           dim=1,
+                                                           batch_size=10,
+                                                           nboot=20)
+        self.assertTrue(converged)
+        self.assertEqual(10, inputs.shape[0])
+        np.testing.assert_array_almost_equal(oracle(inputs), gradients)
+        self.assertAlmostEqual(1., abs(np.dot(ss.evects[:, 0], direction)) /
+                               np.linalg.norm(direction))
+
+    def test_compute_adaptive_02(self):
+        np.random.seed(42)
+        oracle = lambda x: np.random.uniform(-1, 1, x.shape)
+        sampler = lambda n: np.random.uniform(-1, 1, (n, 4))
+        ss = ActiveSubspaces()
+        inputs, gradients, converged = ss.compute_adaptive(oracle,
+                                                           sampler,
+                                                           dim=2,
+                                                           tol=0.,
+                                                           batch_size=15,
+                                                           max_samples=40,
+                                                           nboot=20)
+        self.assertFalse(converged)
+        self.assertEqual((40, 4), gradients.shape)
+        self.assertEqual(40, ss.accumulator.n_samples)
+        self.assertEqual((2, 3), ss.subs_br.shape)
+
+    def test_compute_adaptive_03(self):
+        np.random.seed(42)
+        oracle = lambda x: np.random.uniform(-1, 1, x.shape)
+        sampler = lambda n: np.random.uniform(-1, 1, (n, 4))
+        ss = ActiveSubspaces()
+        with self.assertRaises(ValueError):
+            ss.compute_adaptive(oracle, sampler, dim=4)
+
+    def test_compute_adaptive_04(self):
+        oracle = lambda x: np.random.uniform(-1, 1, x.shape)
+        sampler = lambda n: np.random.uniform(-1, 1, (n, 4))
+        for seed in range(5):
+            np.random.seed(seed)
+            ss = ActiveSubspaces()
+            inputs, gradients, converged = ss.compute_adaptive(oracle,
+                                                               sampler,
+                                                               dim=1,
+                                                               tol=0.,
+                                                               batch_size=1,
+                                                               max_samples=4)
+            self.assertEqual((4, 4), gradients.shape)
+            self.assertTrue(np.all(np.isfinite(ss.evals_br)))
+
+    def test_compute_adaptive_05(self):
+        calls = []
+
+        def oracle(x):
+            calls.append(x)
+            return np.random.uniform(-1, 1, x.shape)
+
+        sampler = lambda n: np.random.uniform(-1, 1, (n, 4))
+        ss = ActiveSubspaces()
+        with self.assertRaises(ValueError):
+            ss.compute_adaptive(oracle, sampler, dim=4)
+        self.assertEqual(0, len(calls))
+
+    def test_save_load_01(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=gradients, nboot=20)
+        ss.partition(2)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ss.save(tmpdir)
+            ss2 = ActiveSubspaces()
+            ss2.load(tmpdir)
+            self.assertIsInstance(ss2.evects, np.memmap)
+            np.testing.assert_array_equal(ss.evals, ss2.evals)
+            np.testing.assert_array_equal(ss.subs_br, ss2.subs_br)
+            np.testing.assert_array_equal(ss.W1, ss2.W1)
+            self.assertEqual(2, ss2.dim)
+            del ss2
+
+    def test_save_load_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=gradients, nboot=20)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ss.save(tmpdir)
+            ss2 = ActiveSubspaces()
+            ss2.load(tmpdir, mmap_mode=None)
+        self.assertIsNone(ss2.W1)
+        np.testing.assert_array_equal(ss.evects, ss2.evects)
+
+    def test_save_load_03(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=gradients, nboot=20)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ss.save(tmpdir)
+            with open(os.path.join(tmpdir, 'metadata.json')) as infile:
+                metadata = json.load(infile)
+            metadata['format_version'] += 1
+            with open(os.path.join(tmpdir, 'metadata.json'), 'w') as outfile:
+                json.dump(metadata, outfile)
+            with self.assertRaises(ValueError):
+                ActiveSubspaces().load(tmpdir)
+
+    def test_save_load_04(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=gradients, nboot=10, dtype=np.float32)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ss.save(tmpdir)
+            ss2 = ActiveSubspaces()
+            ss2.load(tmpdir)
+        self.assertEqual(np.float32, ss2.dtype)
+
     def test_forward_01(self):
         np.random.seed(42)
         inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
@@ -215,6 +653,53 @@ class TestUtils(TestCase):
                                   [-0.49850367, -0.37146678]])
         np.testing.assert_array_almost_equal(true_inactive, inactive)
 
+    def test_forward_06(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 4)))
+        ss.partition(2)
+        inputs = np.random.uniform(-1, 1, (23, 4))
+        active, inactive = ss.forward(inputs, chunk_size=5)
+        np.testing.assert_array_almost_equal(np.dot(inputs, ss.W1), active)
+        np.testing.assert_array_almost_equal(np.dot(inputs, ss.W2), inactive)
+
+    def test_forward_07(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 4)))
+        ss.partition(3)
+        inputs = np.random.uniform(-1, 1, (23, 4))
+        out = np.zeros((23, 3))
+        active, inactive = ss.forward(inputs,
+                                      active_only=True,
+                                      chunk_size=7,
+                                      out=(out, None))
+        self.assertIs(out, active)
+        self.assertIsNone(inactive)
+        np.testing.assert_array_almost_equal(np.dot(inputs, ss.W1), out)
+
+    def test_forward_08(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 4)))
+        ss.partition(2)
+        inputs = np.random.uniform(-1, 1, (23, 4))
+        active, inactive = ss.forward(inputs, dtype=np.float32)
+        self.assertEqual(np.float32, active.dtype)
+        self.assertEqual(np.float32, inactive.dtype)
+        np.testing.assert_array_almost_equal(np.dot(inputs, ss.W1), active,
+                                             decimal=5)
+
+    def test_forward_09(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 4)),
+                   dtype=np.float32)
+        ss.partition(2)
+        active, inactive = ss.forward(np.random.uniform(-1, 1, (5, 4)))
+        self.assertEqual(np.float32, active.dtype)
+        self.assertEqual(np.float32, inactive.dtype)
+
     def test_forward_03(self):
         np.random.seed(42)
         inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
@@ -281,6 +766,247 @@ class TestUtils(TestCase):
         np.testing.assert_array_almost_equal(np.kron(active, np.ones((500, 1))),
                                              new_inputs.dot(ss.W1))
 
+    def test_backward_03(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 80).reshape(16, 5)
+        outputs = np.random.uniform(-1, 3, 16)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(2)
+        new_inputs = np.random.uniform(-1, 1, 35).reshape(7, 5)
+        active = ss.forward(new_inputs)[0]
+        new_inputs, indices = ss.backward(reduced_inputs=active,
+                                          n_points=3,
+                                          batch_size=6)
+        np.testing.assert_array_almost_equal(np.kron(active, np.ones((3, 1))),
+                                             new_inputs.dot(ss.W1))
+        np.testing.assert_array_equal(
+            np.kron(np.arange(7), np.ones(3)).reshape(-1, 1), indices)
+        self.assertTrue(np.all(np.abs(new_inputs) <= 1 + 1e-10))
+
+    def test_backward_04(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 5)), nboot=10)
+        ss.partition(2)
+        active = ss.forward(np.random.uniform(-1, 1, (7, 5)))[0]
+        new_inputs, indices = ss.backward(reduced_inputs=active,
+                                          n_points=3,
+                                          n_jobs=2,
+                                          seed=11,
+                                          shard_size=3)
+        np.testing.assert_array_almost_equal(np.kron(active, np.ones((3, 1))),
+                                             new_inputs.dot(ss.W1))
+        np.testing.assert_array_equal(
+            np.kron(np.arange(7), np.ones(3)).reshape(-1, 1), indices)
+        self.assertTrue(np.all(np.abs(new_inputs) <= 1 + 1e-10))
+        self.assertGreaterEqual(ss.sampling_stats['n_accepted'], 21)
+
+    def test_backward_05(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 5)), nboot=10)
+        ss.partition(2)
+        active = ss.forward(np.random.uniform(-1, 1, (7, 5)))[0]
+        new_inputs1 = ss.backward(active, n_points=3, seed=11,
+                                  shard_size=3)[0]
+        new_inputs2 = ss.backward(active,
+                                  n_points=3,
+                                  n_jobs=2,
+                                  seed=11,
+                                  shard_size=3)[0]
+        np.testing.assert_array_equal(new_inputs1, new_inputs2)
+        new_inputs3 = ss.backward(active,
+                                  n_points=3,
+                                  n_jobs=3,
+                                  seed=11,
+                                  shard_size=3)[0]
+        np.testing.assert_array_equal(new_inputs1, new_inputs3)
+
+    def test_iter_backward_01(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 80).reshape(16, 5)
+        outputs = np.random.uniform(-1, 3, 16)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(2)
+        active = ss.forward(np.random.uniform(-1, 1, 35).reshape(7, 5))[0]
+        chunks = list(ss.iter_backward(active, n_points=4, chunk_size=8))
+        self.assertEqual(4, len(chunks))
+        new_inputs = np.vstack([chunk[0] for chunk in chunks])
+        indices = np.vstack([chunk[1] for chunk in chunks])
+        self.assertTrue(all(chunk[0].shape[0] <= 8 for chunk in chunks))
+        self.assertTrue(np.issubdtype(indices.dtype, np.integer))
+        np.testing.assert_array_equal(
+            np.repeat(np.arange(7), 4).reshape(-1, 1), indices)
+        np.testing.assert_array_almost_equal(active[indices[:, 0]],
+                                             new_inputs.dot(ss.W1))
+
+    def test_iter_backward_02(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        outputs = np.random.uniform(0, 5, 15)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(1)
+        active = ss.forward(np.random.uniform(-1, 1, 8).reshape(2, 4))[0]
+        chunks = list(ss.iter_backward(active, n_points=25, chunk_size=10))
+        self.assertEqual([10, 10, 5, 10, 10, 5],
+                         [chunk[0].shape[0] for chunk in chunks])
+        indices = np.vstack([chunk[1] for chunk in chunks])
+        np.testing.assert_array_equal(
+            np.repeat(np.arange(2), 25).reshape(-1, 1), indices)
+
+    def test_sample_inactive_batch(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        outputs = np.random.uniform(0, 5, 15)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(1)
+        active = ss.forward(np.random.uniform(-1, 1, 12).reshape(3, 4))[0]
+        Z = ss._sample_inactive_batch(active, n_points=4)
+        self.assertEqual((3, 4, 3), Z.shape)
+
+    def test_sample_inactive_exact_01(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 4)), nboot=10)
+        ss.partition(3)
+        active = ss.forward(np.random.uniform(-1, 1, (5, 4)))[0]
+        Z = ss._sample_inactive_exact(active, n_points=20)
+        self.assertEqual((5, 20, 1), Z.shape)
+        full = np.dot(active, ss.W1.T)[:, np.newaxis, :] + np.matmul(
+            Z, ss.W2.T)
+        self.assertTrue(np.all(np.abs(full) <= 1 + 1e-10))
+
+    def test_sample_inactive_exact_02(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 5)), nboot=10)
+        ss.partition(3)
+        active = ss.forward(np.random.uniform(-1, 1, (5, 5)))[0]
+        Z = ss._sample_inactive_exact(active, n_points=20)
+        self.assertEqual((5, 20, 2), Z.shape)
+        full = np.dot(active, ss.W1.T)[:, np.newaxis, :] + np.matmul(
+            Z, ss.W2.T)
+        self.assertTrue(np.all(np.abs(full) <= 1 + 1e-10))
+
+    def test_sample_inactive_exact_03(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 4)), nboot=10)
+        ss.partition(2)
+        active = ss.forward(np.random.uniform(-0.5, 0.5, (1, 4)))[0]
+        Z = ss._sample_inactive_exact(active, n_points=20000)[0]
+        lbox, ubox = ss._solve_bounding_box(active[0])
+        np.testing.assert_array_almost_equal(lbox[0], np.amin(Z, axis=0),
+                                             decimal=1)
+        np.testing.assert_array_almost_equal(ubox[0], np.amax(Z, axis=0),
+                                             decimal=1)
+
+    def test_sample_inactive_exact_04(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 4)), nboot=10)
+        ss.partition(2)
+        with self.assertRaises(ValueError):
+            ss._sample_inactive_exact(np.array([[10., 10.]]), n_points=5)
+
+    def test_inactive_interval(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 4)), nboot=10)
+        ss.partition(3)
+        active = ss.forward(np.random.uniform(-1, 1, (5, 4)))[0]
+        lower, upper = ss._inactive_interval(active)
+        for i in range(5):
+            lbox, ubox = ss._solve_bounding_box(active[i])
+            self.assertAlmostEqual(lbox[0, 0], lower[i, 0])
+            self.assertAlmostEqual(ubox[0, 0], upper[i, 0])
+
+    def test_inactive_polygons(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (50, 5)), nboot=10)
+        ss.partition(3)
+        active = ss.forward(np.random.uniform(-1, 1, (5, 5)))[0]
+        vertices = ss._inactive_polygons(active)
+        for i in range(5):
+            lbox, ubox = ss._solve_bounding_box(active[i])
+            np.testing.assert_array_almost_equal(lbox[0],
+                                                 np.amin(vertices[i], axis=0))
+            np.testing.assert_array_almost_equal(ubox[0],
+                                                 np.amax(vertices[i], axis=0))
+
+    def test_rejection_sampling_inactive_batch_01(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        outputs = np.random.uniform(0, 5, 15)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(1)
+        active = ss.forward(np.random.uniform(-1, 1, 12).reshape(3, 4))[0]
+        Z, accepted = ss._rejection_sampling_inactive_batch(active,
+                                                            n_points=10)
+        self.assertTrue(np.all(accepted))
+        full = np.dot(active, ss.W1.T)[:, np.newaxis, :] + np.matmul(
+            Z, ss.W2.T)
+        self.assertTrue(np.all(np.abs(full) <= 1 + 1e-10))
+
+    def test_bounding_box_01(self):
+        ss = ActiveSubspaces()
+        ss.evects = np.diag(np.ones(4))
+        ss.partition(2)
+        lbox, ubox = ss._bounding_box(np.array([0.5, -0.5]))
+        np.testing.assert_array_almost_equal(-np.ones((1, 2)), lbox)
+        np.testing.assert_array_almost_equal(np.ones((1, 2)), ubox)
+
+    def test_bounding_box_02(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 80).reshape(16, 5)
+        outputs = np.random.uniform(-1, 3, 16)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(2)
+        active = ss.forward(np.random.uniform(-1, 1, 15).reshape(3, 5))[0]
+        for reduced_input in active:
+            A, b = ss._compute_A_b(reduced_input)
+            for i in range(3):
+                c = np.zeros((3, 1))
+                c[i, 0] = 1.0
+                self.assertAlmostEqual(
+                    linear_program_ineq(c, A, b)[i, 0],
+                    ss._bounding_box(reduced_input)[0][0, i])
+        self.assertGreater(ss._box_solver.n_solves, 0)
+
+    def test_bounding_box_03(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.evects = np.diag(np.ones(4))
+        ss.partition(2)
+        ss._bounding_box(np.array([0.5, -0.5]))
+        solver = ss._box_solver
+        ss.partition(1)
+        ss._bounding_box(np.array([0.5]))
+        self.assertIsNot(solver, ss._box_solver)
+
+    def test_bounding_box_04(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.evects = np.linalg.qr(np.random.uniform(-1, 1, (5, 5)))[0]
+        ss.evects[:, 3] += 0.3 * ss.evects[:, 0]
+        ss.partition(2)
+        reduced_input = np.array([0.1, -0.2])
+        lbox, ubox = ss._bounding_box(reduced_input)
+        self.assertIsNone(ss._box_solver)
+        A, b = ss._compute_A_b(reduced_input)
+        for i in range(3):
+            c = np.zeros((3, 1))
+            c[i, 0] = 1.0
+            self.assertAlmostEqual(linear_program_ineq(c, A, b)[i, 0],
+                                   lbox[0, i])
+
     def test_rejection_sampling_inactive_01(self):
         np.random.seed(42)
         inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
@@ -318,6 +1044,61 @@ class TestUtils(TestCase):
         np.testing.assert_array_almost_equal(np.kron(active, np.ones((10, 1))),
                                              new_inputs.dot(ss.W1))
 
+    def test_rejection_sampling_inactive_03(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        outputs = np.random.uniform(0, 5, 15)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(1)
+        active = ss.forward(np.random.uniform(-1, 1, 4).reshape(1, 4))[0]
+        Z = ss._rejection_sampling_inactive(active[0], n_points=10)
+        self.assertEqual((10, 3), Z.shape)
+        self.assertGreaterEqual(ss.sampling_stats['n_accepted'], 10)
+        self.assertGreaterEqual(ss.sampling_stats['n_draws'],
+                                ss.sampling_stats['n_accepted'])
+        self.assertEqual(0, ss.sampling_stats['n_fallbacks'])
+
+    def test_rejection_sampling_inactive_04(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        outputs = np.random.uniform(0, 5, 15)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(1)
+        active = ss.forward(np.random.uniform(-1, 1, 4).reshape(1, 4))[0]
+        Z = ss._rejection_sampling_inactive(active[0],
+                                            n_points=10,
+                                            max_draws=5)
+        self.assertIsNone(Z)
+        self.assertEqual(5, ss.sampling_stats['n_draws'])
+        self.assertEqual(1, ss.sampling_stats['n_fallbacks'])
+
+    def test_rejection_sampling_inactive_batch_02(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        outputs = np.random.uniform(0, 5, 15)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(1)
+        active = ss.forward(np.random.uniform(-1, 1, 12).reshape(3, 4))[0]
+        Z, accepted = ss._rejection_sampling_inactive_batch(active,
+                                                            n_points=10,
+                                                            max_draws=5)
+        self.assertFalse(np.any(accepted))
+        np.testing.assert_array_equal(np.zeros((3, 10, 3)), Z)
+        self.assertEqual(15, ss.sampling_stats['n_draws'])
+        self.assertEqual(3, ss.sampling_stats['n_fallbacks'])
+
+    def test_oversampling_size(self):
+        self.assertEqual(24, ActiveSubspaces._oversampling_size(10, 0, 0, 100))
+        self.assertEqual(30,
+                         ActiveSubspaces._oversampling_size(10, 70, 5, 100))
+        np.testing.assert_array_equal(
+            np.array([24, 1]),
+            ActiveSubspaces._oversampling_size(10, np.array([0, 99]),
+                                               np.array([0, 1]), 100))
+
     def test_hit_and_run_inactive_01(self):
         np.random.seed(42)
         inputs = np.random.uniform(-1, 1, 60).reshape(15, 4)
@@ -355,6 +1136,42 @@ class TestUtils(TestCase):
         np.testing.assert_array_almost_equal(np.kron(active, np.ones((10, 1))),
                                              new_inputs.dot(ss.W1))
 
+    def test_hit_and_run_inactive_03(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(-1, 1, 80).reshape(16, 5)
+        outputs = np.random.uniform(-1, 3, 16)
+        ss = ActiveSubspaces()
+        ss.compute(inputs=inputs, outputs=outputs, method='local', nboot=250)
+        ss.partition(2)
+        active = ss.forward(np.random.uniform(-1, 1, 15).reshape(3, 5))[0]
+        Z = ss._hit_and_run_inactive_batch(active,
+                                           n_points=20,
+                                           burn_in=5,
+                                           thinning=2,
+                                           n_chains=6)
+        self.assertEqual((3, 20, 3), Z.shape)
+        full = np.dot(active, ss.W1.T)[:, np.newaxis, :] + np.matmul(
+            Z, ss.W2.T)
+        self.assertTrue(np.all(np.abs(full) <= 1 + 1e-10))
+
+    def test_hit_and_run_inactive_04(self):
+        ss = ActiveSubspaces()
+        ss.evects = np.diag(np.ones(3))
+        ss.partition(1)
+        np.random.seed(42)
+        Z = ss._hit_and_run_inactive(np.array([0.]), n_points=2000)
+        np.testing.assert_array_almost_equal(np.zeros(2),
+                                             np.mean(Z, axis=0),
+                                             decimal=1)
+        self.assertTrue(np.all(np.abs(Z) <= 1 + 1e-10))
+
+    def test_chebyshev_center(self):
+        ss = ActiveSubspaces()
+        ss.evects = np.diag(np.ones(3))
+        ss.partition(1)
+        np.testing.assert_array_almost_equal(
+            np.zeros((2, 1)), ss._chebyshev_center(np.array([0.5])))
+
     def test_partition_01(self):
         np.random.seed(42)
         matrix = np.random.uniform(-1, 1, 9).reshape(3, 3)
@@ -559,3 +1376,62 @@ class TestUtils(TestCase):
             ss.plot_sufficient_summary(
                 np.random.uniform(-1, 1, 100).reshape(25, 4),
                 np.random.uniform(-1, 1, 25).reshape(-1, 1))
+
+    def test_polytope_cache_01(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (100, 5)))
+        ss.partition(2)
+        reduced_inputs = np.random.uniform(-0.2, 0.2, (3, 2))
+        lbox, ubox = ss._bounding_box(reduced_inputs[0])
+        ss.polytope_cache = PolytopeCache()
+        for _ in range(2):
+            ss.backward(reduced_inputs, n_points=5)
+        self.assertEqual(3, ss.polytope_cache.misses)
+        self.assertEqual(3, ss.polytope_cache.hits)
+        np.testing.assert_array_almost_equal(
+            lbox, ss._bounding_box(reduced_inputs[0])[0])
+        np.testing.assert_array_almost_equal(
+            ubox, ss._bounding_box(reduced_inputs[0])[1])
+
+    def test_polytope_cache_02(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (100, 5)))
+        ss.partition(2)
+        ss.polytope_cache = PolytopeCache()
+        ss._chebyshev_center(np.array([0.1, 0.1]))
+        self.assertEqual(1, len(ss.polytope_cache))
+        ss.partition(3)
+        self.assertEqual(0, len(ss.polytope_cache))
+
+    def test_polytope_cache_03(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (100, 5)))
+        ss.partition(2)
+        ss.polytope_cache = PolytopeCache(tol=0.1)
+        reduced_input = np.array([0.1, 0.1])
+        lbox, ubox = ss._solve_bounding_box(reduced_input + 0.05)
+        ss._bounding_box(reduced_input)
+        np.testing.assert_array_almost_equal(
+            lbox, ss._bounding_box(reduced_input + 0.05)[0])
+        np.testing.assert_array_almost_equal(
+            ubox, ss._bounding_box(reduced_input + 0.05)[1])
+
+    def test_polytope_cache_04(self):
+        np.random.seed(42)
+        ss = ActiveSubspaces()
+        ss.compute(gradients=np.random.uniform(-1, 1, (100, 5)))
+        ss.partition(2)
+        ss.polytope_cache = PolytopeCache(tol=0.1)
+        reduced_input = np.array([0.1, 0.1])
+        center = ss._chebyshev_center(reduced_input)
+        # a cached center outside the polytope is not reused
+        ss.polytope_cache.put(reduced_input, 'center', center + 10)
+        np.testing.assert_array_almost_equal(
+            ss._solve_chebyshev_center(reduced_input + 0.05),
+            ss._chebyshev_center(reduced_input + 0.05))
+        self.assertTrue(ss._is_interior(reduced_input, center))
+        self.assertFalse(ss._is_interior(reduced_input, center + 10))
+        self.assertEqual(0, ss.polytope_cache.hits)
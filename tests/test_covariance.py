@@ -0,0 +1,128 @@
+from unittest import TestCase
+import os
+import pickle
+import numpy as np
+from athena.covariance import CovarianceAccumulator
+from athena.active import ActiveSubspaces
+
+
+class TestCovarianceAccumulator(TestCase):
+    def test_init_n_params(self):
+        acc = CovarianceAccumulator(n_params=4)
+        self.assertEqual(4, acc.n_params)
+
+    def test_init_metric(self):
+        acc = CovarianceAccumulator(n_params=4)
+        self.assertIsNone(acc.metric)
+
+    def test_init_cov_sum(self):
+        acc = CovarianceAccumulator(n_params=4)
+        np.testing.assert_array_equal(np.zeros((4, 4)), acc.cov_sum)
+
+    def test_init_weights_sum(self):
+        acc = CovarianceAccumulator(n_params=4)
+        self.assertEqual(0., acc.weights_sum)
+
+    def test_init_n_samples(self):
+        acc = CovarianceAccumulator(n_params=4)
+        self.assertEqual(0, acc.n_samples)
+
+    def test_cov_matrix_01(self):
+        acc = CovarianceAccumulator(n_params=4)
+        with self.assertRaises(ValueError):
+            acc.cov_matrix
+
+    def test_cov_matrix_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        acc = CovarianceAccumulator(n_params=4)
+        acc.update(gradients)
+        np.testing.assert_array_almost_equal(
+            np.dot(gradients.T, gradients) / 15, acc.cov_matrix)
+
+    def test_update_01(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        acc = CovarianceAccumulator(n_params=3)
+        with self.assertRaises(ValueError):
+            acc.update(gradients)
+
+    def test_update_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        acc = CovarianceAccumulator(n_params=4)
+        acc.update(gradients, weights=weights)
+        self.assertEqual(15, acc.n_samples)
+        self.assertAlmostEqual(np.sum(weights), acc.weights_sum)
+
+    def test_merge_01(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        metric = np.diag(2 * np.ones(3))
+        acc = CovarianceAccumulator(n_params=4, metric=metric)
+        acc.update(gradients)
+        acc1 = CovarianceAccumulator(n_params=4, metric=metric)
+        acc1.update(gradients[:8])
+        acc2 = CovarianceAccumulator(n_params=4, metric=metric)
+        acc2.update(gradients[8:])
+        acc1.merge(acc2)
+        np.testing.assert_array_almost_equal(acc.cov_matrix, acc1.cov_matrix)
+        self.assertEqual(15, acc1.n_samples)
+
+    def test_merge_02(self):
+        acc1 = CovarianceAccumulator(n_params=4)
+        acc2 = CovarianceAccumulator(n_params=3)
+        with self.assertRaises(ValueError):
+            acc1.merge(acc2)
+
+    def test_merge_03(self):
+        acc1 = CovarianceAccumulator(n_params=4)
+        acc2 = CovarianceAccumulator(n_params=4, metric=np.diag(np.ones(3)))
+        with self.assertRaises(ValueError):
+            acc1.merge(acc2)
+
+    def test_add(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        acc1 = CovarianceAccumulator(n_params=4)
+        acc1.update(gradients[:8])
+        acc2 = CovarianceAccumulator(n_params=4)
+        acc2.update(gradients[8:])
+        acc = acc1 + acc2
+        self.assertEqual(8, acc1.n_samples)
+        self.assertEqual(15, acc.n_samples)
+
+    def test_save_load(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        acc = CovarianceAccumulator(n_params=4, metric=np.diag(np.ones(3)))
+        acc.update(gradients)
+        acc.save('tests/data/accumulator.npz')
+        loaded = CovarianceAccumulator.load('tests/data/accumulator.npz')
+        os.remove('tests/data/accumulator.npz')
+        np.testing.assert_array_almost_equal(acc.cov_matrix,
+                                             loaded.cov_matrix)
+        np.testing.assert_array_equal(acc.metric, loaded.metric)
+        self.assertEqual(15, loaded.n_samples)
+
+    def test_pickle(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        acc = CovarianceAccumulator(n_params=4)
+        acc.update(gradients)
+        loaded = pickle.loads(pickle.dumps(acc))
+        np.testing.assert_array_almost_equal(acc.cov_matrix,
+                                             loaded.cov_matrix)
+
+    def test_decompose(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        acc1 = CovarianceAccumulator(n_params=4)
+        acc1.update(gradients[:8])
+        acc2 = CovarianceAccumulator(n_params=4)
+        acc2.update(gradients[8:])
+        ss = ActiveSubspaces()
+        ss.decompose(acc1 + acc2)
+        true_evals = np.array([0.571596, 0.465819, 0.272198, 0.175012])
+        np.testing.assert_array_almost_equal(true_evals, ss.evals)
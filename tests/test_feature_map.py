@@ -1,6 +1,12 @@
 from unittest import TestCase
 import numpy as np
-from athena import FeatureMap, rff_map, rff_jac
+from athena import (FeatureMap, rff_map, rff_jac, rff_jac_diag,
+                    rff_map_and_jac_diag)
+from athena.feature_map import _map_objective
+
+
+def objective(x, shift=0.):
+    return np.sin(x[0] + x[1]) + shift
 
 
 class TestProjectionFactory(TestCase):
@@ -142,6 +148,112 @@ class TestProjectionFactory(TestCase):
                                 [-0.93447546, -0.92229763]]])
         np.testing.assert_array_almost_equal(true_value, fmap_jac)
 
+    def test_rff_map_float32(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(size=(5, 2))
+        pr_matrix = np.random.uniform(size=(3, 2))
+        bias = np.ones((1, 3))
+        fmap = rff_map(inputs.astype(np.float32), pr_matrix, bias, 3, 0.9)
+        self.assertEqual(np.float32, fmap.dtype)
+        np.testing.assert_array_almost_equal(
+            rff_map(inputs, pr_matrix, bias, 3, 0.9), fmap)
+
+    def test_rff_jac_float32(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(size=(5, 2))
+        pr_matrix = np.random.uniform(size=(3, 2))
+        bias = np.ones((1, 3))
+        jac = rff_jac(inputs.astype(np.float32), pr_matrix, bias, 3, 0.9)
+        self.assertEqual(np.float32, jac.dtype)
+        np.testing.assert_array_almost_equal(
+            rff_jac(inputs, pr_matrix, bias, 3, 0.9), jac)
+
+    def test_rff_jac_diag(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(size=(5, 2))
+        pr_matrix = np.random.uniform(size=(3, 2))
+        bias = np.ones((1, 3))
+        jac_diag = rff_jac_diag(inputs, pr_matrix, bias, 3, 0.9)
+        np.testing.assert_array_almost_equal(
+            rff_jac(inputs, pr_matrix, bias, 3, 0.9),
+            jac_diag[:, :, np.newaxis] * pr_matrix)
+
+    def test_rff_map_and_jac_diag(self):
+        np.random.seed(42)
+        inputs = np.random.uniform(size=(5, 2))
+        pr_matrix = np.random.uniform(size=(3, 2))
+        bias = np.ones((1, 3))
+        fmap, jac_diag = rff_map_and_jac_diag(inputs, pr_matrix, bias, 3, 0.9)
+        np.testing.assert_array_almost_equal(
+            rff_map(inputs, pr_matrix, bias, 3, 0.9), fmap)
+        np.testing.assert_array_almost_equal(
+            rff_jac_diag(inputs, pr_matrix, bias, 3, 0.9), jac_diag)
+
+    def test_compute_fmap_and_jac_01(self):
+        np.random.seed(42)
+        fm = FeatureMap(distr='laplace',
+                        bias=np.ones((1, 3)),
+                        input_dim=2,
+                        n_features=3,
+                        params=[0.8, 2.3],
+                        sigma_f=0.9)
+        inputs = np.random.uniform(size=(5, 2))
+        fmap, jac = fm.compute_fmap_and_jac(inputs)
+        np.testing.assert_array_almost_equal(fm.compute_fmap(inputs), fmap)
+        np.testing.assert_array_almost_equal(fm.compute_fmap_jac(inputs), jac)
+
+    def test_compute_fmap_and_jac_02(self):
+        np.random.seed(42)
+        fm = FeatureMap(distr='laplace',
+                        bias=np.ones((1, 3)),
+                        input_dim=2,
+                        n_features=3,
+                        params=[0.8, 2.3],
+                        sigma_f=0.9)
+        inputs = np.random.uniform(size=(5, 2))
+        jac_diag = fm.compute_fmap_and_jac(inputs, jac_diag=True)[1]
+        np.testing.assert_array_almost_equal(
+            fm.compute_fmap_jac_diag(inputs), jac_diag)
+
+    def test_compute_fmap_and_jac_03(self):
+        np.random.seed(42)
+        fm = FeatureMap(distr='laplace',
+                        bias=np.ones((1, 3)),
+                        input_dim=2,
+                        n_features=3,
+                        params=[0.8, 2.3],
+                        sigma_f=0.9)
+        fm.fmap = lambda inputs, *args: np.tanh(inputs)
+        inputs = np.random.uniform(size=(5, 2))
+        fmap, jac = fm.compute_fmap_and_jac(inputs)
+        np.testing.assert_array_almost_equal(np.tanh(inputs), fmap)
+        np.testing.assert_array_almost_equal(fm.compute_fmap_jac(inputs), jac)
+
+    def test_compute_fmap_jac_diag_01(self):
+        np.random.seed(42)
+        fm = FeatureMap(distr='laplace',
+                        bias=np.ones((1, 3)),
+                        input_dim=2,
+                        n_features=3,
+                        params=[0.8, 2.3],
+                        sigma_f=0.9)
+        inputs = np.random.uniform(size=(5, 2))
+        jac_diag = fm.compute_fmap_jac_diag(inputs)
+        np.testing.assert_array_almost_equal(
+            fm.compute_fmap_jac(inputs),
+            jac_diag[:, :, np.newaxis] * fm.pr_matrix)
+
+    def test_compute_fmap_jac_diag_02(self):
+        fm = FeatureMap(distr='laplace',
+                        bias=np.ones((1, 3)),
+                        input_dim=2,
+                        n_features=3,
+                        params=[0.8, 2.3],
+                        sigma_f=0.9)
+        fm.fmap_jac = lambda *args: None
+        with self.assertRaises(ValueError):
+            fm.compute_fmap_jac_diag(np.ones((5, 2)))
+
     def test_tune_pr_matrix_none_01(self):
         np.random.seed(42)
         fm = FeatureMap(distr='multivariate_normal',
@@ -232,3 +344,137 @@ class TestProjectionFactory(TestCase):
                                [0.57626534, 0.6273798], [0.3170462, 0.8636379],
                                [0.97294359, 0.99518304]])
         np.testing.assert_array_almost_equal(true_value, fm.pr_matrix)
+
+    def test_tune_pr_matrix_brute_n_jobs(self):
+        fm = FeatureMap(distr='uniform',
+                        bias=None,
+                        input_dim=2,
+                        n_features=5,
+                        params=[0.1, 0.3],
+                        sigma_f=0.1)
+        bounds = (slice(-np.pi, 0, 0.25), slice(1, 2, 0.25))
+        fm.tune_pr_matrix(objective, bounds, args=(1., ), method='brute')
+        params = fm.params
+        fm.tune_pr_matrix(objective,
+                          bounds,
+                          args=(1., ),
+                          method='brute',
+                          n_jobs=2)
+        np.testing.assert_array_almost_equal(params, fm.params)
+
+    def test_tune_pr_matrix_brute_cache(self):
+        fm = FeatureMap(distr='uniform',
+                        bias=None,
+                        input_dim=2,
+                        n_features=5,
+                        params=[0.1, 0.3],
+                        sigma_f=0.1)
+        calls = []
+
+        def func(x):
+            calls.append(x)
+            return np.sin(x[0] + x[1])
+
+        bounds = (slice(-np.pi, 0, 0.25), slice(1, 2, 0.25))
+        cache = {}
+        fm.tune_pr_matrix(func,
+                          bounds,
+                          method='brute',
+                          decimals=6,
+                          cache=cache)
+        n_calls = len(calls)
+        self.assertEqual(n_calls, len(cache))
+        fm.tune_pr_matrix(func,
+                          bounds,
+                          method='brute',
+                          decimals=6,
+                          cache=cache)
+        self.assertEqual(n_calls, len(calls))
+
+    def test_tune_pr_matrix_dual_annealing_cache(self):
+        np.random.seed(42)
+        fm = FeatureMap(distr='beta',
+                        bias=None,
+                        input_dim=2,
+                        n_features=5,
+                        params=[0.1, 0.3],
+                        sigma_f=0.1)
+        func = lambda x: np.sin(x[0] + x[1])
+        bounds = (slice(3, 4, 0.25), slice(1, 2, 0.25))
+        cache = {}
+        fm.tune_pr_matrix(func,
+                          bounds,
+                          method='dual_annealing',
+                          maxiter=10,
+                          decimals=8,
+                          cache=cache)
+        self.assertAlmostEqual(min(cache.values()), func(fm.params))
+
+    def test_tune_pr_matrix_dual_annealing_n_jobs(self):
+        np.random.seed(42)
+        fm = FeatureMap(distr='beta',
+                        bias=None,
+                        input_dim=2,
+                        n_features=5,
+                        params=[0.1, 0.3],
+                        sigma_f=0.1)
+        bounds = (slice(3, 4, 0.25), slice(1, 2, 0.25))
+        cache = {}
+        fm.tune_pr_matrix(objective,
+                          bounds,
+                          method='dual_annealing',
+                          maxiter=10,
+                          n_jobs=2,
+                          decimals=8,
+                          cache=cache)
+        self.assertAlmostEqual(min(cache.values()), objective(fm.params))
+        self.assertTrue(np.all(fm.params >= [3, 1]))
+        self.assertTrue(np.all(fm.params <= [4, 2]))
+
+    def test_tune_pr_matrix_dual_annealing_n_jobs_maxiter(self):
+        bounds = (slice(3, 4, 0.25), slice(1, 2, 0.25))
+        n_evals = []
+        for n_jobs in (None, 4):
+            np.random.seed(42)
+            fm = FeatureMap(distr='beta',
+                            bias=None,
+                            input_dim=2,
+                            n_features=5,
+                            params=[0.1, 0.3],
+                            sigma_f=0.1)
+            cache = {}
+            fm.tune_pr_matrix(objective,
+                              bounds,
+                              method='dual_annealing',
+                              maxiter=12,
+                              n_jobs=n_jobs,
+                              decimals=12,
+                              cache=cache)
+            n_evals.append(len(cache))
+        self.assertLessEqual(n_evals[1], n_evals[0] + 4)
+
+    def test_tune_pr_matrix_n_jobs_raises(self):
+        fm = FeatureMap(distr='beta',
+                        bias=None,
+                        input_dim=2,
+                        n_features=5,
+                        params=[0.1, 0.3],
+                        sigma_f=0.1)
+        bounds = (slice(3, 4, 0.25), slice(1, 2, 0.25))
+        with self.assertRaises(ValueError):
+            fm.tune_pr_matrix(objective, bounds, method='simplex', n_jobs=2)
+
+    def test_map_objective(self):
+        calls = []
+
+        def func(x):
+            calls.append(x)
+            return x[0]
+
+        points = [np.array([0.1, 1.]), np.array([0.1000001, 1.]),
+                  np.array([0.2, 1.])]
+        cache = {}
+        values = _map_objective(func, points, decimals=3, cache=cache)
+        np.testing.assert_array_almost_equal(values, [0.1, 0.1, 0.2])
+        self.assertEqual(len(calls), 2)
+
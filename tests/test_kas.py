@@ -1,7 +1,10 @@
 from unittest import TestCase
 import numpy as np
+from athena.active import ActiveSubspaces
 from athena.kas import KernelActiveSubspaces
 from contextlib import contextmanager
+import os
+import tempfile
 import matplotlib.pyplot as plt
 
 
@@ -107,6 +110,38 @@ class TestUtils(TestCase):
              [-0.25241469, 0.1389674, 0.07479708, 0.95466239]])
         np.testing.assert_array_almost_equal(true_evects, ss.evects)
 
+    def test_compute_04(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        inputs = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            inputs_file = os.path.join(tmpdir, 'inputs.npy')
+            gradients_file = os.path.join(tmpdir, 'gradients.npy')
+            np.save(inputs_file, inputs)
+            np.save(gradients_file, gradients)
+            ss = KernelActiveSubspaces()
+            ss.compute(inputs=inputs_file,
+                       gradients=np.load(gradients_file, mmap_mode='r'),
+                       method='exact',
+                       nboot=None,
+                       n_features=4,
+                       feature_map=None,
+                       block_size=4)
+        true_evals = np.array([0.42588097, 0.19198234, 0.08228976, 0.0068496])
+        np.testing.assert_array_almost_equal(true_evals, ss.evals)
+        self.assertIsNone(ss.pseudo_gradients)
+
+    def test_compute_05(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        inputs = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        ss = KernelActiveSubspaces()
+        with self.assertRaises(ValueError):
+            ss.compute(inputs=inputs,
+                       gradients=iter(np.split(gradients, 3)),
+                       method='exact',
+                       n_features=4)
+
     # def test_compute_05(self):
     #     np.random.seed(42)
     #     inputs = np.random.uniform(-1, 1, 30).reshape(15, 2)
@@ -143,6 +178,215 @@ class TestUtils(TestCase):
     #                             [-0.350612, 0.377813, 0.636254, -0.574029]])
     #     np.testing.assert_array_almost_equal(true_evects, ss.evects)
 
+    def test_compute_07(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 30).reshape(15, 1, 2)
+        inputs = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        ss1 = KernelActiveSubspaces()
+        ss1.compute(inputs=inputs,
+                    gradients=gradients,
+                    method='exact',
+                    nboot=20,
+                    n_features=4)
+        ss2 = KernelActiveSubspaces()
+        ss2.compute(inputs=inputs,
+                    gradients=gradients,
+                    method='exact',
+                    nboot=20,
+                    n_features=4,
+                    feature_map=ss1.feature_map,
+                    dtype=np.float32)
+        self.assertEqual(np.float32, ss2.pseudo_gradients.dtype)
+        self.assertEqual(np.float32, ss2.features.dtype)
+        self.assertEqual(np.float64, ss2.evects.dtype)
+        np.testing.assert_allclose(ss1.evals, ss2.evals, rtol=1e-4)
+
+    def test_reparametrize_01(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 90).reshape(15, 2, 3)
+        inputs = np.random.uniform(-1, 1, 45).reshape(15, 3)
+        ss = KernelActiveSubspaces()
+        ss._init_feature_map(inputs, n_features=6)
+        pseudo_gradients, features = ss._reparametrize(inputs,
+                                                       gradients,
+                                                       block_size=4)
+        jacobian = ss.feature_map.compute_fmap_jac(inputs)
+        for i in range(15):
+            true_value = np.linalg.lstsq(jacobian[i].T,
+                                         gradients[i].T,
+                                         rcond=None)[0].T
+            np.testing.assert_array_almost_equal(true_value,
+                                                 pseudo_gradients[i])
+        np.testing.assert_array_almost_equal(
+            ss.feature_map.compute_fmap(inputs), features)
+
+    def test_solve_pseudo_gradients_01(self):
+        np.random.seed(42)
+        jacobian = np.random.uniform(-1, 1, (10, 2, 5))
+        gradients = np.random.uniform(-1, 1, (10, 1, 5))
+        pseudo_gradients = KernelActiveSubspaces._solve_pseudo_gradients(
+            jacobian, gradients)
+        self.assertEqual((10, 1, 2), pseudo_gradients.shape)
+        for i in range(10):
+            true_value = np.linalg.lstsq(jacobian[i].T,
+                                         gradients[i].T,
+                                         rcond=None)[0].T
+            np.testing.assert_array_almost_equal(true_value,
+                                                 pseudo_gradients[i])
+
+    def test_solve_pseudo_gradients_02(self):
+        np.random.seed(42)
+        jacobian = np.random.uniform(-1, 1, (10, 4, 2))
+        jacobian[3, :, 1] = 0
+        gradients = np.random.uniform(-1, 1, (10, 1, 2))
+        pseudo_gradients = KernelActiveSubspaces._solve_pseudo_gradients(
+            jacobian, gradients)
+        for i in range(10):
+            true_value = np.linalg.lstsq(jacobian[i].T,
+                                         gradients[i].T,
+                                         rcond=None)[0].T
+            np.testing.assert_array_almost_equal(true_value,
+                                                 pseudo_gradients[i])
+
+    def test_reparametrize_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 90).reshape(15, 2, 3)
+        inputs = np.random.uniform(-1, 1, 45).reshape(15, 3)
+        ss = KernelActiveSubspaces()
+        ss._init_feature_map(inputs, n_features=6)
+        true_value = ss._reparametrize(inputs, gradients)[0]
+        pseudo_gradients = ss._reparametrize(inputs,
+                                             gradients,
+                                             block_size=4,
+                                             jacobian_free=True)[0]
+        np.testing.assert_array_almost_equal(true_value, pseudo_gradients)
+
+    def test_reparametrize_03(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 90).reshape(15, 2, 3)
+        inputs = np.random.uniform(-1, 1, 45).reshape(15, 3)
+        ss = KernelActiveSubspaces()
+        ss._init_feature_map(inputs, n_features=6)
+        ss.feature_map.fmap_jac = lambda inputs, pr_matrix, *args: np.tile(
+            pr_matrix, (inputs.shape[0], 1, 1))
+        true_value = ss._reparametrize(inputs, gradients)[0]
+        pseudo_gradients = ss._reparametrize(inputs,
+                                             gradients,
+                                             jacobian_free=True)[0]
+        np.testing.assert_array_almost_equal(true_value, pseudo_gradients)
+
+    def test_solve_pseudo_gradients_diag(self):
+        np.random.seed(42)
+        jac_diag = np.random.uniform(-1, 1, (10, 6))
+        pr_matrix = np.random.uniform(-1, 1, (6, 3))
+        gradients = np.random.uniform(-1, 1, (10, 2, 3))
+        pseudo_gradients = KernelActiveSubspaces._solve_pseudo_gradients_diag(
+            jac_diag, pr_matrix, gradients)
+        true_value = KernelActiveSubspaces._solve_pseudo_gradients(
+            jac_diag[:, :, np.newaxis] * pr_matrix, gradients)
+        np.testing.assert_array_almost_equal(true_value, pseudo_gradients)
+        pseudo_gradients = KernelActiveSubspaces._solve_pseudo_gradients_diag(
+            jac_diag, pr_matrix, gradients, feature_chunk=4)
+        np.testing.assert_array_almost_equal(true_value, pseudo_gradients)
+
+    def test_compute_08(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 30).reshape(15, 1, 2)
+        inputs = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        ss1 = KernelActiveSubspaces()
+        ss1.compute(inputs=inputs,
+                    gradients=gradients,
+                    method='exact',
+                    nboot=20,
+                    n_features=4)
+        ss2 = KernelActiveSubspaces()
+        ss2.compute(inputs=inputs,
+                    gradients=gradients,
+                    method='exact',
+                    nboot=20,
+                    n_features=4,
+                    feature_map=ss1.feature_map,
+                    jacobian_free=True)
+        np.testing.assert_array_almost_equal(ss1.evals, ss2.evals)
+
+    def test_compute_09(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(30, 1, 2)
+        inputs = np.random.uniform(-1, 1, 60).reshape(30, 2)
+        ss = KernelActiveSubspaces()
+        ss.compute(inputs=inputs,
+                   gradients=gradients,
+                   method='exact',
+                   nboot=200,
+                   n_features=8,
+                   n_components=2,
+                   seed=0)
+        self.assertEqual(ss.evals_br.shape, (3, 2))
+        self.assertTrue(np.all(ss.evals_br[:3, 0] <= ss.evals_br[:3, 1]))
+
+    def test_compute_10(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(30, 1, 2)
+        inputs = np.random.uniform(-1, 1, 60).reshape(30, 2)
+        ss1 = KernelActiveSubspaces()
+        ss1.compute(inputs=inputs,
+                    gradients=gradients,
+                    method='exact',
+                    nboot=20,
+                    n_features=8,
+                    n_components=2,
+                    seed=3)
+        ss2 = KernelActiveSubspaces()
+        ss2.compute(inputs=inputs,
+                    gradients=gradients,
+                    method='exact',
+                    nboot=20,
+                    n_features=8,
+                    n_components=2,
+                    feature_map=ss1.feature_map,
+                    n_jobs=2,
+                    seed=3)
+        np.testing.assert_array_equal(ss1.evals_br, ss2.evals_br)
+        np.testing.assert_array_equal(ss1.subs_br, ss2.subs_br)
+
+    def test_compute_11(self):
+        ss = KernelActiveSubspaces()
+        with self.assertRaises(ValueError):
+            ss.compute(inputs=np.zeros((4, 2)),
+                       gradients=np.zeros((4, 1, 2)),
+                       method='exact',
+                       solver='randomized')
+
+    def test_decompose_bootstrap_replicate_svd(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 120).reshape(20, 1, 6)
+        weights = np.random.uniform(0, 1, (20, 1))
+        evals, evects = KernelActiveSubspaces._decompose_bootstrap_replicate_svd(
+            gradients, weights, np.random.default_rng(7), n_components=2,
+            solver='lanczos')
+        counts = KernelActiveSubspaces._bootstrap_counts(
+            20, np.random.default_rng(7))
+        matrix = np.einsum('i,ij,ik->jk', np.ravel(weights * counts),
+                           gradients[:, 0], gradients[:, 0])
+        true_evals = np.linalg.eigvalsh(matrix)[::-1]
+        np.testing.assert_array_almost_equal(evals, true_evals[:3])
+        np.testing.assert_array_almost_equal(
+            np.abs(evects[:, :2].T @ matrix @ evects[:, :2]),
+            np.diag(true_evals[:2]))
+
+    def test_decompose_bootstrap_replicate_svd_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 240).reshape(20, 2, 6)
+        weights = np.random.uniform(0, 1, (20, 1))
+        evals, evects = KernelActiveSubspaces._decompose_bootstrap_replicate_svd(
+            gradients, weights, np.random.default_rng(7), n_components=2)
+        counts = KernelActiveSubspaces._bootstrap_counts(
+            20, np.random.default_rng(7))
+        matrix = np.einsum('i,ijk,ijl->kl', np.ravel(weights * counts),
+                           gradients, gradients)
+        true_evals = np.linalg.eigvalsh(matrix)[::-1]
+        np.testing.assert_array_almost_equal(evals, true_evals[:3])
+
     def test_forward_01(self):
         np.random.seed(42)
         gradients = np.random.uniform(-1, 1, 30).reshape(15, 1, 2)
@@ -182,6 +426,23 @@ class TestUtils(TestCase):
                                   [-0.27475082, 0.36433068]])
         np.testing.assert_array_almost_equal(true_inactive, inactive)
 
+    def test_forward_03(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 30).reshape(15, 1, 2)
+        inputs = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        ss = KernelActiveSubspaces()
+        ss.compute(inputs=inputs,
+                   gradients=gradients,
+                   method='exact',
+                   n_features=4)
+        ss.partition(2)
+        new_inputs = np.random.uniform(-1, 1, (13, 2))
+        active, inactive = ss.forward(new_inputs, chunk_size=4)
+        features = ss.feature_map.compute_fmap(new_inputs)
+        np.testing.assert_array_almost_equal(np.dot(features, ss.W1), active)
+        np.testing.assert_array_almost_equal(np.dot(features, ss.W2),
+                                             inactive)
+
     def test_partition_01(self):
         np.random.seed(42)
         matrix = np.random.uniform(-1, 1, 9).reshape(3, 3)
@@ -222,6 +483,44 @@ class TestUtils(TestCase):
         with self.assertRaises(ValueError):
             ss.partition(dim=4)
 
+    def test_save_load_01(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 30).reshape(15, 1, 2)
+        inputs = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        ss = KernelActiveSubspaces()
+        ss.compute(inputs=inputs,
+                   gradients=gradients,
+                   method='exact',
+                   nboot=20,
+                   n_features=4,
+                   feature_map=None)
+        ss.partition(2)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ss.save(tmpdir)
+            ss2 = KernelActiveSubspaces()
+            ss2.load(tmpdir, mmap_mode=None)
+        test_inputs = np.random.uniform(-1, 1, 4).reshape(2, 2)
+        np.testing.assert_array_equal(ss.forward(test_inputs)[0],
+                                      ss2.forward(test_inputs)[0])
+        self.assertEqual(4, ss2.n_features)
+        self.assertEqual(1, ss2.feature_map.sigma_f)
+
+    def test_save_load_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 30).reshape(15, 1, 2)
+        inputs = np.random.uniform(-1, 1, 30).reshape(15, 2)
+        ss = KernelActiveSubspaces()
+        ss.compute(inputs=inputs,
+                   gradients=gradients,
+                   method='exact',
+                   nboot=20,
+                   n_features=4,
+                   feature_map=None)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ss.save(tmpdir)
+            with self.assertRaises(ValueError):
+                ActiveSubspaces().load(tmpdir)
+
     def test_bootstrap_replicate_01(self):
         np.random.seed(42)
         matrix = np.random.uniform(-1, 1, 9).reshape(3, 3)
@@ -36,6 +36,10 @@ class TestUtils(TestCase):
         ss = Subspaces()
         self.assertIsNone(ss.cov_matrix)
 
+    def test_init_dtype(self):
+        ss = Subspaces()
+        self.assertIsNone(ss.dtype)
+
     def test_compute(self):
         ss = Subspaces()
         with self.assertRaises(NotImplementedError):
@@ -110,6 +114,145 @@ class TestUtils(TestCase):
                                 [-0.25091976, 0.90142861, 0.46398788]])
         np.testing.assert_array_almost_equal(true_matrix, mat)
 
+    def test_bootstrap_counts_01(self):
+        np.random.seed(42)
+        ss = Subspaces()
+        counts = ss._bootstrap_counts(10)
+        self.assertEqual((10, 1), counts.shape)
+        self.assertEqual(10, np.sum(counts))
+
+    def test_bootstrap_counts_02(self):
+        np.random.seed(42)
+        matrix = np.random.uniform(-1, 1, 12).reshape(4, 3)
+        weights = np.ones((4, 1)) / 4
+        ss = Subspaces()
+        state = np.random.get_state()
+        mat, wei = ss._bootstrap_replicate(matrix, weights)
+        np.random.set_state(state)
+        counts = ss._bootstrap_counts(4)
+        np.testing.assert_array_almost_equal(
+            np.dot(mat.T, wei * mat),
+            np.dot(matrix.T, weights * counts * matrix))
+
+    def test_bootstrap_counts_03(self):
+        ss = Subspaces()
+        counts1 = ss._bootstrap_counts(10, np.random.default_rng(3))
+        counts2 = ss._bootstrap_counts(10, np.random.default_rng(3))
+        np.testing.assert_array_equal(counts1, counts2)
+
+    def test_decompose_bootstrap_replicate(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.ones((15, 1)) / 15
+        ss = Subspaces()
+        evals, evects = ss._decompose_bootstrap_replicate(
+            gradients, weights, np.random.default_rng(3))
+        counts = ss._bootstrap_counts(15, np.random.default_rng(3))
+        cov_matrix = np.dot(gradients.T, weights * counts * gradients)
+        np.testing.assert_array_almost_equal(
+            cov_matrix, np.dot(evects * evals, evects.T))
+
+    def test_metric_factor_01(self):
+        np.random.seed(42)
+        matrix = np.random.uniform(-1, 1, 9).reshape(3, 3)
+        metric = np.dot(matrix, matrix.T) + np.diag(np.ones(3))
+        factor, signs = Subspaces._metric_factor(metric)
+        np.testing.assert_array_almost_equal(
+            metric, np.dot(factor.T, signs.reshape(-1, 1) * factor))
+
+    def test_metric_factor_02(self):
+        metric = np.diag([2., 0., -1.])
+        factor, signs = Subspaces._metric_factor(metric)
+        np.testing.assert_array_almost_equal(
+            metric, np.dot(factor.T, signs.reshape(-1, 1) * factor))
+
+    def test_assemble_cov_matrix_01(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        cov_matrix = Subspaces._assemble_cov_matrix(gradients,
+                                                    weights,
+                                                    block_size=4)
+        true_cov_matrix = np.dot(gradients.T, weights * gradients)
+        np.testing.assert_array_almost_equal(true_cov_matrix, cov_matrix)
+
+    def test_assemble_cov_matrix_03(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        cov_matrix = Subspaces._assemble_cov_matrix(
+            gradients.astype(np.float32), weights, block_size=4)
+        self.assertEqual(np.float64, cov_matrix.dtype)
+        true_cov_matrix = np.dot(gradients.T, weights * gradients)
+        np.testing.assert_array_almost_equal(true_cov_matrix, cov_matrix,
+                                             decimal=5)
+
+    def test_assemble_cov_matrix_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        matrix = np.random.uniform(-1, 1, 9).reshape(3, 3)
+        metric = np.dot(matrix, matrix.T) + np.diag(np.ones(3))
+        cov_matrix = Subspaces._assemble_cov_matrix(gradients,
+                                                    weights,
+                                                    metric=metric,
+                                                    block_size=4)
+        true_cov_matrix = np.sum([
+            weights[i, 0] *
+            np.dot(gradients[i, :, :].T, np.dot(metric, gradients[i, :, :]))
+            for i in range(gradients.shape[0])
+        ],
+                                 axis=0)
+        np.testing.assert_array_almost_equal(true_cov_matrix, cov_matrix)
+
+    def test_assemble_cov_matrix_03(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        weights = np.ones((15, 1)) / 15
+        cov_matrix = Subspaces._assemble_cov_matrix(gradients,
+                                                    weights,
+                                                    block_size=7)
+        true_cov_matrix = Subspaces._assemble_cov_matrix(
+            gradients, weights, metric=np.diag(np.ones(3)))
+        np.testing.assert_array_almost_equal(true_cov_matrix, cov_matrix)
+
+    def test_cov_matrix_trace_01(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 60).reshape(15, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        trace = Subspaces._cov_matrix_trace(gradients, weights, block_size=4)
+        true_trace = np.trace(
+            Subspaces._assemble_cov_matrix(gradients, weights))
+        self.assertAlmostEqual(true_trace, trace)
+
+    def test_cov_matrix_trace_02(self):
+        np.random.seed(42)
+        gradients = np.random.uniform(-1, 1, 180).reshape(15, 3, 4)
+        weights = np.random.uniform(0, 1, 15).reshape(15, 1)
+        metric = np.diag([1., 2., 3.])
+        trace = Subspaces._cov_matrix_trace(gradients,
+                                            weights,
+                                            metric=metric,
+                                            block_size=4)
+        true_trace = np.trace(
+            Subspaces._assemble_cov_matrix(gradients, weights, metric=metric))
+        self.assertAlmostEqual(true_trace, trace)
+
+    def test_complete_basis(self):
+        np.random.seed(42)
+        evects = np.linalg.qr(np.random.uniform(-1, 1, 10).reshape(5, 2))[0]
+        basis = Subspaces._complete_basis(evects)
+        np.testing.assert_array_almost_equal(evects, basis[:, :2])
+        np.testing.assert_array_almost_equal(np.diag(np.ones(5)),
+                                             np.dot(basis.T, basis))
+
+    def test_partition_06(self):
+        ss = Subspaces()
+        ss.evects = np.diag(np.ones(4))
+        ss.evals = np.array([3., 2., 1.])
+        with self.assertRaises(ValueError):
+            ss.partition(dim=4)
+
     def test_plot_eigenvalues(self):
         ss = Subspaces()
         with self.assertRaises(ValueError):
@@ -1,7 +1,9 @@
 from unittest import TestCase
 import numpy as np
-from athena.utils import (Normalizer, initialize_weights, linear_program_ineq,
-                          local_linear_gradients, sort_eigpairs)
+from athena.utils import (BoundingBoxSolver, Normalizer, initialize_weights,
+                          linear_program_eq, linear_program_ineq,
+                          local_linear_gradients, PolytopeCache, sort_eigpairs,
+                          subspace_distances, truncated_svd)
 
 
 class TestUtils(TestCase):
@@ -83,3 +85,194 @@ class TestUtils(TestCase):
                                 [-0.653819, -0.286001, 0.700517],
                                 [0.557657, -0.807881, 0.190647]])
         np.testing.assert_array_almost_equal(true_evects, evects)
+
+    def test_truncated_svd_01(self):
+        np.random.seed(42)
+        matrix = np.random.uniform(-1, 1, 200).reshape(40, 5)
+        singular = truncated_svd(matrix, n_components=2)[0]
+        true_singular = np.linalg.svd(matrix, compute_uv=False)[:2]
+        np.testing.assert_array_almost_equal(true_singular, singular)
+
+    def test_truncated_svd_02(self):
+        np.random.seed(42)
+        matrix = np.random.uniform(-1, 1, 200).reshape(40, 5)
+        evects = truncated_svd(matrix, n_components=2, solver='lanczos')[1]
+        true_evects = sort_eigpairs(np.dot(matrix.T, matrix))[1][:, :2]
+        np.testing.assert_array_almost_equal(true_evects, evects)
+
+    def test_truncated_svd_03(self):
+        np.random.seed(42)
+        matrix = np.random.uniform(-1, 1, 200).reshape(40, 5)
+        evects = truncated_svd(matrix, n_components=5, solver='lanczos')[1]
+        true_evects = sort_eigpairs(np.dot(matrix.T, matrix))[1]
+        np.testing.assert_array_almost_equal(true_evects, evects)
+
+    def test_truncated_svd_04(self):
+        matrix = np.diag(np.ones(3))
+        with self.assertRaises(ValueError):
+            truncated_svd(matrix, n_components=2, solver='arnoldi')
+
+    def test_truncated_svd_05(self):
+        np.random.seed(42)
+        matrix = np.random.uniform(-1, 1, 400).reshape(40, 10)
+        for solver in ('randomized', 'lanczos'):
+            svd1 = truncated_svd(matrix,
+                                 n_components=2,
+                                 solver=solver,
+                                 n_iter=0,
+                                 rng=np.random.default_rng(3))
+            np.random.seed(0)
+            svd2 = truncated_svd(matrix,
+                                 n_components=2,
+                                 solver=solver,
+                                 n_iter=0,
+                                 rng=np.random.default_rng(3))
+            np.testing.assert_array_equal(svd1[0], svd2[0])
+            np.testing.assert_array_equal(svd1[1], svd2[1])
+
+    def test_truncated_svd_06(self):
+        np.random.seed(42)
+        matrix = np.random.uniform(-1, 1, 400).reshape(40, 10)
+        row_weights = np.random.uniform(0, 2, 40)
+        true_svd = truncated_svd(row_weights.reshape(-1, 1) * matrix,
+                                 n_components=10)
+        for solver, n_components in (('randomized', 3), ('lanczos', 3),
+                                     ('randomized', 10)):
+            singular, evects = truncated_svd(matrix,
+                                             n_components=n_components,
+                                             solver=solver,
+                                             row_weights=row_weights)
+            np.testing.assert_array_almost_equal(
+                true_svd[0][:n_components], singular)
+            np.testing.assert_array_almost_equal(
+                true_svd[1][:, :n_components], evects)
+
+    def test_subspace_distances_01(self):
+        np.random.seed(42)
+        evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 6)))[0]
+        other_evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 6)))[0]
+        true_distances = np.array([
+            np.linalg.norm(np.dot(evects[:, :j].T, other_evects[:, j:]),
+                           ord=2) for j in range(1, 6)
+        ])
+        np.testing.assert_array_almost_equal(
+            true_distances, subspace_distances(evects, other_evects))
+
+    def test_subspace_distances_02(self):
+        np.random.seed(42)
+        evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 6)))[0]
+        other_evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 6)))[0]
+        distances = subspace_distances(evects, other_evects, max_dim=2)
+        np.testing.assert_array_almost_equal(
+            subspace_distances(evects, other_evects)[:2], distances)
+
+    def test_subspace_distances_03(self):
+        np.random.seed(42)
+        evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 4)))[0]
+        other_evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 4)))[0]
+        true_distances = np.array([
+            np.linalg.norm(np.dot(evects[:, :j].T, other_evects[:, j:]),
+                           ord=2) for j in range(1, 4)
+        ])
+        np.testing.assert_array_almost_equal(
+            true_distances, subspace_distances(evects, other_evects))
+
+    def test_subspace_distances_04(self):
+        evects = np.diag(np.ones(5))
+        np.testing.assert_array_almost_equal(np.zeros(4),
+                                             subspace_distances(evects, evects))
+
+    def test_subspace_distances_05(self):
+        angle = 1e-10
+        other_evects = np.diag(np.ones(5))
+        other_evects[:2, :2] = [[np.cos(angle), -np.sin(angle)],
+                                [np.sin(angle), np.cos(angle)]]
+        distances = subspace_distances(np.diag(np.ones(5)), other_evects)
+        self.assertAlmostEqual(1., distances[0] / np.sin(angle))
+        np.testing.assert_array_equal(np.zeros(3), distances[1:])
+
+    def test_linear_program_eq(self):
+        c = np.array([1., 1., 0.])
+        A = np.array([[1., -1., 1.]])
+        b = np.array([0.5])
+        x = linear_program_eq(c, A, b, -np.ones(3), np.ones(3))
+        self.assertEqual((3, 1), x.shape)
+        self.assertAlmostEqual(-2., np.dot(c, x)[0])
+
+    def test_bounding_box_solver_01(self):
+        np.random.seed(42)
+        evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 6)))[0]
+        solver = BoundingBoxSolver(evects[:, :2], evects[:, 2:])
+        reduced_inputs = np.random.uniform(-0.3, 0.3, (20, 2))
+        for reduced_input in reduced_inputs:
+            lbox, ubox = solver.solve(reduced_input)
+            for i in range(4):
+                c = evects[:, 2 + i]
+                x_min = linear_program_eq(c, evects[:, :2].T, reduced_input,
+                                          -np.ones(6), np.ones(6))
+                x_max = linear_program_eq(-c, evects[:, :2].T, reduced_input,
+                                          -np.ones(6), np.ones(6))
+                self.assertAlmostEqual(np.dot(c, x_min)[0], lbox[0, i])
+                self.assertAlmostEqual(np.dot(c, x_max)[0], ubox[0, i])
+
+    def test_bounding_box_solver_02(self):
+        np.random.seed(42)
+        evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 6)))[0]
+        solver = BoundingBoxSolver(evects[:, :2], evects[:, 2:])
+        for reduced_input in np.random.uniform(-0.1, 0.1, (30, 2)):
+            solver.solve(reduced_input)
+        self.assertEqual(30 * 8, solver.n_solves + solver.n_reuses)
+        self.assertGreater(solver.n_reuses, solver.n_solves)
+
+    def test_bounding_box_solver_03(self):
+        np.random.seed(42)
+        evects = np.linalg.qr(np.random.uniform(-1, 1, (6, 6)))[0]
+        solver = BoundingBoxSolver(evects[:, :2], evects[:, 2:], max_bases=2)
+        for reduced_input in np.random.uniform(-0.5, 0.5, (30, 2)):
+            solver.solve(reduced_input)
+        self.assertTrue(all(len(bases) <= 2 for bases in solver.bases))
+
+    def test_polytope_cache_01(self):
+        cache = PolytopeCache()
+        self.assertIsNone(cache.get(np.array([0.1, 0.2]), 'box'))
+        cache.put(np.array([0.1, 0.2]), 'box', 3)
+        self.assertEqual(3, cache.get(np.array([[0.1], [0.2]]), 'box'))
+        self.assertIsNone(cache.get(np.array([0.1, 0.2]), 'center'))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_polytope_cache_02(self):
+        cache = PolytopeCache(maxsize=2)
+        cache.put(np.array([0.]), 'box', 0)
+        cache.put(np.array([1.]), 'box', 1)
+        cache.get(np.array([0.]), 'box')
+        cache.put(np.array([2.]), 'box', 2)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get(np.array([1.]), 'box'))
+        self.assertEqual(0, cache.get(np.array([0.]), 'box'))
+
+    def test_polytope_cache_03(self):
+        cache = PolytopeCache(tol=1e-3)
+        cache.put(np.array([0.1, 0.2]), 'box', 3)
+        self.assertEqual(3, cache.get(np.array([0.1005, 0.2]), 'box'))
+        self.assertIsNone(cache.get(np.array([0.102, 0.2]), 'box'))
+        self.assertIsNone(
+            cache.get(np.array([0.1005, 0.2]), 'box', exact=True))
+
+    def test_polytope_cache_04(self):
+        cache = PolytopeCache()
+        cache.put(np.array([0.1, 0.2]), 'box', 3)
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertIsNone(cache.get(np.array([0.1, 0.2]), 'box'))
+
+    def test_polytope_cache_05(self):
+        cache = PolytopeCache(tol=1e-3)
+        cache.put(np.array([0.1, 0.2]), 'center', 3)
+        self.assertIsNone(
+            cache.get(np.array([0.1005, 0.2]), 'center',
+                      valid=lambda value: value > 3))
+        self.assertEqual(
+            3,
+            cache.get(np.array([0.1, 0.2]), 'center',
+                      valid=lambda value: value > 3))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))